@@ -0,0 +1,252 @@
+import os
+import sys
+import json
+import time
+import argparse
+import platform
+import subprocess
+import tempfile
+from datetime import datetime
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import sklearn
+from fastapi.encoders import jsonable_encoder
+
+project_root = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(project_root / "src"))
+
+from data.data_helpers import load_panel
+from data.market_store import MarketDataStore, FixtureProvider
+from data.split_helpers import label_rows
+from features.feature_helpers import create_features, create_panel_features, get_feature_columns
+from features.online_features import OnlineFeatureState
+from models.inference_helpers import predict_panel
+from models.training_helpers import build_model
+from models.PredictionBuilder import PredictionBuilder, config, feature_lookback, inference_batch_size
+from shared_state import SharedState, Snapshot
+from trading_simulation.simulation_helpers import run_backtest, simulate_portfolio
+from synthetic_market import synthetic_bars, synthetic_tickers, synthetic_sim_data
+
+# Time the pipeline stages on synthetic data at several scales and save the results as JSON,
+# so runs on different commits can be compared offline.
+# Usage: python benchmarks/bench_suite.py --scales small medium
+#        python benchmarks/bench_suite.py --compare benchmarks/results/<baseline>.json [<other>.json]
+
+scales = {
+    'small': (20, 252),  # tickers, trading days
+    'medium': (100, 252 * 3),
+    'large': (500, 252 * 10),
+}
+
+results_dir = project_root / "benchmarks" / "results"
+feature_columns = get_feature_columns(config)
+
+
+def measure(func, setup=None, repeat=3):
+    """Best and median wall time of `repeat` calls of func(*setup()); setup is not timed."""
+    timings = []
+    for _ in range(repeat):
+        args = setup() if setup is not None else ()
+        start = time.perf_counter()
+        result = func(*args)
+        timings.append(time.perf_counter() - start)
+    return {'best': min(timings), 'median': float(np.median(timings)), 'runs': timings}, result
+
+
+def fixed_model(seed=0):
+    """Model trained on a fixed synthetic sample, identical on every run and commit."""
+    bars = synthetic_bars(20, 252, seed=seed)
+    with tempfile.TemporaryDirectory() as tmp:
+        panel = synthetic_panel(bars, 20, Path(tmp))
+    create_panel_features(panel, feature_columns)
+    X = pd.DataFrame({name: panel.row_values(name) for name in feature_columns})
+    # down/flat/up labels, the targets the served model predicts
+    target = np.nan_to_num(panel.row_values('Target'))
+    y = np.where(np.abs(target) > config['features']['threshold_3d'], np.sign(target), 0.0)
+    model = build_model(n_jobs=1).set_params(random_state=seed)
+    return model.fit(X, y)
+
+
+def synthetic_panel(bars, n_tickers, workdir):
+    """load_panel over a fixture-backed store, as PredictionBuilder loads it."""
+    bars.to_parquet(workdir / "bars.parquet")
+    store = MarketDataStore(workdir / "store", FixtureProvider(workdir / "bars.parquet"))
+    end_date = (bars['Date'].max() + pd.Timedelta(days=1)).strftime("%Y-%m-%d")
+    return load_panel(bars['Date'].min().strftime("%Y-%m-%d"), end_date, synthetic_tickers(n_tickers), store)
+
+
+def render_json(payload):
+    # same bytes as app.materialize_responses
+    return json.dumps(jsonable_encoder(payload), ensure_ascii=False, allow_nan=False,
+                      indent=None, separators=(",", ":")).encode("utf-8")
+
+
+def run_scale(n_tickers, n_days, model, repeat):
+    benchmarks = {}
+
+    def record(name, timing, rows):
+        benchmarks[name] = {**timing, 'rows': int(rows)}
+        print(f"  {name}: {timing['best']:.3f}s ({rows} rows)")
+
+    bars = synthetic_bars(n_tickers, n_days)
+    with tempfile.TemporaryDirectory() as tmp:
+        workdir = Path(tmp)
+        # the first load downloads from the fixture and writes the store, later ones read it
+        timing, panel = measure(lambda: synthetic_panel(bars, n_tickers, workdir), repeat=1)
+        record('load_panel_cold', timing, panel.mask.sum())
+        timing, panel = measure(lambda: synthetic_panel(bars, n_tickers, workdir), repeat=repeat)
+        record('load_panel_warm', timing, panel.mask.sum())
+    rows = int(panel.mask.sum())
+
+    # ===== Features =====
+
+    timing, features_df = measure(lambda df: create_features(df, feature_columns), lambda: (panel.to_long(),), repeat)
+    record('create_features', timing, rows)
+    split = config['split']
+    timing, _ = measure(lambda: label_rows(features_df, feature_columns, split['horizons'], config['features']['threshold_3d'],
+                                           split['feature_lag']), repeat=repeat)
+    record('label_rows', timing, rows)
+    timing, _ = measure(lambda p: create_panel_features(p, feature_columns), lambda: (panel.copy(),), repeat)
+    record('create_panel_features', timing, rows)
+    create_panel_features(panel, feature_columns)
+
+    timing, state = measure(lambda: OnlineFeatureState.from_panel(panel.tail(feature_lookback), feature_columns), repeat=repeat)
+    record('online_features', timing, state.ready().sum())
+
+    # ===== Inference =====
+
+    timing, predictions = measure(lambda: predict_panel(model, panel, feature_columns, inference_batch_size), repeat=repeat)
+    record('predict_panel', timing, rows)
+    panel.set('Prediction', predictions, dtype=float)
+
+    # ===== Backtest =====
+
+    def builder_setup():
+        builder = PredictionBuilder.__new__(PredictionBuilder)
+        builder.panel = panel.copy()
+        return (builder,)
+
+    def daily_returns(builder):
+        builder._compute_daily_returns_per_stock()
+        return builder
+
+    timing, builder = measure(daily_returns, builder_setup, repeat)
+    record('daily_returns_per_stock', timing, len(builder.daily_returns_df))
+    timing, _ = measure(builder._compute_portfolio_returns, repeat=repeat)
+    record('portfolio_returns', timing, len(builder.portfolio_returns_df))
+    timing, (builder.settled_stats, builder.stats) = measure(lambda: builder._performance_stats(builder.panel), repeat=repeat)
+    record('performance_stats', timing, len(builder.daily_returns_df))
+
+    # ===== Trading simulation =====
+
+    sim_data = synthetic_sim_data(n_tickers, n_days)
+    by_ticker = sim_data.sort_values(['Ticker', 'Date'])
+    trading = config['trading']
+    timing, _ = measure(lambda: run_backtest(by_ticker, trading['holding_horizon'], trading['threshold_flat']), repeat=repeat)
+    record('run_backtest', timing, len(sim_data))
+    timing, _ = measure(lambda: simulate_portfolio(sim_data, trading['holding_horizon'], trading['threshold_flat']), repeat=repeat)
+    record('simulate_portfolio', timing, len(sim_data))
+
+    # ===== API serialization =====
+
+    def materialize():
+        return [render_json(payload) for payload in (builder.get_portfolio_performance(),
+                                                     builder.get_stock_performance(), builder.get_stats())]
+
+    timing, bodies = measure(materialize, repeat=repeat)
+    record('materialize_responses', timing, rows)
+    benchmarks['materialize_responses']['bytes'] = sum(map(len, bodies))
+
+    timing, _ = measure(lambda: render_json({"predictions": list(builder._score_latest(state, model).values())}), repeat=repeat)
+    record('score_latest', timing, n_tickers)
+
+    # ===== Multi-worker state =====
+
+    snapshot = Snapshot({name: ('"etag"', body) for name, body in zip(['daily-returns', 'performance-per-stock', 'global-stats'], bodies)},
+                        builder._score_latest(state, model), builder.daily_returns_df, 'benchmark')
+    with tempfile.TemporaryDirectory() as tmp:
+        shared_state = SharedState(tmp)
+        shared_state.acquire_builder()
+        timing, _ = measure(lambda: shared_state.publish(snapshot), repeat=repeat)
+        record('publish_state', timing, len(builder.daily_returns_df))
+        # what a worker does when the builder publishes a new version
+        timing, _ = measure(lambda: SharedState(tmp).current(), repeat=repeat)
+        record('attach_state', timing, len(builder.daily_returns_df))
+        # a dashboard drilling into one ticker, on the memory-mapped state
+        attached = SharedState(tmp).current()
+        timing, (page, _) = measure(lambda: attached.daily_returns_page([synthetic_tickers(n_tickers)[-1]]), repeat=repeat)
+        record('daily_returns_page', timing, len(page))
+
+    return {'tickers': n_tickers, 'days': n_days, 'rows': rows, 'benchmarks': benchmarks}
+
+
+def git_commit():
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=project_root,
+                                capture_output=True, text=True, check=True).stdout.strip()
+        dirty = subprocess.run(["git", "status", "--porcelain", "--untracked-files=no"], cwd=project_root,
+                               capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    return commit + ("-dirty" if dirty else "")
+
+
+def environment():
+    return {
+        'commit': git_commit(),
+        'created': datetime.now().isoformat(timespec="seconds"),
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'pandas': pd.__version__,
+        'sklearn': sklearn.__version__,
+        'platform': platform.platform(),
+        'machine': platform.machine(),
+        'cpu_count': os.cpu_count(),
+    }
+
+
+def compare(baseline, current):
+    """Print the best time of every benchmark in both result files and their ratio."""
+    print(f"{'scale':<8} {'benchmark':<24} {'baseline':>10} {'current':>10} {'ratio':>7}")
+    for scale, result in current['results'].items():
+        base = baseline['results'].get(scale, {}).get('benchmarks', {})
+        for name, timing in result['benchmarks'].items():
+            if name not in base:
+                continue
+            ratio = timing['best'] / base[name]['best']
+            flag = "  slower" if ratio > 1.1 else ""
+            print(f"{scale:<8} {name:<24} {base[name]['best']:>9.3f}s {timing['best']:>9.3f}s {ratio:>6.2f}x{flag}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--scales", nargs="+", choices=list(scales), default=['small', 'medium'])
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--output", type=Path, help="results file (default benchmarks/results/<commit>-<time>.json)")
+    parser.add_argument("--compare", nargs="+", type=Path, metavar="RESULTS",
+                        help="baseline results to compare this run with, or two result files to compare without running")
+    args = parser.parse_args()
+
+    if args.compare and len(args.compare) == 2:
+        baseline, current = (json.loads(path.read_text()) for path in args.compare)
+        compare(baseline, current)
+        raise SystemExit
+
+    print("Training the benchmark model...")
+    model = fixed_model()
+
+    report = {**environment(), 'repeat': args.repeat, 'results': {}}
+    for scale in args.scales:
+        n_tickers, n_days = scales[scale]
+        print(f"Benchmarking {scale}: {n_tickers} tickers x {n_days} days...")
+        report['results'][scale] = run_scale(n_tickers, n_days, model, args.repeat)
+
+    output_path = args.output or results_dir / f"{report['commit'] or 'unknown'}-{datetime.now():%Y%m%d-%H%M%S}.json"
+    output_path.parent.mkdir(parents=True, exist_ok=True)
+    output_path.write_text(json.dumps(report, indent=2))
+    print(f"Saved results to {output_path}")
+
+    if args.compare:
+        compare(json.loads(args.compare[0].read_text()), report)
@@ -0,0 +1,77 @@
+import numpy as np
+import pandas as pd
+
+# Seeded synthetic market data, shaped like the real inputs of the pipeline.
+
+macro_symbols = ['^VIX', 'CL=F', '^TNX', '^GSPC', '^NDX', '^RUT', '^DJI']
+
+
+def synthetic_tickers(n_tickers):
+    return [f"TK{i:04d}" for i in range(n_tickers)]
+
+
+def synthetic_closes(rng, n_days, n_series, volatility=0.02, start=100.0):
+    """Geometric random walks, one column per series."""
+    return start * np.exp(np.cumsum(rng.normal(0, volatility, (n_days, n_series)), axis=0))
+
+
+def synthetic_bars(n_tickers, n_days, seed=42, start_date="2015-01-02"):
+    """
+    Long-format daily OHLCV bars (Date, Ticker, Close, High, Low, Open, Volume) for
+    `n_tickers` stocks plus the macro and market index symbols of config.yaml, i.e. what
+    the market data store's provider returns. Feed it to FixtureProvider to run the
+    loading pipeline offline.
+    """
+    rng = np.random.default_rng(seed)
+    dates = pd.bdate_range(start_date, periods=n_days)
+    symbols = synthetic_tickers(n_tickers) + macro_symbols
+    volatility = np.r_[np.full(n_tickers, 0.02), np.full(len(macro_symbols), 0.01)]
+
+    close = synthetic_closes(rng, n_days, len(symbols), volatility).ravel()
+    return pd.DataFrame({
+        'Date': np.repeat(dates, len(symbols)),
+        'Ticker': np.tile(symbols, n_days),
+        'Close': close,
+        'High': close * (1 + rng.uniform(0, 0.02, close.size)),
+        'Low': close * (1 - rng.uniform(0, 0.02, close.size)),
+        'Open': close * (1 + rng.normal(0, 0.01, close.size)),
+        'Volume': rng.integers(100_000, 10_000_000, close.size).astype(float),
+    })
+
+
+def synthetic_data(n_tickers, n_days, seed=42):
+    """Long-format frame shaped like data_helpers.load_data output (Date x Ticker rows)."""
+    rng = np.random.default_rng(seed)
+    dates = pd.bdate_range("2015-01-02", periods=n_days)
+    tickers = sorted(synthetic_tickers(n_tickers))
+
+    close = synthetic_closes(rng, n_days, n_tickers).ravel()
+    df = pd.DataFrame({
+        'Date': np.repeat(dates, n_tickers),
+        'Ticker': np.tile(tickers, n_days),
+        'Close': close,
+        'High': close * (1 + rng.uniform(0, 0.02, close.size)),
+        'Low': close * (1 - rng.uniform(0, 0.02, close.size)),
+        'Open': close * (1 + rng.normal(0, 0.01, close.size)),
+        'Volume': rng.integers(100_000, 10_000_000, close.size).astype(float),
+    })
+    for col in ['VIX', 'WTI_Oil', 'US10Y', 'GSPC', 'NDX', 'RUT', 'DJI']:
+        df[col] = np.repeat(100 * np.exp(np.cumsum(rng.normal(0, 0.01, n_days))), n_tickers)
+    df['Target'] = df.groupby('Ticker')['Close'].pct_change(3).shift(-3)
+    return df
+
+
+def synthetic_sim_data(n_tickers, n_days, seed=42):
+    """trading_sim_data.csv-shaped frame (Date, Close, Ticker, Prob_Down/Flat/Up), sorted by Date."""
+    rng = np.random.default_rng(seed)
+    dates = pd.bdate_range("2015-01-02", periods=n_days).strftime("%Y-%m-%d")
+    close = synthetic_closes(rng, n_days, n_tickers).ravel()
+    proba = rng.dirichlet([2.0, 2.0, 2.0], close.size)
+    return pd.DataFrame({
+        'Date': np.repeat(dates, n_tickers),
+        'Close': close,
+        'Ticker': np.tile(synthetic_tickers(n_tickers), n_days),
+        'Prob_Down': proba[:, 0],
+        'Prob_Flat': proba[:, 1],
+        'Prob_Up': proba[:, 2],
+    })
@@ -1,12 +1,118 @@
-from fastapi import FastAPI
+import asyncio
+import json
+import hashlib
+import threading
+import time
+from contextlib import asynccontextmanager
+from datetime import date
+from pathlib import Path
+from typing import Literal
+import numpy as np
+import pyarrow as pa
+import yaml
+from fastapi import FastAPI, HTTPException, Query, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
-from models.PredictionBuilder import PredictionBuilder
+from fastapi.responses import JSONResponse, PlainTextResponse
 from fastapi.encoders import jsonable_encoder
+from data.schema import day_strings, to_record_batch
+from instrumentation import LatencyMiddleware, render_prometheus, stage
+from shared_state import SharedState, Snapshot
 
+project_root = Path(__file__).resolve().parents[1]
+config_path = project_root / "config.yaml"
 
-app = FastAPI()
+with open(config_path, "r") as f:
+    config = yaml.safe_load(f)
 
-prediction_builder = PredictionBuilder()
+# run from src/: uvicorn app:app (or python -m app)
+
+# ===== Startup =====
+# the backtest takes minutes to build, so by default the server binds right away and
+# builds it in a background thread; endpoints that need it answer 503 until /ready is 200.
+# With api.shared_state (uvicorn app:app --workers N), the first worker to take the builder
+# lock builds and publishes the state under api.state_dir, the others memory-map it and
+# forward refresh/reload to the builder instead of each building their own copy
+
+prediction_builder = None
+shared_state = None
+snapshot = None  # served state of a single process server
+startup_state = {"status": "starting", "error": None}
+# refresh and model reload replace the builder's state, one at a time
+builder_lock = threading.Lock()
+
+def build_state():
+    global prediction_builder
+    try:
+        # imported here so that importing the app does not pull in the data and model stack
+        from models.PredictionBuilder import PredictionBuilder
+        with stage("startup"):
+            builder = PredictionBuilder()
+        prediction_builder = builder
+        materialize_responses()
+        set_status("ready")
+    except Exception as e:
+        set_status("failed", repr(e))
+        raise
+
+def set_status(status, error=None):
+    startup_state.update(status=status, error=error)
+    if shared_state is not None:
+        shared_state.set_status(status, error)
+
+def serve_builder_commands():
+    threading.Thread(target=shared_state.serve_commands, args=(run_command,), name="builder-commands",
+                     daemon=True).start()
+
+def take_over_builder():
+    # the builder's lock is released when its process exits, then this worker builds in its place
+    while not shared_state.acquire_builder():
+        time.sleep(shared_state.takeover_seconds)
+    print("No builder worker is running, building the state in this one...")
+    serve_builder_commands()
+    build_state()
+
+@asynccontextmanager
+async def lifespan(app):
+    global shared_state
+    if config['api']['shared_state']:
+        shared_state = SharedState(project_root / config['api']['state_dir'])
+        if not shared_state.acquire_builder():
+            # another worker builds the state, this one serves what it publishes
+            threading.Thread(target=take_over_builder, name="builder-takeover", daemon=True).start()
+            yield
+            return
+        serve_builder_commands()
+    if config['api']['background_startup']:
+        threading.Thread(target=build_state, name="build-state", daemon=True).start()
+    else:
+        # off the event loop, which the market data fetcher runs its own loop beside
+        await asyncio.to_thread(build_state)
+    yield
+
+def get_status():
+    if shared_state is not None and not shared_state.is_builder:
+        return shared_state.status()
+    return startup_state
+
+def unavailable(status):
+    return HTTPException(status_code=503, detail=f"Backtest is {status['status']}", headers={"Retry-After": "5"})
+
+def get_builder():
+    if startup_state["status"] != "ready":
+        raise unavailable(startup_state)
+    return prediction_builder
+
+def get_snapshot():
+    status = get_status()
+    served = None
+    if status["status"] == "ready":
+        served = shared_state.current() if shared_state is not None else snapshot
+    if served is None:
+        raise unavailable(status)
+    return served
+
+
+app = FastAPI(lifespan=lifespan)
 
 origins = [
     "http://localhost:3000",  # React dev server
@@ -18,16 +124,176 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor"],
 )
+# per-endpoint latency histograms, served by /metrics
+app.add_middleware(LatencyMiddleware)
+
+# ===== Response cache =====
+# backtest payloads only change on refresh, so they are serialized once per refresh
+# and served as bytes with an ETag; polling clients revalidate with If-None-Match
+
+response_cache = {}
+
+def materialize_responses():
+    global snapshot
+    with stage("materialize_responses"):
+        payloads = {
+            "daily-returns": prediction_builder.get_portfolio_performance(),
+            "performance-per-stock": prediction_builder.get_stock_performance(),
+            "global-stats": prediction_builder.get_stats(),
+        }
+        for name, payload in payloads.items():
+            # same bytes FastAPI's JSONResponse would render
+            body = json.dumps(jsonable_encoder(payload), ensure_ascii=False, allow_nan=False,
+                              indent=None, separators=(",", ":")).encode("utf-8")
+            etag = '"' + hashlib.blake2b(body, digest_size=16).hexdigest() + '"'
+            response_cache[name] = (etag, body)
+
+    served = Snapshot(dict(response_cache), prediction_builder.latest_scores, prediction_builder.daily_returns_df,
+                      prediction_builder.model_version)
+    if shared_state is not None:
+        with stage("publish_state"):
+            shared_state.publish(served)
+    else:
+        snapshot = served
+
+def cached_response(name, request):
+    etag, body = get_snapshot().responses[name]
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if_none_match = request.headers.get("if-none-match", "")
+    client_etags = {tag.strip().removeprefix("W/") for tag in if_none_match.split(",")}
+    if etag in client_etags or "*" in client_etags:
+        return Response(status_code=304, headers=headers)
+    return Response(body, media_type="application/json", headers=headers)
+
+@app.get("/ready")
+def ready():
+    # readiness probe: 200 once the backtest is built, 503 while starting or after a failed build
+    status = get_status()
+    status_code = 200 if status["status"] == "ready" else 503
+    return JSONResponse({"status": status["status"], "error": status["error"]}, status_code=status_code)
 
 @app.get("/backtest/daily-returns")
-def get_daily_returns():
-    return prediction_builder.get_portfolio_performance()
+def get_daily_returns(request: Request):
+    return cached_response("daily-returns", request)
 
 @app.get("/backtest/performance-per-stock")
-def get_stock_performance():
-    return prediction_builder.get_stock_performance()
+def get_stock_performance(request: Request):
+    return cached_response("performance-per-stock", request)
 
 @app.get("/backtest/global-stats")
-def get_global_stats():
-    return prediction_builder.get_stats()
\ No newline at end of file
+def get_global_stats(request: Request):
+    return cached_response("global-stats", request)
+
+# ===== Per-stock daily returns =====
+# too large to serve in one response, so pages are cut from the snapshot's (Ticker, Date)
+# index, as JSON records or as an Arrow IPC stream (format=arrow)
+
+def daily_returns_records(page):
+    columns = {'Date': day_strings(page['Date']).tolist(), 'Ticker': page['Ticker'].astype(str).tolist()}
+    for name in page.columns[2:]:
+        values = page[name].to_numpy()
+        # NaN (e.g. the Target of the last days) is not valid JSON
+        columns[name] = np.where(np.isnan(values), None, values).tolist()
+    return [dict(zip(columns, row)) for row in zip(*columns.values())]
+
+def daily_returns_arrow(page):
+    batch = to_record_batch(page)
+    batch = batch.set_column(0, pa.field('Date', pa.date32()), batch.column(0).cast(pa.date32()))
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, batch.schema) as writer:
+        writer.write_batch(batch)
+    return sink.getvalue().to_pybytes()
+
+@app.get("/backtest/daily-returns-per-stock")
+def get_daily_returns_per_stock(tickers: list[str] | None = Query(None), start: date | None = None,
+                                end: date | None = None, columns: list[str] | None = Query(None),
+                                cursor: str | None = None, limit: int = Query(1000, ge=1, le=10000),
+                                output: Literal["json", "arrow"] = Query("json", alias="format")):
+    try:
+        page, next_cursor = get_snapshot().daily_returns_page(tickers, start, end, columns, cursor, limit)
+    except KeyError as e:
+        raise HTTPException(status_code=404, detail=str(e.args[0]))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if output == "arrow":
+        # the cursor of the next page, if any, comes in the X-Next-Cursor header
+        headers = {"X-Next-Cursor": next_cursor} if next_cursor is not None else {}
+        return Response(daily_returns_arrow(page), media_type="application/vnd.apache.arrow.stream", headers=headers)
+    return JSONResponse({"dailyReturns": daily_returns_records(page), "nextCursor": next_cursor})
+
+@app.get("/predict")
+def predict(tickers: list[str] | None = Query(None)):
+    # scores are plain JSON types already, skip FastAPI's generic encoder
+    try:
+        return JSONResponse(get_snapshot().get_latest_predictions(tickers))
+    except KeyError as e:
+        raise HTTPException(status_code=404, detail=str(e.args[0]))
+
+def swap_model(builder):
+    try:
+        return builder.swap_model()
+    except ValueError as e:
+        # the registry's model does not match the served features, keep the current one
+        raise HTTPException(status_code=409, detail=str(e))
+
+def reload_state():
+    with builder_lock:
+        swapped = swap_model(get_builder())
+        if swapped:
+            materialize_responses()
+        return {"modelVersion": prediction_builder.model_version, "swapped": swapped}
+
+def refresh_state():
+    with builder_lock:
+        builder = get_builder()
+        served_version = builder.model_version
+        # refresh() scores the new days with the registry's model, so a mismatched one is refused first
+        swap_model(builder)
+        new_trading_days = builder.refresh()
+        # refresh() also swaps in the registry's current model, which changes the state without new days
+        if new_trading_days or builder.model_version != served_version:
+            materialize_responses()
+        return {"newTradingDays": new_trading_days, "modelVersion": builder.model_version}
+
+builder_commands = {"reload": reload_state, "refresh": refresh_state}
+
+def run_command(command):
+    # a command forwarded by another worker, run on the builder
+    try:
+        return 200, builder_commands[command]()
+    except HTTPException as e:
+        return e.status_code, {"detail": e.detail}
+
+def on_builder(command):
+    # only the builder worker holds the PredictionBuilder, the others forward the command to it
+    if shared_state is None or shared_state.is_builder:
+        return builder_commands[command]()
+    try:
+        status_code, body = shared_state.submit(command, config['api']['command_timeout'])
+    except TimeoutError as e:
+        raise HTTPException(status_code=504, detail=str(e))
+    if status_code != 200:
+        raise HTTPException(status_code=status_code, detail=body["detail"])
+    return body
+
+@app.post("/model/reload")
+def reload_model():
+    # serve the registry's current model without a restart
+    return on_builder("reload")
+
+@app.post("/backtest/refresh")
+def refresh_backtest():
+    return on_builder("refresh")
+
+@app.get("/metrics")
+def metrics():
+    # Prometheus text exposition format: pipeline stage timings and request latency histograms
+    return PlainTextResponse(render_prometheus(), media_type="text/plain; version=0.0.4")
+
+
+if __name__ == "__main__":
+    import uvicorn
+    # several workers need the app as an import string and api.shared_state
+    uvicorn.run("app:app", host=config['api']['host'], port=config['api']['port'], workers=config['api']['workers'])
@@ -1,6 +1,9 @@
 import yaml
 from pathlib import Path
-import yfinance as yf
+import pandas as pd
+from data.market_store import MarketDataStore, bar_columns
+from data.fetcher import ConcurrentFetcher
+from data.panel import MarketPanel
 
 project_root = Path(__file__).resolve().parents[2]
 config_path = project_root / "config.yaml"
@@ -13,27 +16,72 @@ tickers = config['tickers']
 macro_tickers = config['macro_tickers']
 market_indices = config['market_indices']
 
+store_path = project_root / config['data']['store']
+_store = None
 
-def load_data(start_date, end_date):
-    print("Downloading stock data...")
-    stock_data = yf.download(tickers, start=start_date, end=end_date)
-    stock_data.stack(level=1).reset_index()
 
-    print("Downloading macro data...")
-    macro_data = yf.download(macro_tickers, start=start_date, end=end_date)['Close']
+def get_store():
+    """Shared market data store backed by Yahoo Finance, fetching with the `ingestion` settings."""
+    global _store
+    if _store is None:
+        store = MarketDataStore(store_path)
+        ingestion = config['ingestion']
+        store.fetcher = ConcurrentFetcher(store.provider, ingestion['chunk_size'], ingestion['max_concurrency'],
+                                          ingestion['max_retries'], ingestion['backoff_seconds'],
+                                          ingestion['requests_per_second'])
+        _store = store
+    return _store
+
+
+def load_panel(start_date, end_date, tickers=tickers, store=None):
+    """
+    Date x ticker panel of bars for `tickers` in [start_date, end_date), with macro and
+    market index closes stored once per date and the split.target_horizon-day Target.
+    Bars are served from the local store and only missing ranges are downloaded.
+    """
+    store = store if store is not None else get_store()
+
+    # one concurrent download for every missing stock, macro and index range
+    store.prefetch(list(tickers) + macro_tickers + market_indices, start_date, end_date)
+
+    print("Loading stock data...")
+    panel = MarketPanel.from_long(store.load(tickers, start_date, end_date), bar_columns, tickers=sorted(tickers))
+
+    print("Loading macro data...")
+    macro_data = store.load(macro_tickers, start_date, end_date, columns=['Close'])\
+        .pivot(index='Date', columns='Ticker', values='Close')
     macro_data.rename(columns={'^VIX':'VIX', 'CL=F':'WTI_Oil', '^TNX':'US10Y'}, inplace=True)
     macro_data = macro_data.ffill()
 
-    print("Downloading market data...")
-    market_data = yf.download(market_indices, start=start_date, end=end_date)['Close']
+    print("Loading market data...")
+    market_data = store.load(market_indices, start_date, end_date, columns=['Close'])\
+        .pivot(index='Date', columns='Ticker', values='Close')
     market_data.rename(columns={'^GSPC':'GSPC', '^NDX':'NDX', '^RUT':'RUT', '^DJI':'DJI'}, inplace=True)
 
+    for name, values in pd.concat([macro_data, market_data], axis=1).reindex(panel.dates).items():
+        panel.set_series(name, values)
+
+    target_horizon = config['split']['target_horizon']
+    print(f"Adding target variable for {target_horizon}-day horizon...")
+    add_panel_target(panel, target_horizon)
+
+    return panel
+
+
+def load_data(start_date, end_date, tickers=tickers, store=None):
+    """Long-format bars merged with macro and market index closes, see load_panel."""
+    return load_panel(start_date, end_date, tickers, store).to_long()
+
 
-    stock_data_long_format = stock_data.stack(level=1).reset_index()
-    stock_data_long_format = stock_data_long_format.merge(macro_data.reset_index(), on='Date', how='left')
-    stock_data_long_format = stock_data_long_format.merge(market_data.reset_index(), on='Date', how='left')
+def add_target(df, horizon=3):
+    """Add the forward `horizon`-day return as the Target column (in place)."""
+    df["Target"] = df.groupby('Ticker')['Close'].pct_change(horizon).shift(-horizon)
+    return df
 
-    print("Adding target variable for 3-day horizon...")
-    stock_data_long_format["Target"] = stock_data_long_format.groupby('Ticker')['Close'].pct_change(3).shift(-3)
 
-    return stock_data_long_format
\ No newline at end of file
+def add_panel_target(panel, horizon=3):
+    """add_target on a panel, computed over the long row order so both representations agree."""
+    close = pd.Series(panel.row_values('Close'), dtype=float)
+    target = close.groupby(panel.row_tickers()).pct_change(horizon).shift(-horizon)
+    panel.set('Target', panel.from_row_values(target))
+    return panel
\ No newline at end of file
@@ -1,8 +1,10 @@
-import yfinance as yf
 import os
 import yaml
 from pathlib import Path
+from data.data_helpers import load_data
+from instrumentation import stage
 
+# run from src/: python -m data.data_loader
 
 project_root = Path(__file__).resolve().parents[2]
 config_path = project_root / "config.yaml"
@@ -10,43 +12,23 @@ config_path = project_root / "config.yaml"
 with open(config_path, "r") as f:
     config = yaml.safe_load(f)
 
-tickers = config['tickers']
-macro_tickers = config['macro_tickers']
-market_indices = config['market_indices']
+start_date = config["ingestion"]["start_date"]
+end_date = config["ingestion"]["end_date"]
 
-start_date = "2020-01-01"
-end_date = "2025-01-01"
 
+def main():
+    """Download the configured history and save it with the target horizon's forward return (added by load_data)."""
+    interim_data_path = project_root / config["data"]["interim"]
+    os.makedirs(interim_data_path, exist_ok=True)
 
-raw_data_path = project_root / config["data"]["raw"]
-interim_data_path = project_root / config["data"]["interim"]
-os.makedirs(raw_data_path, exist_ok=True)
-os.makedirs(interim_data_path, exist_ok=True)
 
+    # raw bars are cached in the market data store (config data.store)
+    with stage("load_data") as record:
+        stock_data_long_format = load_data(start_date, end_date)
+        record.rows = len(stock_data_long_format)
 
-print("Downloading stock data...")
-stock_data = yf.download(tickers, start=start_date, end=end_date)
-stock_data.stack(level=1).reset_index()
-stock_data.to_csv(raw_data_path / "stock_data_raw.csv")
+    stock_data_long_format.to_parquet(interim_data_path / "data_with_target.parquet")
 
-print("Downloading macro data...")
-macro_data = yf.download(macro_tickers, start=start_date, end=end_date)['Close']
-macro_data.rename(columns={'^VIX':'VIX', 'CL=F':'WTI_Oil', '^TNX':'US10Y'}, inplace=True)
-macro_data = macro_data.ffill()
-macro_data.to_csv(raw_data_path / "macro_data_raw.csv")
 
-print("Downloading market data...")
-market_data = yf.download(market_indices, start=start_date, end=end_date)['Close']
-market_data.rename(columns={'^GSPC':'GSPC', '^NDX':'NDX', '^RUT':'RUT', '^DJI':'DJI'}, inplace=True)
-market_data.to_csv(raw_data_path / "market_data_raw.csv")
-
-
-stock_data_long_format = stock_data.stack(level=1).reset_index()
-stock_data_long_format = stock_data_long_format.merge(macro_data.reset_index(), on='Date', how='left')
-stock_data_long_format = stock_data_long_format.merge(market_data.reset_index(), on='Date', how='left')
-
-
-print("Adding target variable for 1-day horizon...")
-stock_data_long_format['Target'] = stock_data_long_format.groupby('Ticker')['Close'].pct_change(1).shift(-1)
-
-stock_data_long_format.to_csv(interim_data_path / "data_with_target.csv")
\ No newline at end of file
+if __name__ == "__main__":
+    main()
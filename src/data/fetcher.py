@@ -0,0 +1,88 @@
+import asyncio
+import random
+import time
+
+import pandas as pd
+
+
+class ConcurrentFetcher:
+    """
+    Runs provider fetches for many ticker chunks concurrently.
+
+    At most `max_concurrency` requests are in flight and, with `requests_per_second`,
+    request starts are spaced out to respect the provider's rate limit. Failed requests
+    are retried up to `max_retries` times with exponential backoff and jitter. Results
+    are handed to `on_result` as soon as each chunk completes, so the caller can
+    checkpoint progress and a failed run resumes where it stopped.
+
+    Providers only need a blocking `fetch(symbols, start_date, end_date)`, which runs in
+    worker threads; providers with an `async fetch_async(...)` are awaited directly.
+    Providers that make one HTTP request per `symbols_per_request` symbols (YahooProvider
+    requests them one by one) are called that many symbols at a time, so the rate limit
+    and retries apply to each request rather than to the whole chunk.
+    """
+
+    def __init__(self, provider, chunk_size=50, max_concurrency=4, max_retries=3, backoff_seconds=1.0,
+                 requests_per_second=None):
+        self.provider = provider
+        self.chunk_size = chunk_size
+        self.max_concurrency = max_concurrency
+        self.max_retries = max_retries
+        self.backoff_seconds = backoff_seconds
+        self.requests_per_second = requests_per_second
+
+    def chunks(self, symbols):
+        return [symbols[i:i + self.chunk_size] for i in range(0, len(symbols), self.chunk_size)]
+
+    def run(self, jobs, on_result):
+        """
+        Fetch every (symbols, start_date, end_date) job and call on_result(job, bars) for each.
+        Every job is attempted; the first error is raised once the others have finished.
+        """
+        errors = asyncio.run(self._run(jobs, on_result))
+        if errors:
+            raise errors[0]
+
+    async def _run(self, jobs, on_result):
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+        self._next_start = time.monotonic()
+        self._rate_lock = asyncio.Lock()
+
+        async def run_job(job):
+            async with semaphore:
+                bars = await self._fetch_job(*job)
+            on_result(job, bars)
+
+        results = await asyncio.gather(*(run_job(job) for job in jobs), return_exceptions=True)
+        return [result for result in results if isinstance(result, BaseException)]
+
+    async def _fetch_job(self, symbols, start_date, end_date):
+        per_request = getattr(self.provider, "symbols_per_request", None) or len(symbols) or 1
+        if per_request >= len(symbols):
+            return await self._fetch_with_retry(symbols, start_date, end_date)
+        frames = [await self._fetch_with_retry(symbols[i:i + per_request], start_date, end_date)
+                  for i in range(0, len(symbols), per_request)]
+        return pd.concat(frames, ignore_index=True)
+
+    async def _fetch_with_retry(self, symbols, start_date, end_date):
+        for attempt in range(self.max_retries + 1):
+            await self._wait_for_rate_limit()
+            try:
+                if hasattr(self.provider, "fetch_async"):
+                    return await self.provider.fetch_async(symbols, start_date, end_date)
+                return await asyncio.to_thread(self.provider.fetch, symbols, start_date, end_date)
+            except Exception as e:
+                if attempt == self.max_retries:
+                    raise
+                delay = self.backoff_seconds * 2 ** attempt * (1 + random.random())
+                print(f"Fetching {len(symbols)} tickers failed ({e!r}), retrying in {delay:.1f}s...")
+                await asyncio.sleep(delay)
+
+    async def _wait_for_rate_limit(self):
+        if not self.requests_per_second:
+            return
+        async with self._rate_lock:
+            now = time.monotonic()
+            start = max(now, self._next_start)
+            self._next_start = start + 1 / self.requests_per_second
+        await asyncio.sleep(start - now)
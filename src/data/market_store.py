@@ -0,0 +1,226 @@
+import json
+from datetime import date
+from pathlib import Path
+from urllib.parse import quote, urlencode
+from urllib.request import urlopen
+
+import pandas as pd
+from data.fetcher import ConcurrentFetcher
+
+
+bar_columns = ['Close', 'High', 'Low', 'Open', 'Volume']
+
+
+class YahooProvider:
+    """
+    Daily OHLCV bars from Yahoo Finance.
+
+    Symbols are requested one by one through yf.Ticker, which unlike yf.download keeps
+    no module-level state, so several fetches can safely run in parallel threads.
+    """
+
+    # one HTTP request per symbol, which is what the fetcher's rate limit counts
+    symbols_per_request = 1
+
+    def fetch(self, symbols, start_date, end_date):
+        """Return long-format bars (Date, Ticker, Close, High, Low, Open, Volume) for [start_date, end_date)."""
+        import yfinance as yf
+
+        frames = []
+        for symbol in symbols:
+            data = yf.Ticker(symbol).history(start=start_date, end=end_date, auto_adjust=True, raise_errors=True)
+            if data.empty:
+                continue
+            data.index = data.index.tz_localize(None).normalize()
+            data = data.rename_axis('Date').reset_index()
+            data['Ticker'] = symbol
+            frames.append(data[['Date', 'Ticker'] + bar_columns])
+        if not frames:
+            return pd.DataFrame(columns=['Date', 'Ticker'] + bar_columns)
+        return pd.concat(frames, ignore_index=True)
+
+
+class HttpProvider:
+    """
+    Bars from an HTTP endpoint answering GET <base_url>?symbols=A,B&start=...&end=... with
+    long-format CSV (Date, Ticker, Close, High, Low, Open, Volume), e.g. a local fake server.
+    """
+
+    def __init__(self, base_url, timeout=30):
+        self.base_url = base_url
+        self.timeout = timeout
+
+    def fetch(self, symbols, start_date, end_date):
+        query = urlencode({'symbols': ",".join(symbols), 'start': start_date, 'end': end_date})
+        with urlopen(f"{self.base_url}?{query}", timeout=self.timeout) as response:
+            return pd.read_csv(response, parse_dates=['Date'])
+
+
+class FixtureProvider:
+    """
+    Offline stand-in for YahooProvider, serving bars from a long-format CSV/Parquet file
+    with Date, Ticker, Close, High, Low, Open, Volume columns.
+    """
+
+    def __init__(self, path):
+        path = Path(path)
+        if path.suffix == '.parquet':
+            self.data = pd.read_parquet(path)
+        else:
+            self.data = pd.read_csv(path, parse_dates=['Date'])
+        self.calls = []
+
+    def fetch(self, symbols, start_date, end_date):
+        self.calls.append((list(symbols), start_date, end_date))
+        mask = self.data['Ticker'].isin(symbols) \
+            & (self.data['Date'] >= pd.Timestamp(start_date)) \
+            & (self.data['Date'] < pd.Timestamp(end_date))
+        return self.data.loc[mask, ['Date', 'Ticker'] + bar_columns].reset_index(drop=True)
+
+
+class MarketDataStore:
+    """
+    Local Parquet store of daily bars, partitioned as <root>/Ticker=<symbol>/year=<yyyy>/.
+
+    `load` only asks the provider for (ticker, date range) pairs that were never fetched
+    before, and serves everything else from disk with column projection and
+    Ticker/year/Date filters pushed down to the Parquet reader. Fetched ranges are
+    tracked in <root>/_coverage.json; days from today onwards are never marked as
+    covered since their bars may not be published yet.
+
+    Missing ranges are fetched in ticker chunks by a ConcurrentFetcher, and the coverage
+    file is saved after every chunk, so an interrupted download resumes where it stopped.
+    """
+
+    def __init__(self, root, provider=None, fetcher=None):
+        self.root = Path(root)
+        self.provider = provider if provider is not None else YahooProvider()
+        self.fetcher = fetcher if fetcher is not None else ConcurrentFetcher(self.provider)
+        self.coverage_path = self.root / "_coverage.json"
+        self.root.mkdir(parents=True, exist_ok=True)
+        if self.coverage_path.exists():
+            with open(self.coverage_path, "r") as f:
+                self.coverage = json.load(f)
+        else:
+            self.coverage = {}
+
+
+    def load(self, tickers, start_date, end_date, columns=None):
+        """Long-format bars for `tickers` in [start_date, end_date), fetching only missing ranges."""
+        start_date = pd.Timestamp(start_date).strftime("%Y-%m-%d")
+        end_date = pd.Timestamp(end_date).strftime("%Y-%m-%d")
+        self._fill_missing(tickers, start_date, end_date)
+        return self._read(tickers, start_date, end_date, columns)
+
+
+    def prefetch(self, tickers, start_date, end_date):
+        """Fetch the missing ranges of `tickers` without reading them back."""
+        start_date = pd.Timestamp(start_date).strftime("%Y-%m-%d")
+        end_date = pd.Timestamp(end_date).strftime("%Y-%m-%d")
+        self._fill_missing(tickers, start_date, end_date)
+
+
+    def missing_ranges(self, ticker, start_date, end_date):
+        """Sub-ranges of [start_date, end_date) not yet fetched for `ticker`."""
+        missing = []
+        cursor = start_date
+        for covered_start, covered_end in self.coverage.get(ticker, []):
+            if covered_end <= cursor:
+                continue
+            if covered_start >= end_date:
+                break
+            if covered_start > cursor:
+                missing.append((cursor, covered_start))
+            cursor = max(cursor, covered_end)
+        if cursor < end_date:
+            missing.append((cursor, end_date))
+        return missing
+
+
+    def _fill_missing(self, tickers, start_date, end_date):
+        # batch tickers that miss exactly the same ranges into one provider call
+        batches = {}
+        for ticker in tickers:
+            for rng in self.missing_ranges(ticker, start_date, end_date):
+                batches.setdefault(rng, []).append(ticker)
+
+        if not batches:
+            return
+
+        jobs = []
+        for (range_start, range_end), symbols in batches.items():
+            print(f"Fetching {len(symbols)} tickers from {range_start} to {range_end}...")
+            jobs += [(chunk, range_start, range_end) for chunk in self.fetcher.chunks(symbols)]
+
+        today = date.today().strftime("%Y-%m-%d")
+
+        def checkpoint(job, bars):
+            # runs on the event loop thread, one chunk at a time
+            symbols, range_start, range_end = job
+            self._write(bars)
+            covered_end = min(range_end, today)
+            if covered_end > range_start:
+                for ticker in symbols:
+                    self._mark_covered(ticker, range_start, covered_end)
+            self._save_coverage()
+
+        self.fetcher.run(jobs, checkpoint)
+
+
+    def _save_coverage(self):
+        tmp_path = self.coverage_path.with_suffix(".tmp")
+        with open(tmp_path, "w") as f:
+            json.dump(self.coverage, f)
+        tmp_path.replace(self.coverage_path)
+
+
+    def _mark_covered(self, ticker, start_date, end_date):
+        ranges = sorted(self.coverage.get(ticker, []) + [[start_date, end_date]])
+        merged = [ranges[0]]
+        for range_start, range_end in ranges[1:]:
+            if range_start <= merged[-1][1]:
+                merged[-1][1] = max(merged[-1][1], range_end)
+            else:
+                merged.append([range_start, range_end])
+        self.coverage[ticker] = merged
+
+
+    def _partition_dir(self, ticker, year):
+        return self.root / f"Ticker={quote(ticker, safe='')}" / f"year={year}"
+
+
+    def _write(self, bars):
+        if bars.empty:
+            return
+        bars = bars[['Date', 'Ticker'] + bar_columns].copy()
+        bars['Date'] = pd.to_datetime(bars['Date'])
+        bars['year'] = bars['Date'].dt.year
+
+        for (ticker, year), part in bars.groupby(['Ticker', 'year']):
+            part_dir = self._partition_dir(ticker, year)
+            part_dir.mkdir(parents=True, exist_ok=True)
+            part_path = part_dir / "part-0.parquet"
+            part = part[['Date'] + bar_columns]
+            if part_path.exists():
+                part = pd.concat([pd.read_parquet(part_path), part])
+            part = part.drop_duplicates('Date', keep='last').sort_values('Date')
+            part.to_parquet(part_path, index=False)
+
+
+    def _read(self, tickers, start_date, end_date, columns=None):
+        columns = bar_columns if columns is None else list(columns)
+        start, end = pd.Timestamp(start_date), pd.Timestamp(end_date)
+
+        if not any(self.root.glob("Ticker=*/year=*/*.parquet")):
+            return pd.DataFrame(columns=['Date', 'Ticker'] + columns)
+
+        filters = [
+            ('Ticker', 'in', list(tickers)),
+            ('year', '>=', start.year),
+            ('year', '<=', end.year),
+            ('Date', '>=', start),
+            ('Date', '<', end),
+        ]
+        data = pd.read_parquet(self.root, engine='pyarrow', columns=['Date', 'Ticker'] + columns, filters=filters)
+        data['Ticker'] = data['Ticker'].astype(str)
+        return data.sort_values(['Date', 'Ticker'], ignore_index=True)
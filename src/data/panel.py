@@ -0,0 +1,150 @@
+import numpy as np
+import pandas as pd
+
+
+class MarketPanel:
+    """
+    Wide (date x ticker) representation of the market data.
+
+    Per-ticker fields (bars, features, predictions) are aligned 2-D arrays sharing one
+    `dates` and one `tickers` index, and date-level series (macro, market indices) are
+    stored once as 1-D arrays instead of being repeated on every ticker row. `mask`
+    marks the (date, ticker) cells that exist in the long format; the "row order" of the
+    panel is the long format's (Date, Ticker) order over those cells.
+    """
+
+    def __init__(self, dates, tickers, mask=None, dtype=np.float32):
+        self.dates = pd.DatetimeIndex(dates)
+        self.tickers = pd.Index(tickers)
+        self.dtype = dtype
+        self.mask = np.ones(self.shape, dtype=bool) if mask is None else mask
+        self.fields = {}
+        self.series = {}
+
+    @property
+    def shape(self):
+        return len(self.dates), len(self.tickers)
+
+    @property
+    def nbytes(self):
+        return self.mask.nbytes \
+            + sum(values.nbytes for values in self.fields.values()) \
+            + sum(values.nbytes for values in self.series.values())
+
+    @classmethod
+    def from_long(cls, df, fields, tickers=None, dtype=np.float32):
+        """Build a panel from long-format rows (Date, Ticker, *fields)."""
+        dates = pd.DatetimeIndex(np.sort(pd.to_datetime(df['Date']).unique()))
+        tickers = pd.Index(np.sort(df['Ticker'].unique()) if tickers is None else tickers)
+
+        date_pos = dates.get_indexer(pd.to_datetime(df['Date']))
+        ticker_pos = tickers.get_indexer(df['Ticker'])
+        keep = ticker_pos >= 0
+        date_pos, ticker_pos = date_pos[keep], ticker_pos[keep]
+
+        mask = np.zeros((len(dates), len(tickers)), dtype=bool)
+        mask[date_pos, ticker_pos] = True
+        panel = cls(dates, tickers, mask, dtype)
+        for name in fields:
+            values = np.full(panel.shape, np.nan, dtype=dtype)
+            values[date_pos, ticker_pos] = df[name].to_numpy()[keep]
+            panel.fields[name] = values
+        return panel
+
+    def __getitem__(self, name):
+        if name in self.fields:
+            return self.fields[name]
+        return self.series[name]
+
+    def __contains__(self, name):
+        return name in self.fields or name in self.series
+
+    def set(self, name, values, dtype=None):
+        self.fields[name] = np.asarray(values, dtype=self.dtype if dtype is None else dtype)
+
+    def set_series(self, name, values):
+        self.series[name] = np.asarray(values, dtype=float)
+
+    def broadcast(self, name):
+        """Field, or date-level series repeated across tickers, as a 2-D array."""
+        if name in self.fields:
+            return self.fields[name]
+        return np.broadcast_to(self.series[name][:, None], self.shape)
+
+    # ===== Long-format row order =====
+
+    def row_values(self, name):
+        """Values of the present cells in long (Date, Ticker) row order."""
+        return self.broadcast(name)[self.mask]
+
+    def row_dates(self):
+        """Date position of each present cell, in long row order."""
+        return np.broadcast_to(np.arange(len(self.dates))[:, None], self.shape)[self.mask]
+
+    def row_tickers(self):
+        """Ticker position of each present cell, in long row order."""
+        return np.broadcast_to(np.arange(len(self.tickers))[None, :], self.shape)[self.mask]
+
+    def from_row_values(self, values, dtype=float):
+        """Scatter long-row-order values back to a 2-D array (missing cells are NaN)."""
+        out = np.full(self.shape, np.nan, dtype=dtype)
+        out[self.mask] = np.asarray(values)
+        return out
+
+    def fill_tickers(self):
+        """
+        bfill then ffill every field along each ticker's own cells and every series along
+        the dates, so a cell is never filled from another ticker.
+        """
+        for name, values in self.fields.items():
+            if np.issubdtype(values.dtype, np.floating):
+                # missing cells are NaN, so filling along the date axis skips them
+                filled = pd.DataFrame(np.where(self.mask, values, np.nan)).bfill().ffill().to_numpy()
+                values[self.mask] = filled[self.mask]
+        for name, values in self.series.items():
+            self.series[name] = pd.Series(values).bfill().ffill().to_numpy()
+
+    def to_long(self, columns=None):
+        """Long-format frame (Date, Ticker, *columns) of the present cells, sorted by (Date, Ticker)."""
+        if columns is None:
+            columns = list(self.fields) + list(self.series)
+        date_pos, ticker_pos = np.nonzero(self.mask)
+        data = {'Date': self.dates[date_pos], 'Ticker': self.tickers[ticker_pos]}
+        for name in columns:
+            data[name] = self.broadcast(name)[date_pos, ticker_pos]
+        return pd.DataFrame(data)
+
+    # ===== Date slicing =====
+
+    def slice_dates(self, selector):
+        """Panel restricted to the dates selected by a boolean mask or slice (arrays are views when possible)."""
+        panel = MarketPanel(self.dates[selector], self.tickers, self.mask[selector], self.dtype)
+        panel.fields = {name: values[selector] for name, values in self.fields.items()}
+        panel.series = {name: values[selector] for name, values in self.series.items()}
+        return panel
+
+    def tail(self, n_dates):
+        return self.slice_dates(slice(max(len(self.dates) - n_dates, 0), None))
+
+    def copy(self, names=None):
+        panel = MarketPanel(self.dates, self.tickers, self.mask.copy(), self.dtype)
+        panel.fields = {name: values.copy() for name, values in self.fields.items() if names is None or name in names}
+        panel.series = {name: values.copy() for name, values in self.series.items() if names is None or name in names}
+        return panel
+
+    def drop(self, names):
+        """Remove fields and series in place, freeing their memory unless another panel shares them."""
+        for name in names:
+            self.fields.pop(name, None)
+            self.series.pop(name, None)
+        return self
+
+    def append(self, other):
+        """Panel with the later dates of `other` appended (same tickers, fields and series)."""
+        if not self.tickers.equals(other.tickers):
+            raise ValueError("Cannot append panels with different tickers")
+        panel = MarketPanel(self.dates.append(other.dates), self.tickers,
+                            np.concatenate([self.mask, other.mask]), self.dtype)
+        panel.fields = {name: np.concatenate([values, other.fields[name]]) for name, values in self.fields.items()}
+        panel.series = {name: np.concatenate([values, other.series[name]]) for name, values in self.series.items()}
+        return panel
@@ -0,0 +1,133 @@
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+
+# Compact in-memory layout of the long-format frames held by the API: dates as int32 day
+# numbers, tickers as a categorical over the panel's tickers (1-2 byte codes).
+
+epoch = np.datetime64("1970-01-01", "D")
+
+
+def day_numbers(dates):
+    """Dates as int32 days since 1970-01-01."""
+    return (pd.DatetimeIndex(dates).values.astype("datetime64[D]") - epoch).astype(np.int32)
+
+
+def from_day_numbers(days):
+    """DatetimeIndex of int day numbers (inverse of day_numbers)."""
+    return pd.DatetimeIndex(epoch + np.asarray(days).astype("timedelta64[D]"))
+
+
+def day_strings(days):
+    """Day numbers as "YYYY-MM-DD" strings, for JSON."""
+    return np.datetime_as_string(epoch + np.asarray(days).astype("timedelta64[D]"), unit="D")
+
+
+def compact_long(panel, columns, dtypes=None):
+    """
+    panel.to_long(columns) with Date as day numbers and Ticker as a categorical, rows in
+    (Date, Ticker) order. `dtypes` optionally casts columns, e.g. {'Target': np.float32}.
+    """
+    dtypes = dtypes or {}
+    date_pos, ticker_pos = np.nonzero(panel.mask)
+    data = {
+        'Date': day_numbers(panel.dates)[date_pos],
+        'Ticker': pd.Categorical.from_codes(ticker_pos, categories=panel.tickers),
+    }
+    for name in columns:
+        values = panel.broadcast(name)[date_pos, ticker_pos]
+        data[name] = values.astype(dtypes[name]) if name in dtypes else values
+    return pd.DataFrame(data)
+
+
+def nbytes(obj):
+    """Memory held by a DataFrame (including strings), a MarketPanel or an array."""
+    if isinstance(obj, pd.DataFrame):
+        return int(obj.memory_usage(index=True, deep=True).sum())
+    if hasattr(obj, "nbytes"):
+        return int(obj.nbytes)
+    return 0
+
+
+# ===== Arrow =====
+
+def to_record_batch(df):
+    """Arrow record batch of a compact frame, NaN kept as NaN (not null) so columns map back zero-copy."""
+    arrays = []
+    for name in df.columns:
+        values = df[name]
+        if isinstance(values.dtype, pd.CategoricalDtype):
+            arrays.append(pa.DictionaryArray.from_arrays(values.cat.codes.to_numpy(), list(map(str, values.cat.categories))))
+        else:
+            arrays.append(pa.array(values.to_numpy()))
+    return pa.RecordBatch.from_arrays(arrays, names=list(map(str, df.columns)))
+
+
+def from_record_batch(batch):
+    """DataFrame over the columns of a (memory-mapped) record batch, without copying them."""
+    columns = {}
+    for name, values in zip(batch.schema.names, batch.columns):
+        if pa.types.is_dictionary(values.type):
+            columns[name] = pd.Categorical.from_codes(values.indices.to_numpy(zero_copy_only=True),
+                                                      categories=values.dictionary.to_pylist())
+        else:
+            columns[name] = values.to_numpy(zero_copy_only=True)
+    return pd.DataFrame(columns, copy=False)
+
+
+# ===== Index =====
+
+class TickerDateIndex:
+    """
+    (Ticker, Date) index of a compact long frame sorted by ticker code then date, as
+    PredictionBuilder.daily_returns_df is: the rows of ticker code i are
+    offsets[i]:offsets[i + 1], with ascending dates, so selecting tickers and a date
+    range takes two binary searches per ticker instead of a scan of the frame.
+    """
+
+    def __init__(self, df):
+        self.tickers = pd.Index(df['Ticker'].cat.categories)
+        self.offsets = np.searchsorted(df['Ticker'].cat.codes.to_numpy(), np.arange(len(self.tickers) + 1))
+        self.days = df['Date'].to_numpy()
+
+    def codes(self, tickers=None):
+        """Ticker codes of `tickers` (all when None) in row order; raises KeyError for unknown tickers."""
+        if tickers is None:
+            return np.arange(len(self.tickers))
+        codes = self.tickers.get_indexer(tickers)
+        if (codes < 0).any():
+            raise KeyError(f"Unknown tickers: {[ticker for ticker, code in zip(tickers, codes) if code < 0]}")
+        return np.unique(codes)
+
+    def rows(self, code, start=None, end=None):
+        """Row range (lo, hi) of ticker `code` between day numbers `start` and `end`, inclusive."""
+        lo, hi = self.offsets[code], self.offsets[code + 1]
+        days = self.days[lo:hi]
+        first = np.searchsorted(days, start, side='left') if start is not None else 0
+        last = np.searchsorted(days, end, side='right') if end is not None else hi - lo
+        return lo + first, lo + last
+
+    def page(self, tickers=None, start=None, end=None, after=None, limit=1000):
+        """
+        Positions of up to `limit` rows of `tickers` between `start` and `end`, from the
+        (ticker code, day) `after` on. Returns (positions, next) where next is the
+        (ticker code, day) the following page starts from, or None after the last row.
+        """
+        positions = []
+        remaining = limit
+        for code in self.codes(tickers):
+            if after is not None and code < after[0]:
+                continue
+            lo, hi = self.rows(code, start, end)
+            if after is not None and code == after[0]:
+                lo = max(lo, self.rows(code, after[1])[0])
+            if lo >= hi:
+                continue
+            if remaining == 0:
+                return np.concatenate(positions), (int(code), int(self.days[lo]))
+            taken = min(hi - lo, remaining)
+            positions.append(np.arange(lo, lo + taken))
+            remaining -= taken
+            if taken < hi - lo:
+                return np.concatenate(positions), (int(code), int(self.days[lo + taken]))
+        return (np.concatenate(positions) if positions else np.arange(0)), None
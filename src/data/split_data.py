@@ -0,0 +1,63 @@
+import yaml
+from pathlib import Path
+import numpy as np
+import pandas as pd
+from data.split_helpers import label_rows, purged_split, save_split
+from data.schema import day_strings
+from features.feature_helpers import get_feature_columns
+from instrumentation import stage
+
+# run from src/: python -m data.split_data
+
+project_root = Path(__file__).resolve().parents[2]
+config_path = project_root / "config.yaml"
+
+with open(config_path, "r") as f:
+    config = yaml.safe_load(f)
+
+data_with_fts_path = project_root / config["data"]["processed"] / "data_with_fts.parquet"
+split_path = project_root / config["data"]["split"]
+
+
+def main():
+    """Label the rows with features and save the purged train/test split as .npy arrays."""
+    split = config['split']
+    horizons = split['horizons']
+    target = horizons.index(split['target_horizon'])
+    feature_columns = get_feature_columns(config)
+
+    print("Loading data with features")
+    df = pd.read_parquet(data_with_fts_path)
+
+    print(f"Labelling {horizons}-day forward returns...")
+    with stage("label", rows=len(df)):
+        labelled = label_rows(df, feature_columns, horizons, config['features']['threshold_3d'], split['feature_lag'])
+
+    # rows with a known target and complete lagged features
+    usable = (labelled['labels'][:, target] >= 0) & np.isfinite(labelled['X']).all(axis=1)
+
+    # the last test_split of the dates is the test block
+    unique_dates = np.unique(labelled['dates'][usable])
+    day_index = np.searchsorted(unique_dates, labelled['dates'])
+    test_start = int(len(unique_dates) * (1 - config['evaluation']['test_split']))
+    train, test = purged_split(day_index, test_start, len(unique_dates), max(horizons), split['embargo_days'])
+
+    with stage("save_split", rows=int(usable.sum())):
+        metadata = {
+            'feature_columns': feature_columns,
+            'horizons': horizons,
+            'target_horizon': split['target_horizon'],
+            'threshold': config['features']['threshold_3d'],
+            'feature_lag': split['feature_lag'],
+            'embargo_days': split['embargo_days'],
+            'test_start': str(day_strings(unique_dates[test_start])),
+            'test_end': str(day_strings(unique_dates[-1])),
+        }
+        save_split(split_path, labelled, {'train': train & usable, 'test': test & usable}, metadata)
+
+    print(f"Saved {int((train & usable).sum())} train and {int((test & usable).sum())} test rows "
+          f"(test from {metadata['test_start']}) to {split_path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,119 @@
+import json
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+from data.schema import day_numbers
+
+
+# ===== Labelling =====
+
+def forward_returns(close, codes, horizons):
+    """
+    (rows x horizons) forward returns close[t + h] / close[t] - 1 of rows sorted by
+    (ticker code, date), NaN where the ticker has fewer than h later rows. Same values
+    as data_helpers.add_target for each horizon, without a groupby per horizon.
+    """
+    out = np.full((len(close), len(horizons)), np.nan, dtype=np.float32)
+    for j, h in enumerate(horizons):
+        if h >= len(close):
+            continue
+        same_ticker = codes[h:] == codes[:-h]
+        out[:-h, j] = np.where(same_ticker, close[h:] / close[:-h] - 1, np.nan)
+    return out
+
+
+def class_labels(returns, threshold):
+    """0 (down), 1 (flat) or 2 (up) per return, flat within +-threshold; -1 where the return is unknown."""
+    labels = np.where(returns > threshold, 2, np.where(returns < -threshold, 0, 1)).astype(np.int8)
+    labels[np.isnan(returns)] = -1
+    return labels
+
+
+def lag_features(X, codes, lag=1):
+    """Features of each row `lag` dates earlier for the same ticker (rows sorted by ticker code, date), NaN before."""
+    if lag == 0:
+        return X.copy()
+    out = np.full(X.shape, np.nan, dtype=X.dtype)
+    out[lag:] = X[:-lag]
+    out[lag:][codes[lag:] != codes[:-lag]] = np.nan
+    return out
+
+
+def label_rows(df, feature_columns, horizons, threshold, lag=1):
+    """
+    Labelled rows of a long frame (Date, Ticker, Close, *feature_columns), in (Date, Ticker)
+    order: day numbers, ticker codes (into `ticker_names`), Close, the features lagged by `lag`
+    dates (a row only sees what was known before its date), the forward returns of every
+    horizon and their down/flat/up classes. Rows are sorted by (ticker, date) once and
+    every horizon is computed on that order.
+    """
+    tickers = pd.Categorical(df['Ticker'])
+    codes = tickers.codes.astype(np.int16)
+    days = day_numbers(df['Date'])
+    close = df['Close'].to_numpy(dtype=float)
+    X = df[feature_columns].to_numpy(dtype=np.float32)
+
+    by_ticker = np.lexsort((days, codes))
+    returns = forward_returns(close[by_ticker], codes[by_ticker], horizons)
+    lagged = lag_features(X[by_ticker], codes[by_ticker], lag)
+
+    # back to (Date, Ticker) order, which the test predictions and trading simulation use
+    by_date = np.lexsort((codes, days))
+    position = np.empty_like(by_ticker)
+    position[by_ticker] = np.arange(len(by_ticker))
+    from_ticker_order = position[by_date]
+    returns = returns[from_ticker_order]
+    return {
+        'dates': days[by_date],
+        'tickers': codes[by_date],
+        'ticker_names': list(map(str, tickers.categories)),
+        'close': close[by_date],
+        'X': lagged[from_ticker_order],
+        'returns': returns,
+        'labels': class_labels(returns, threshold),
+    }
+
+
+# ===== Time split =====
+
+def purged_split(day_index, test_start, test_end, horizon, embargo=0):
+    """
+    Train and test row masks for a test block of dates [test_start, test_end), given each
+    row's date position `day_index`. Training rows whose label window (date + `horizon`
+    dates) reaches into the block are purged, and the `embargo` dates after the block,
+    whose lagged and rolling features overlap it, are dropped.
+    """
+    test = (day_index >= test_start) & (day_index < test_end)
+    train = (day_index + horizon < test_start) | (day_index >= test_end + embargo)
+    return train, test
+
+
+# ===== Arrays =====
+
+split_arrays = ['X', 'y', 'returns', 'dates', 'tickers', 'close']
+
+
+def save_split(path, labelled, masks, metadata):
+    """Save the rows of each mask ({'train': mask, 'test': mask}) as <array>_<name>.npy files and split.json."""
+    path = Path(path)
+    path.mkdir(parents=True, exist_ok=True)
+    arrays = {**labelled, 'y': labelled['labels']}
+    for name, mask in masks.items():
+        for array in split_arrays:
+            np.save(path / f"{array}_{name}.npy", np.ascontiguousarray(arrays[array][mask]))
+    with open(path / "split.json", "w") as f:
+        json.dump({**metadata, 'tickers': labelled['ticker_names'],
+                   'rows': {name: int(mask.sum()) for name, mask in masks.items()}}, f, indent=2)
+
+
+def load_split(path, mmap_mode='r'):
+    """(arrays, metadata) of a saved split; the arrays are memory-mapped unless mmap_mode is None."""
+    path = Path(path)
+    with open(path / "split.json", "r") as f:
+        metadata = json.load(f)
+    arrays = {}
+    for name in metadata['rows']:
+        for array in split_arrays:
+            arrays[f"{array}_{name}"] = np.load(path / f"{array}_{name}.npy", mmap_mode=mmap_mode)
+    return arrays, metadata
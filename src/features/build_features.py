@@ -1,7 +1,9 @@
 import yaml
 from pathlib import Path
 import pandas as pd
-from feature_helpers import create_features
+from features.feature_helpers import get_feature_columns
+from features.feature_cache import get_feature_cache
+from instrumentation import stage
 
 project_root = Path(__file__).resolve().parents[2]
 config_path = project_root / "config.yaml"
@@ -9,12 +11,19 @@ config_path = project_root / "config.yaml"
 with open(config_path, "r") as f:
     config = yaml.safe_load(f)
 
-interim_data_path = raw_data_path = project_root / config["data"]["interim"] / "data_with_target.csv"
-processed_data_path = raw_data_path = project_root / config["data"]["processed"] / "data_with_fts.csv"
+interim_data_path = raw_data_path = project_root / config["data"]["interim"] / "data_with_target.parquet"
+processed_data_path = raw_data_path = project_root / config["data"]["processed"] / "data_with_fts.parquet"
 
 
-df = pd.read_csv(interim_data_path, index_col=0)
+def main():
+    """Compute the configured features and save them."""
+    df = pd.read_parquet(interim_data_path)
 
-df = create_features(df)
+    with stage("create_features", rows=len(df)):
+        df = get_feature_cache().features(df, get_feature_columns(config))
 
-df.to_csv(processed_data_path)
\ No newline at end of file
+    df.to_parquet(processed_data_path)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,137 @@
+import hashlib
+import json
+import os
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import yaml
+from data import panel as panel_module
+from features import feature_helpers
+from features.feature_helpers import create_features, create_panel_features
+
+project_root = Path(__file__).resolve().parents[2]
+config_path = project_root / "config.yaml"
+
+with open(config_path, "r") as f:
+    config = yaml.safe_load(f)
+
+
+# modules whose code shapes the cached values: the feature definitions and kernels, and
+# the panel (per-ticker filling, float32 storage)
+feature_modules = [feature_helpers, panel_module]
+
+
+def code_version():
+    """Hash of the feature code and config, so editing either invalidates every cached entry."""
+    digest = hashlib.sha256()
+    for module in feature_modules:
+        digest.update(Path(module.__file__).read_bytes())
+    digest.update(json.dumps(config['features'], sort_keys=True, default=str).encode())
+    return digest.hexdigest()[:16]
+
+
+class FeatureCache:
+    """
+    Content-addressed cache of computed features, one file per entry under `root`.
+
+    Entries are keyed by a hash of the ticker set, date range, requested columns, the
+    feature code version and a fingerprint of the input values, so a hit is always the
+    exact result create_features / create_panel_features would return. Long frames are
+    stored as Parquet and panels as uncompressed .npz arrays. Hits refresh the file's
+    mtime, and the least recently used entries are evicted once the cache grows past
+    `max_bytes`.
+    """
+
+    def __init__(self, root, max_bytes):
+        self.root = Path(root)
+        self.max_bytes = max_bytes
+        self.root.mkdir(parents=True, exist_ok=True)
+        self.version = code_version()
+
+    def key(self, tickers, dates, columns, fingerprint):
+        spec = {
+            'tickers': sorted(map(str, tickers)),
+            'start': str(dates.min()) if len(dates) else None,
+            'end': str(dates.max()) if len(dates) else None,
+            'columns': list(columns),
+            'code_version': self.version,
+            'data': fingerprint,
+        }
+        return hashlib.sha256(json.dumps(spec, sort_keys=True).encode()).hexdigest()
+
+    # ===== Long frames =====
+
+    def features(self, df, columns):
+        """create_features(df, columns), served from the cache when the same inputs were seen before."""
+        fingerprint = hashlib.sha256(pd.util.hash_pandas_object(df).to_numpy().tobytes()).hexdigest()
+        fingerprint += hashlib.sha256(json.dumps(list(map(str, df.columns))).encode()).hexdigest()
+        path = self.root / f"{self.key(df['Ticker'].unique(), df['Date'], columns, fingerprint)}.parquet"
+
+        if path.exists():
+            print("Loading features from cache...")
+            self._touch(path)
+            return pd.read_parquet(path)
+
+        df = create_features(df, columns)
+        self._put(path, lambda tmp_path: df.to_parquet(tmp_path))
+        return df
+
+    # ===== Panels =====
+
+    def panel_features(self, panel, columns):
+        """create_panel_features(panel, columns), restoring the panel's fields from the cache on a hit."""
+        digest = hashlib.sha256()
+        for values in [panel.dates.asi8, panel.mask] + [panel.fields[name] for name in sorted(panel.fields)] \
+                + [panel.series[name] for name in sorted(panel.series)]:
+            digest.update(np.ascontiguousarray(values).tobytes())
+        digest.update(json.dumps([sorted(panel.fields), sorted(panel.series)]).encode())
+        path = self.root / f"{self.key(panel.tickers, panel.dates, columns, digest.hexdigest())}.npz"
+
+        if path.exists():
+            print("Loading features from cache...")
+            self._touch(path)
+            with np.load(path) as cached:
+                panel.fields = {name[len('field:'):]: cached[name] for name in cached.files if name.startswith('field:')}
+                panel.series = {name[len('series:'):]: cached[name] for name in cached.files if name.startswith('series:')}
+            return panel
+
+        create_panel_features(panel, columns)
+        arrays = {f'field:{name}': values for name, values in panel.fields.items()}
+        arrays.update({f'series:{name}': values for name, values in panel.series.items()})
+        self._put(path, lambda tmp_path: np.savez(tmp_path, **arrays))
+        return panel
+
+    # ===== Storage =====
+
+    def _touch(self, path):
+        os.utime(path)
+
+    def _put(self, path, write):
+        # write then rename, so concurrent readers never see a partial entry
+        tmp_path = path.with_name(f"tmp-{os.getpid()}-{path.name}")
+        with open(tmp_path, "wb") as f:
+            write(f)
+        tmp_path.replace(path)
+        self._evict()
+
+    def _evict(self):
+        entries = sorted((entry.stat().st_mtime, entry.stat().st_size, entry)
+                         for entry in self.root.iterdir() if entry.suffix in ('.parquet', '.npz'))
+        total = sum(size for _, size, _ in entries)
+        for _, size, entry in entries:
+            if total <= self.max_bytes:
+                break
+            entry.unlink(missing_ok=True)
+            total -= size
+
+
+_cache = None
+
+
+def get_feature_cache():
+    """Feature cache at the configured path, created on first use."""
+    global _cache
+    if _cache is None:
+        _cache = FeatureCache(project_root / config["data"]["feature_cache"], config["cache"]["feature_max_mb"] << 20)
+    return _cache
@@ -1,71 +1,463 @@
-import talib
-
-
-def create_features(df):
-    # ===== Macro features =====
-    df['VIX_ret'] = df['VIX'].pct_change()
-    df['WTI_ret'] = df['WTI_Oil'].pct_change()
-    df['TNX_ret'] = df['US10Y'].pct_change()
-    df['VIX_5d_mean'] = df['VIX'].rolling(5).mean()
-    df['WTI_5d_std'] = df['WTI_Oil'].rolling(5).std()
-
-    # ===== Market indices features =====
-    market_indices = ["GSPC", "NDX", "RUT", "DJI"]
-    for idx in market_indices:
-        df[f'{idx}_return_1d'] = df[idx].pct_change()
-        df[f'{idx}_return_5d'] = df[idx].pct_change(5)
-
-    # ===== Stock returns =====
-    for period in [1, 3, 5, 10]:
-        df[f'return_{period}d'] = df.groupby('Ticker')['Close'].pct_change(period)
-
-    # ===== Rolling volatility =====
-    df['rolling_std_5'] = df.groupby('Ticker')['Close'].transform(lambda x: x.rolling(5).std())
-    df['rolling_std_10'] = df.groupby('Ticker')['Close'].transform(lambda x: x.rolling(10).std())
-
-    # ===== Moving averages and ratios =====
-    df['ma_5'] = df.groupby('Ticker')['Close'].transform(lambda x: x.rolling(5).mean())
-    df['ma_20'] = df.groupby('Ticker')['Close'].transform(lambda x: x.rolling(20).mean())
-    df['price_ma5_ratio'] = df['Close'] / df['ma_5']
-    df['price_ma20_ratio'] = df['Close'] / df['ma_20']
-    df['MA5_MA20_diff'] = df['ma_5'] - df['ma_20']
-    df['MA5_MA20_ratio'] = df['ma_5'] / df['ma_20']
-
-    # ===== Volume features =====
-    df['vol_MA5'] = df.groupby('Ticker')['Volume'].transform(lambda x: x.rolling(5).mean())
-    df['vol_MA20'] = df.groupby('Ticker')['Volume'].transform(lambda x: x.rolling(20).mean())
-    df['vol_ratio_5'] = df['Volume'] / df['vol_MA5']
-    df['vol_ratio_20'] = df['Volume'] / df['vol_MA20']
-    df['price_volume'] = df['return_1d'] * df['Volume']
-
-    # ===== Momentum indicators =====
-    df['rsi'] = df.groupby('Ticker')['Close'].transform(lambda x: talib.RSI(x.values, timeperiod=14))
-    df['macd'] = df.groupby('Ticker')['Close'].transform(lambda x: x.ewm(span=12, adjust=False).mean() - x.ewm(span=26, adjust=False).mean())
-    df['macd_signal'] = df.groupby('Ticker')['macd'].transform(lambda x: x.ewm(span=9, adjust=False).mean())
-    df['macd_hist'] = df['macd'] - df['macd_signal']
-    df.drop(columns=['macd_signal'], inplace=True)
-
-    # ===== True Range & ATR =====
-    df['tr'] = df['High'] - df['Low']
-    df['tr1'] = abs(df['High'] - df['Close'].shift(1))
-    df['tr2'] = abs(df['Low'] - df['Close'].shift(1))
-    df['true_range'] = df[['tr', 'tr1', 'tr2']].max(axis=1)
-    df['ATR_14'] = df.groupby('Ticker')['true_range'].transform(lambda x: x.rolling(14).mean())
-    df['ATR_7'] = df.groupby('Ticker')['true_range'].transform(lambda x: x.rolling(7).mean())
-    df.drop(columns=['tr','tr1','tr2','true_range'], inplace=True)
-
-    # ===== Bollinger Bands =====
-    ma20 = df.groupby('Ticker')['Close'].transform(lambda x: x.rolling(20).mean())
-    std20 = df.groupby('Ticker')['Close'].transform(lambda x: x.rolling(20).std())
-    df['BB_width'] = (2 * std20) / ma20
-
-    # ===== Price Range Features =====
-    df['range_pct'] = (df['High'] - df['Low']) / df['Close']
-    df['OC_pct'] = (df['Close'] - df['Open']) / df['Close']
-    df['range_5d'] = df.groupby('Ticker').apply(lambda x: (x['High'].rolling(5).max() - x['Low'].rolling(5).min()) / x['Close']).reset_index(level=0, drop=True)
+import numpy as np
+import pandas as pd
+from numpy.lib.stride_tricks import sliding_window_view
+
+
+# rows per block when reducing sliding windows, bounds the temporary (block x window) arrays
+window_block_size = 1 << 16
+
+# feature groups in config.yaml, in the order their columns are fed to the model
+feature_groups = ['returns', 'rolling_volatility', 'moving_avg', 'momentum_indicators', 'macro_features',
+                  'volume_features', 'market_index_features', 'atr', 'bb', 'price_range']
+
+
+def get_feature_columns(config):
+    """Model feature columns listed in the `features:` section of the config (empty groups are disabled)."""
+    return [column for group in feature_groups for column in config['features'][group]]
+
+
+def create_features(df, columns=None):
+    """
+    Add feature columns to `df` (in place). Only `columns` and the nodes they depend on are
+    computed; all registered features are added when `columns` is None.
+    """
+    if columns is None:
+        columns = [name for name in feature_registry if not name.startswith('_')]
+
+    context = FeatureContext(df)
+    for node in resolve_features(columns):
+        context.values[node.name] = node.func(context)
+
+    for name in columns:
+        df[name] = context.kernel.unsort(context.values[name])
 
     # ===== Fill NaNs =====
-    df.bfill(inplace=True)
-    df.ffill(inplace=True)
+    # within each ticker, so a row never takes another ticker's values
+    floats = df.select_dtypes('floating').columns
+    df[floats] = context.kernel.unsort(context.kernel.fill(context.kernel.sort(df[floats])))
 
     return df
+
+
+def create_panel_features(panel, columns=None):
+    """
+    create_features on a MarketPanel: features are added as 2-D fields, computed along the
+    date axis for all tickers at once over each ticker's own bars (dates a ticker has no bar
+    for are skipped, like rows missing from the long frame).
+    """
+    if columns is None:
+        columns = [name for name in feature_registry if not name.startswith('_')]
+
+    context = PanelContext(panel)
+    for node in resolve_features(columns):
+        context.values[node.name] = node.func(context)
+
+    for name in columns:
+        panel.set(name, context.values[name])
+
+    panel.fill_tickers()
+
+    return panel
+
+
+# ===== Feature registry =====
+
+class FeatureNode:
+
+    def __init__(self, name, func, requires):
+        self.name = name
+        self.func = func
+        self.requires = requires
+
+
+feature_registry = {}
+
+
+def feature(name, requires=()):
+    """
+    Register `func(context)` as the node computing `name`, in (Ticker, Date) order.
+    Names starting with '_' are intermediates that are never added to the frame.
+    """
+    def register(func):
+        feature_registry[name] = FeatureNode(name, func, tuple(requires))
+        return func
+    return register
+
+
+def resolve_features(columns):
+    """Nodes needed for `columns`, dependencies first."""
+    ordered, seen = [], set()
+
+    def visit(name):
+        if name in seen:
+            return
+        if name not in feature_registry:
+            raise KeyError(f"Unknown feature: {name}")
+        seen.add(name)
+        node = feature_registry[name]
+        for dependency in node.requires:
+            visit(dependency)
+        ordered.append(node)
+
+    for name in columns:
+        visit(name)
+    return ordered
+
+
+class FeatureContext:
+    """Values computed so far for one long-format frame, all in the kernel's (Ticker, Date) order."""
+
+    def __init__(self, df):
+        self.df = df
+        self.kernel = TickerKernel(df)
+        self.values = {}
+        self._columns = {}
+
+    def __getitem__(self, name):
+        return self.values[name]
+
+    def column(self, name):
+        """Raw frame column, sorted by (Ticker, Date)."""
+        if name not in self._columns:
+            self._columns[name] = self.kernel.sort(self.df[name])
+        return self._columns[name]
+
+    def row_series(self, name):
+        """Column in the frame's row order, for features that are not computed per ticker."""
+        return self.df[name]
+
+    def row_order(self, values):
+        """Sort a result computed over the frame's row order (not per ticker)."""
+        return self.kernel.sort(values)
+
+
+class PanelContext:
+    """Values computed so far for one MarketPanel, all as (date x ticker) arrays."""
+
+    def __init__(self, panel):
+        self.panel = panel
+        self.kernel = PanelKernel(panel.mask)
+        self.values = {}
+
+    def __getitem__(self, name):
+        return self.values[name]
+
+    def column(self, name):
+        return self.panel.broadcast(name).astype(float)
+
+    def row_series(self, name):
+        return pd.Series(self.panel.row_values(name), dtype=float)
+
+    def row_order(self, values):
+        return self.panel.from_row_values(values)
+
+
+# ===== Macro features =====
+# computed over the frame's row order, as before
+
+def _register_row_order_feature(name, column, func):
+    feature(name)(lambda ctx: ctx.row_order(func(ctx.row_series(column))))
+
+
+_register_row_order_feature('VIX_ret', 'VIX', lambda x: x.pct_change())
+_register_row_order_feature('WTI_ret', 'WTI_Oil', lambda x: x.pct_change())
+_register_row_order_feature('TNX_ret', 'US10Y', lambda x: x.pct_change())
+_register_row_order_feature('VIX_5d_mean', 'VIX', lambda x: x.rolling(5).mean())
+_register_row_order_feature('WTI_5d_std', 'WTI_Oil', lambda x: x.rolling(5).std())
+
+# ===== Market indices features =====
+for _idx in ["GSPC", "NDX", "RUT", "DJI"]:
+    _register_row_order_feature(f'{_idx}_return_1d', _idx, lambda x: x.pct_change())
+    _register_row_order_feature(f'{_idx}_return_5d', _idx, lambda x: x.pct_change(5))
+
+
+# ===== Stock returns =====
+
+@feature('_filled_close')
+def _filled_close(ctx):
+    return ctx.kernel.ffill(ctx.column('Close'))
+
+
+def _register_return(period):
+    feature(f'return_{period}d', requires=['_filled_close'])(
+        lambda ctx: ctx['_filled_close'] / ctx.kernel.shift(ctx['_filled_close'], period) - 1)
+
+
+for _period in [1, 3, 5, 10]:
+    _register_return(_period)
+
+
+# ===== Rolling volatility =====
+# the std nodes reuse the rolling mean of the same window
+
+@feature('_close_mean_5')
+def _close_mean_5(ctx):
+    return ctx.kernel.rolling_mean(ctx.column('Close'), 5)
+
+
+@feature('_close_mean_10')
+def _close_mean_10(ctx):
+    return ctx.kernel.rolling_mean(ctx.column('Close'), 10)
+
+
+@feature('rolling_std_5', requires=['_close_mean_5'])
+def _rolling_std_5(ctx):
+    return ctx.kernel.rolling_std(ctx.column('Close'), 5, ctx['_close_mean_5'])
+
+
+@feature('rolling_std_10', requires=['_close_mean_10'])
+def _rolling_std_10(ctx):
+    return ctx.kernel.rolling_std(ctx.column('Close'), 10, ctx['_close_mean_10'])
+
+
+# ===== Moving averages and ratios =====
+
+@feature('ma_5', requires=['_close_mean_5'])
+def _ma_5(ctx):
+    return ctx['_close_mean_5']
+
+
+@feature('ma_20')
+def _ma_20(ctx):
+    return ctx.kernel.rolling_mean(ctx.column('Close'), 20)
+
+
+@feature('price_ma5_ratio', requires=['ma_5'])
+def _price_ma5_ratio(ctx):
+    return ctx.column('Close') / ctx['ma_5']
+
+
+@feature('price_ma20_ratio', requires=['ma_20'])
+def _price_ma20_ratio(ctx):
+    return ctx.column('Close') / ctx['ma_20']
+
+
+@feature('MA5_MA20_diff', requires=['ma_5', 'ma_20'])
+def _ma5_ma20_diff(ctx):
+    return ctx['ma_5'] - ctx['ma_20']
+
+
+@feature('MA5_MA20_ratio', requires=['ma_5', 'ma_20'])
+def _ma5_ma20_ratio(ctx):
+    return ctx['ma_5'] / ctx['ma_20']
+
+
+# ===== Volume features =====
+
+@feature('vol_MA5')
+def _vol_ma5(ctx):
+    return ctx.kernel.rolling_mean(ctx.column('Volume'), 5)
+
+
+@feature('vol_MA20')
+def _vol_ma20(ctx):
+    return ctx.kernel.rolling_mean(ctx.column('Volume'), 20)
+
+
+@feature('vol_ratio_5', requires=['vol_MA5'])
+def _vol_ratio_5(ctx):
+    return ctx.column('Volume') / ctx['vol_MA5']
+
+
+@feature('vol_ratio_20', requires=['vol_MA20'])
+def _vol_ratio_20(ctx):
+    return ctx.column('Volume') / ctx['vol_MA20']
+
+
+@feature('price_volume', requires=['return_1d'])
+def _price_volume(ctx):
+    return ctx['return_1d'] * ctx.column('Volume')
+
+
+# ===== Momentum indicators =====
+
+@feature('rsi')
+def _rsi(ctx):
+    import talib
+    return ctx.kernel.per_ticker(ctx.column('Close'), lambda x: talib.RSI(x, timeperiod=14))
+
+
+@feature('macd')
+def _macd(ctx):
+    close = ctx.column('Close')
+    return ctx.kernel.ewm_mean(close, 12) - ctx.kernel.ewm_mean(close, 26)
+
+
+@feature('macd_hist', requires=['macd'])
+def _macd_hist(ctx):
+    return ctx['macd'] - ctx.kernel.ewm_mean(ctx['macd'], 9)
+
+
+# ===== True Range & ATR =====
+
+@feature('_true_range')
+def _true_range(ctx):
+    # note: the previous close is taken in row order, as before
+    high, low = ctx.row_series('High'), ctx.row_series('Low')
+    prev_close = ctx.row_series('Close').shift(1)
+    true_range = pd.concat([
+        high - low,
+        abs(high - prev_close),
+        abs(low - prev_close),
+    ], axis=1).max(axis=1)
+    return ctx.row_order(true_range)
+
+
+@feature('ATR_14', requires=['_true_range'])
+def _atr_14(ctx):
+    return ctx.kernel.rolling_mean(ctx['_true_range'], 14)
+
+
+@feature('ATR_7', requires=['_true_range'])
+def _atr_7(ctx):
+    return ctx.kernel.rolling_mean(ctx['_true_range'], 7)
+
+
+# ===== Bollinger Bands =====
+
+@feature('_close_std_20', requires=['ma_20'])
+def _close_std_20(ctx):
+    return ctx.kernel.rolling_std(ctx.column('Close'), 20, ctx['ma_20'])
+
+
+@feature('BB_width', requires=['ma_20', '_close_std_20'])
+def _bb_width(ctx):
+    return (2 * ctx['_close_std_20']) / ctx['ma_20']
+
+
+# ===== Price Range Features =====
+
+@feature('range_pct')
+def _range_pct(ctx):
+    return (ctx.column('High') - ctx.column('Low')) / ctx.column('Close')
+
+
+@feature('OC_pct')
+def _oc_pct(ctx):
+    return (ctx.column('Close') - ctx.column('Open')) / ctx.column('Close')
+
+
+@feature('range_5d')
+def _range_5d(ctx):
+    high_5d = ctx.kernel.rolling_reduce(ctx.column('High'), 5, np.max)
+    low_5d = ctx.kernel.rolling_reduce(ctx.column('Low'), 5, np.min)
+    return (high_5d - low_5d) / ctx.column('Close')
+
+
+class TickerKernel:
+    """
+    Sorts a long-format frame once by (Ticker, Date) so every ticker is a contiguous
+    slice, then computes per-ticker rolling/shift/EWM features on flat NumPy arrays.
+    Results match `groupby('Ticker').transform(...)` on the original frame up to float
+    rounding (the two-pass rolling std avoids the drift of pandas' online algorithm).
+    """
+
+    def __init__(self, df):
+        ticker_codes, _ = pd.factorize(df['Ticker'], sort=True)
+        date_codes, _ = pd.factorize(df['Date'], sort=True)
+        self.order = np.lexsort((date_codes, ticker_codes))
+        self.inverse = np.empty_like(self.order)
+        self.inverse[self.order] = np.arange(len(self.order))
+        self._set_slices(ticker_codes[self.order])
+
+    def _set_slices(self, sorted_codes):
+        self.starts = np.flatnonzero(np.r_[True, sorted_codes[1:] != sorted_codes[:-1]]) if len(sorted_codes) else np.array([], dtype=int)
+        self.ends = np.r_[self.starts[1:], len(sorted_codes)]
+        # position of each sorted row within its ticker slice
+        self.pos = np.arange(len(sorted_codes)) - np.repeat(self.starts, self.ends - self.starts)
+        self.codes = np.repeat(np.arange(len(self.starts)), self.ends - self.starts)
+
+    def sort(self, values):
+        return np.asarray(values, dtype=float)[self.order]
+
+    def unsort(self, values):
+        return values[self.inverse]
+
+    def shift(self, values, periods):
+        out = np.full(len(values), np.nan)
+        out[periods:] = values[:-periods]
+        out[self.pos < periods] = np.nan
+        return out
+
+    def ffill(self, values):
+        return pd.Series(values).groupby(self.codes).ffill().to_numpy()
+
+    def ewm_mean(self, values, span):
+        return pd.Series(values).groupby(self.codes).ewm(span=span, adjust=False).mean().to_numpy()
+
+    def fill(self, values):
+        """bfill then ffill within each ticker, for 1-D values or the columns of 2-D values."""
+        frame = pd.DataFrame(values)
+        filled = frame.groupby(self.codes).bfill().groupby(self.codes).ffill().to_numpy()
+        return filled.reshape(np.shape(values))
+
+    def per_ticker(self, values, func):
+        out = np.empty(len(values))
+        for start, end in zip(self.starts, self.ends):
+            out[start:end] = func(values[start:end])
+        return out
+
+    def rolling_reduce(self, values, window, func):
+        out = np.full(len(values), np.nan)
+        if len(values) >= window:
+            windows = sliding_window_view(values, window)
+            for block in range(0, len(windows), window_block_size):
+                out[window - 1 + block:window - 1 + block + window_block_size] = func(windows[block:block + window_block_size], axis=1)
+        # windows that reach back into the previous ticker
+        out[self.pos < window - 1] = np.nan
+        return out
+
+    def rolling_mean(self, values, window):
+        return self.rolling_reduce(values, window, np.mean)
+
+    def rolling_std(self, values, window, mean):
+        """Two-pass sample std (ddof=1) around the already computed rolling `mean` of the same window."""
+        var = np.full(len(values), np.nan)
+        if len(values) >= window:
+            windows = sliding_window_view(values, window)
+            for block in range(0, len(windows), window_block_size):
+                chunk = windows[block:block + window_block_size]
+                target = slice(window - 1 + block, window - 1 + block + len(chunk))
+                var[target] = ((chunk - mean[target, None]) ** 2).sum(axis=1) / (window - 1)
+        var[self.pos < window - 1] = np.nan
+        return np.sqrt(var)
+
+
+class PanelKernel(TickerKernel):
+    """
+    TickerKernel operations on (date x ticker) arrays. Each ticker's present cells (the
+    panel mask) are compacted into one contiguous slice before a window, shift or EWM is
+    applied, so they run over the ticker's own bars like the long path instead of over
+    calendar dates; missing cells come back as NaN.
+    """
+
+    def __init__(self, mask):
+        self.mask = mask
+        # ticker-major, so the compacted cells are in (Ticker, Date) order
+        self._set_slices(np.repeat(np.arange(mask.shape[1]), mask.sum(axis=0)))
+
+    def compact(self, values):
+        return np.asarray(values, dtype=float).T[self.mask.T]
+
+    def expand(self, values):
+        out = np.full(self.mask.shape, np.nan)
+        out.T[self.mask.T] = values
+        return out
+
+    def shift(self, values, periods):
+        return self.expand(super().shift(self.compact(values), periods))
+
+    def ffill(self, values):
+        return self.expand(super().ffill(self.compact(values)))
+
+    def ewm_mean(self, values, span):
+        return self.expand(super().ewm_mean(self.compact(values), span))
+
+    def per_ticker(self, values, func):
+        return self.expand(super().per_ticker(self.compact(values), func))
+
+    def rolling_reduce(self, values, window, func):
+        return self.expand(super().rolling_reduce(self.compact(values), window, func))
+
+    def rolling_std(self, values, window, mean):
+        return self.expand(super().rolling_std(self.compact(values), window, self.compact(mean)))
@@ -0,0 +1,297 @@
+import numpy as np
+import pandas as pd
+from numpy.lib.stride_tricks import sliding_window_view
+
+
+class RollingWindow:
+    """
+    Last `window` values of every ticker, with the running mean and sum of squared
+    deviations (M2) updated in O(1) per new value (sliding Welford update).
+    """
+
+    def __init__(self, n_tickers, window):
+        self.window = window
+        self.values = np.full((window, n_tickers), np.nan)
+        self.head = np.zeros(n_tickers, dtype=int)
+        self.count = np.zeros(n_tickers, dtype=int)
+        self._mean = np.zeros(n_tickers)
+        self._m2 = np.zeros(n_tickers)
+
+    def push(self, positions, x):
+        head = self.head[positions]
+        old = self.values[head, positions]
+        mean, m2 = self._mean[positions], self._m2[positions]
+        full = self.count[positions] >= self.window
+
+        # full windows replace their oldest value, the others grow by one
+        n = np.where(full, self.window, self.count[positions] + 1)
+        delta = np.where(full, x - old, x - mean)
+        new_mean = mean + delta / n
+        m2 = np.where(full, m2 + (x - old) * (x - new_mean + old - mean), m2 + delta * (x - new_mean))
+
+        self._mean[positions] = new_mean
+        self._m2[positions] = np.maximum(m2, 0.0)
+        self.values[head, positions] = x
+        self.head[positions] = (head + 1) % self.window
+        self.count[positions] = np.minimum(self.count[positions] + 1, self.window)
+
+    def lag(self, periods):
+        """Value pushed `periods` updates before the latest one (NaN if not seen yet)."""
+        out = self.values[(self.head - 1 - periods) % self.window, np.arange(len(self.head))]
+        return np.where(self.count > periods, out, np.nan)
+
+    def mean(self):
+        return np.where(self.count >= self.window, self._mean, np.nan)
+
+    def std(self):
+        return np.where(self.count >= self.window, np.sqrt(self._m2 / (self.window - 1)), np.nan)
+
+    def max(self):
+        # O(window) per ticker, windows are a few bars
+        return np.where(self.count >= self.window, self.values.max(axis=0), np.nan)
+
+    def min(self):
+        return np.where(self.count >= self.window, self.values.min(axis=0), np.nan)
+
+    def copy(self):
+        window = RollingWindow.__new__(RollingWindow)
+        window.window = self.window
+        for name in ['values', 'head', 'count', '_mean', '_m2']:
+            setattr(window, name, getattr(self, name).copy())
+        return window
+
+
+class WilderAverages:
+    """
+    Average gain and loss of the close changes behind TA-Lib's RSI: the mean of the
+    first `period` changes, then Wilder's smoothing avg = (avg * (period - 1) + x) / period.
+    """
+
+    def __init__(self, n_tickers, period):
+        self.period = period
+        self.count = np.zeros(n_tickers, dtype=int)
+        self.gain = np.zeros(n_tickers)
+        self.loss = np.zeros(n_tickers)
+
+    def push(self, positions, change):
+        known = ~np.isnan(change)
+        positions, change = positions[known], change[known]
+        count = self.count[positions] + 1
+        seeding = count <= self.period
+        for averages, x in [(self.gain, np.maximum(change, 0.0)), (self.loss, np.maximum(-change, 0.0))]:
+            previous = averages[positions]
+            averages[positions] = np.where(seeding, previous + x / self.period,
+                                           (previous * (self.period - 1) + x) / self.period)
+        self.count[positions] = count
+
+    def rsi(self):
+        total = self.gain + self.loss
+        rsi = np.where(total > 0, 100 * self.gain / np.where(total > 0, total, 1.0), 0.0)
+        return np.where(self.count >= self.period, rsi, np.nan)
+
+    def copy(self):
+        averages = WilderAverages.__new__(WilderAverages)
+        averages.period = self.period
+        for name in ['count', 'gain', 'loss']:
+            setattr(averages, name, getattr(self, name).copy())
+        return averages
+
+
+def _ewm(previous, x, span):
+    # ewm(span, adjust=False).mean(), which starts at the first value
+    alpha = 2 / (span + 1)
+    return np.where(np.isnan(previous), x, previous + alpha * (x - previous))
+
+
+class OnlineFeatureState:
+    """
+    Feature values at the latest bar of every ticker, kept up to date bar by bar.
+
+    Rolling windows (MA, std, ATR, Bollinger width, volume averages, 5-day range) and
+    the lagged closes behind the returns are held in fixed-size ring buffers, and the
+    EWMs of the MACD and Wilder's averages of the RSI are carried forward, so one new
+    trading day costs O(1) per ticker instead of recomputing features over the history.
+    Macro and market index features only depend on the date-level series, computed like
+    the batch path over the last rows in long (Date, Ticker) order.
+
+    Values match create_panel_features on the same bars once a ticker has seen enough
+    bars to fill its windows; before that its features are NaN. The EWM-based MACD and
+    RSI depend on every earlier bar, so they converge to the batch values as the replayed
+    history grows (to ~1e-3 relative after PredictionBuilder's 100-day lookback).
+    """
+
+    def __init__(self, tickers, columns):
+        unsupported = [name for name in columns if name not in online_features]
+        if unsupported:
+            raise KeyError(f"No online update for features: {unsupported}")
+
+        self.tickers = pd.Index(tickers)
+        self.columns = list(columns)
+        self.date = None
+        n = len(self.tickers)
+        self.close = {window: RollingWindow(n, window) for window in [5, 10, 20]}
+        self.volume = {window: RollingWindow(n, window) for window in [5, 20]}
+        self.true_range = {window: RollingWindow(n, window) for window in [7, 14]}
+        self.high = RollingWindow(n, 5)
+        self.low = RollingWindow(n, 5)
+        # close lags behind the returns
+        self.close_lags = RollingWindow(n, 11)
+        self.ewm = {span: np.full(n, np.nan) for span in [12, 26]}
+        self.macd_signal = np.full(n, np.nan)
+        self.rsi_averages = WilderAverages(n, 14)
+        # last rows of each date-level series in long row order, and the features computed over them
+        self.series_rows = {row_order_features[name][0]: np.full(series_window, np.nan)
+                            for name in self.columns if name in row_order_features}
+        self.row_values = {name: np.full(n, np.nan) for name in self.columns if name in row_order_features}
+        # last close in long (Date, Ticker) row order, see _true_range
+        self.last_row_close = np.nan
+        self.latest = {name: np.full(n, np.nan) for name in ['Close', 'High', 'Low', 'Open', 'Volume']}
+        self.values = np.full((n, len(self.columns)), np.nan)
+
+    @classmethod
+    def from_panel(cls, panel, columns):
+        """State after replaying every date of `panel` (e.g. the raw lookback tail kept by PredictionBuilder)."""
+        state = cls(panel.tickers, columns)
+        state.update_panel(panel)
+        return state
+
+    def update_panel(self, panel):
+        for row in range(len(panel.dates)):
+            positions = np.flatnonzero(panel.mask[row])
+            bars = {name: panel[name][row, positions] for name in self.latest if name in panel.fields}
+            series = {name: panel.series[name][row] for name in self.series_rows if name in panel.series}
+            self.update(panel.dates[row], positions, bars, series)
+
+    def update(self, date, positions, bars, series=None):
+        """
+        Add one trading day of bars for the tickers at `positions` (in ticker order) and refresh
+        their features. `series` holds the day's macro and market index values ({name: value}).
+        """
+        # bars without a close carry no information (the batch path forward fills them)
+        keep = ~np.isnan(np.asarray(bars['Close'], dtype=float))
+        positions = np.asarray(positions)[keep]
+        bars = {name: np.asarray(values, dtype=float)[keep] for name, values in bars.items()}
+
+        close, high, low = bars['Close'], bars['High'], bars['Low']
+        for name, values in bars.items():
+            self.latest[name][positions] = values
+
+        for window in self.close.values():
+            window.push(positions, close)
+        if 'Volume' in bars:
+            for window in self.volume.values():
+                window.push(positions, bars['Volume'])
+
+        change = close - self.close_lags.lag(0)[positions]
+        self.rsi_averages.push(positions, change)
+        self.close_lags.push(positions, close)
+        self.high.push(positions, high)
+        self.low.push(positions, low)
+
+        for span, values in self.ewm.items():
+            values[positions] = _ewm(values[positions], close, span)
+        macd = self.ewm[12][positions] - self.ewm[26][positions]
+        self.macd_signal[positions] = _ewm(self.macd_signal[positions], macd, 9)
+
+        self._update_row_order(positions, series or {})
+
+        prev_close = np.r_[self.last_row_close, close[:-1]]
+        true_range = np.fmax(high - low, np.fmax(abs(high - prev_close), abs(low - prev_close)))
+        for window in self.true_range.values():
+            window.push(positions, true_range)
+        if len(close):
+            self.last_row_close = close[-1]
+
+        self.date = pd.Timestamp(date)
+        self.values[positions] = np.column_stack([online_features[name](self)[positions] for name in self.columns])
+
+    def _update_row_order(self, positions, series):
+        # the batch path computes these over the long frame's rows, where each date repeats its
+        # value once per ticker: windows end at each of the day's rows, in ticker order
+        rows = {}
+        for name, tail in self.series_rows.items():
+            values = np.r_[tail, np.full(len(positions), series.get(name, np.nan))]
+            rows[name] = sliding_window_view(values, series_window)[1:]
+            self.series_rows[name] = values[-series_window:]
+        for name, values in self.row_values.items():
+            column, func = row_order_features[name]
+            values[positions] = func(rows[column])
+
+    def frame(self, positions=None):
+        """Latest feature rows as a DataFrame with the model's column order."""
+        values = self.values if positions is None else self.values[positions]
+        return pd.DataFrame(values, columns=self.columns)
+
+    def ready(self):
+        """Tickers whose features are all defined."""
+        return ~np.isnan(self.values).any(axis=1)
+
+    def copy(self):
+        state = OnlineFeatureState.__new__(OnlineFeatureState)
+        state.tickers, state.columns, state.date = self.tickers, self.columns, self.date
+        state.close = {window: values.copy() for window, values in self.close.items()}
+        state.volume = {window: values.copy() for window, values in self.volume.items()}
+        state.true_range = {window: values.copy() for window, values in self.true_range.items()}
+        state.close_lags = self.close_lags.copy()
+        state.high, state.low = self.high.copy(), self.low.copy()
+        state.ewm = {span: values.copy() for span, values in self.ewm.items()}
+        state.macd_signal = self.macd_signal.copy()
+        state.rsi_averages = self.rsi_averages.copy()
+        state.series_rows = {name: values.copy() for name, values in self.series_rows.items()}
+        state.row_values = {name: values.copy() for name, values in self.row_values.items()}
+        state.last_row_close = self.last_row_close
+        state.latest = {name: values.copy() for name, values in self.latest.items()}
+        state.values = self.values.copy()
+        return state
+
+
+def _return(periods):
+    return lambda state: state.close_lags.lag(0) / state.close_lags.lag(periods) - 1
+
+
+# rows of a date-level series each row-order feature looks back over (pct_change(5) needs 6)
+series_window = 6
+
+# row-order features: (series, value of the windows of the last series_window rows)
+row_order_features = {
+    'VIX_ret': ('VIX', lambda rows: rows[:, -1] / rows[:, -2] - 1),
+    'WTI_ret': ('WTI_Oil', lambda rows: rows[:, -1] / rows[:, -2] - 1),
+    'TNX_ret': ('US10Y', lambda rows: rows[:, -1] / rows[:, -2] - 1),
+    'VIX_5d_mean': ('VIX', lambda rows: rows[:, 1:].mean(axis=1)),
+    'WTI_5d_std': ('WTI_Oil', lambda rows: rows[:, 1:].std(axis=1, ddof=1)),
+    **{f'{index}_return_1d': (index, lambda rows: rows[:, -1] / rows[:, -2] - 1) for index in ["GSPC", "NDX", "RUT", "DJI"]},
+    **{f'{index}_return_5d': (index, lambda rows: rows[:, -1] / rows[:, 0] - 1) for index in ["GSPC", "NDX", "RUT", "DJI"]},
+}
+
+
+def _row_order(name):
+    return lambda state: state.row_values[name]
+
+
+# latest-bar value of each supported feature, same definitions as feature_helpers
+online_features = {
+    **{f'return_{periods}d': _return(periods) for periods in [1, 3, 5, 10]},
+    'rolling_std_5': lambda state: state.close[5].std(),
+    'rolling_std_10': lambda state: state.close[10].std(),
+    'ma_5': lambda state: state.close[5].mean(),
+    'ma_20': lambda state: state.close[20].mean(),
+    'price_ma5_ratio': lambda state: state.latest['Close'] / state.close[5].mean(),
+    'price_ma20_ratio': lambda state: state.latest['Close'] / state.close[20].mean(),
+    'MA5_MA20_diff': lambda state: state.close[5].mean() - state.close[20].mean(),
+    'MA5_MA20_ratio': lambda state: state.close[5].mean() / state.close[20].mean(),
+    'vol_MA5': lambda state: state.volume[5].mean(),
+    'vol_MA20': lambda state: state.volume[20].mean(),
+    'vol_ratio_5': lambda state: state.latest['Volume'] / state.volume[5].mean(),
+    'vol_ratio_20': lambda state: state.latest['Volume'] / state.volume[20].mean(),
+    'price_volume': lambda state: _return(1)(state) * state.latest['Volume'],
+    'ATR_14': lambda state: state.true_range[14].mean(),
+    'ATR_7': lambda state: state.true_range[7].mean(),
+    'BB_width': lambda state: 2 * state.close[20].std() / state.close[20].mean(),
+    'range_pct': lambda state: (state.latest['High'] - state.latest['Low']) / state.latest['Close'],
+    'OC_pct': lambda state: (state.latest['Close'] - state.latest['Open']) / state.latest['Close'],
+    'range_5d': lambda state: (state.high.max() - state.low.min()) / state.latest['Close'],
+    'rsi': lambda state: state.rsi_averages.rsi(),
+    'macd': lambda state: state.ewm[12] - state.ewm[26],
+    'macd_hist': lambda state: state.ewm[12] - state.ewm[26] - state.macd_signal,
+    **{name: _row_order(name) for name in row_order_features},
+}
@@ -0,0 +1,250 @@
+import bisect
+import cProfile
+import os
+import resource
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+
+import yaml
+
+project_root = Path(__file__).resolve().parents[1]
+config_path = project_root / "config.yaml"
+
+with open(config_path, "r") as f:
+    config = yaml.safe_load(f)
+
+# opt in with monitoring.profile, or PROFILE_STAGES=1 for a single run
+profile_enabled = config['monitoring']['profile'] or os.environ.get("PROFILE_STAGES") == "1"
+profile_dir = project_root / config['monitoring']['profile_dir']
+
+# request latency buckets in seconds, like prometheus_client's defaults
+latency_buckets = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+_lock = threading.Lock()
+stage_stats = {}
+request_stats = {}
+
+# peak resident memory seen so far by each running stage, and by the process
+_stage_peaks = {}
+_process_peak = 0
+# cProfile allows one active profiler per process (sys.monitoring from Python 3.12), so
+# only one thread profiles its stages; within it the innermost stage's profiler runs
+_profile_owner = None
+_profilers = []
+
+
+def _read_hwm():
+    """VmHWM, the resident memory high-water mark of the process, None where /proc is not available."""
+    try:
+        with open("/proc/self/status", "r") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    return None
+
+
+def _reset_hwm():
+    # writing 5 to clear_refs resets VmHWM (and ru_maxrss) to the current resident memory
+    try:
+        with open("/proc/self/clear_refs", "w") as f:
+            f.write("5")
+    except OSError:
+        pass
+
+
+def _maxrss_bytes():
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+def _collect_peaks(reset):
+    """Fold the high-water mark since the last reset into every running stage and the process peak (holding _lock)."""
+    global _process_peak
+    hwm = _read_hwm()
+    if hwm is None:
+        hwm = _maxrss_bytes()
+    for record in _stage_peaks:
+        _stage_peaks[record] = max(_stage_peaks[record], hwm)
+    _process_peak = max(_process_peak, hwm)
+    if reset:
+        _reset_hwm()
+
+
+def peak_rss_bytes():
+    """High-water mark of the process resident memory (stages reset the kernel's, so the largest one read is kept)."""
+    with _lock:
+        return max(_process_peak, _read_hwm() or 0, _maxrss_bytes())
+
+
+class StageRecord:
+
+    def __init__(self, name):
+        self.name = name
+        self.rows = None
+        self.nbytes = None
+        self.seconds = None
+
+
+def _start_profiler():
+    global _profile_owner
+    with _lock:
+        if _profile_owner not in (None, threading.get_ident()):
+            return None
+        _profile_owner = threading.get_ident()
+    # the enclosing stage pauses while this one runs, so its own file leaves the inner stages out
+    if _profilers:
+        _profilers[-1].disable()
+    profiler = cProfile.Profile()
+    _profilers.append(profiler)
+    profiler.enable()
+    return profiler
+
+
+def _stop_profiler(profiler, name):
+    global _profile_owner
+    profiler.disable()
+    _profilers.pop()
+    profile_dir.mkdir(parents=True, exist_ok=True)
+    profiler.dump_stats(profile_dir / f"{name}-{datetime.now():%Y%m%d-%H%M%S-%f}.prof")
+    if _profilers:
+        _profilers[-1].enable()
+    else:
+        with _lock:
+            _profile_owner = None
+
+
+@contextmanager
+def stage(name, rows=None):
+    """
+    Time a pipeline stage and record its duration, row count (set `record.rows` inside
+    the block or pass `rows`), the memory held by its output (`record.nbytes`) and the
+    peak resident memory of the process while it ran. On Linux the kernel's high-water
+    mark is reset when a stage starts, so memory a stage allocates and frees again is
+    counted; elsewhere the peak is the process high-water mark so far.
+    With monitoring.profile enabled, every stage is also profiled with cProfile and
+    dumped to <profile_dir>/<name>-<timestamp>.prof; a stage's file leaves out the time
+    of the stages nested in it, which get their own files.
+    """
+    record = StageRecord(name)
+    record.rows = rows
+    with _lock:
+        _collect_peaks(reset=True)
+        _stage_peaks[record] = 0
+    profiler = _start_profiler() if profile_enabled else None
+
+    start = time.perf_counter()
+    try:
+        yield record
+    finally:
+        record.seconds = time.perf_counter() - start
+        if profiler is not None:
+            _stop_profiler(profiler, name)
+
+        with _lock:
+            _collect_peaks(reset=False)
+            peak = _stage_peaks.pop(record)
+            stats = stage_stats.setdefault(name, {'count': 0, 'seconds': 0.0})
+            stats['count'] += 1
+            stats['seconds'] += record.seconds
+            stats['last_seconds'] = record.seconds
+            stats['last_rows'] = record.rows
+            stats['last_bytes'] = record.nbytes
+            stats['peak_rss_bytes'] = peak
+
+        rows_text = f", {record.rows} rows" if record.rows is not None else ""
+        bytes_text = f", holds {record.nbytes / 2**20:.1f} MB" if record.nbytes is not None else ""
+        print(f"[{name}] {record.seconds:.2f}s{rows_text}{bytes_text}, peak RSS {peak / 2**20:.0f} MB")
+
+
+def observe_request(method, path, status, seconds):
+    """Add one request to the per-endpoint latency histogram."""
+    with _lock:
+        stats = request_stats.get((method, path, status))
+        if stats is None:
+            stats = request_stats[(method, path, status)] = {'buckets': [0] * len(latency_buckets), 'count': 0, 'sum': 0.0}
+        index = bisect.bisect_left(latency_buckets, seconds)
+        if index < len(latency_buckets):
+            stats['buckets'][index] += 1
+        stats['count'] += 1
+        stats['sum'] += seconds
+
+
+class LatencyMiddleware:
+    """
+    ASGI middleware recording the latency of every HTTP request, labelled by the matched
+    route's path template (so /predict?tickers=... is one series) and the response status.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        status = 500
+        async def send_with_status(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            route = scope.get("route")
+            path = getattr(route, "path", None) or "unmatched"
+            observe_request(scope["method"], path, status, time.perf_counter() - start)
+
+
+def render_prometheus():
+    """All stage and request metrics in the Prometheus text exposition format."""
+    lines = []
+    with _lock:
+        stages = {name: dict(stats) for name, stats in stage_stats.items()}
+        requests = {key: {**stats, 'buckets': list(stats['buckets'])} for key, stats in request_stats.items()}
+
+    lines += ["# HELP pipeline_stage_runs_total Completed runs of each pipeline stage.",
+              "# TYPE pipeline_stage_runs_total counter"]
+    lines += [f'pipeline_stage_runs_total{{stage="{name}"}} {stats["count"]}' for name, stats in stages.items()]
+    lines += ["# HELP pipeline_stage_seconds_total Total time spent in each pipeline stage.",
+              "# TYPE pipeline_stage_seconds_total counter"]
+    lines += [f'pipeline_stage_seconds_total{{stage="{name}"}} {stats["seconds"]}' for name, stats in stages.items()]
+    lines += ["# HELP pipeline_stage_last_seconds Duration of the last run of each pipeline stage.",
+              "# TYPE pipeline_stage_last_seconds gauge"]
+    lines += [f'pipeline_stage_last_seconds{{stage="{name}"}} {stats["last_seconds"]}' for name, stats in stages.items()]
+    lines += ["# HELP pipeline_stage_last_rows Rows handled by the last run of each pipeline stage.",
+              "# TYPE pipeline_stage_last_rows gauge"]
+    lines += [f'pipeline_stage_last_rows{{stage="{name}"}} {stats["last_rows"]}'
+              for name, stats in stages.items() if stats['last_rows'] is not None]
+    lines += ["# HELP pipeline_stage_last_bytes Memory held by the output of the last run of each pipeline stage.",
+              "# TYPE pipeline_stage_last_bytes gauge"]
+    lines += [f'pipeline_stage_last_bytes{{stage="{name}"}} {stats["last_bytes"]}'
+              for name, stats in stages.items() if stats['last_bytes'] is not None]
+    lines += ["# HELP pipeline_stage_peak_rss_bytes Peak resident memory of the process during the last run of each pipeline stage.",
+              "# TYPE pipeline_stage_peak_rss_bytes gauge"]
+    lines += [f'pipeline_stage_peak_rss_bytes{{stage="{name}"}} {stats["peak_rss_bytes"]}' for name, stats in stages.items()]
+
+    lines += ["# HELP http_request_duration_seconds Latency of HTTP requests per endpoint.",
+              "# TYPE http_request_duration_seconds histogram"]
+    for (method, path, status), stats in sorted(requests.items()):
+        labels = f'method="{method}",path="{path}",status="{status}"'
+        cumulative = 0
+        for bound, count in zip(latency_buckets, stats['buckets']):
+            cumulative += count
+            lines.append(f'http_request_duration_seconds_bucket{{{labels},le="{bound}"}} {cumulative}')
+        lines.append(f'http_request_duration_seconds_bucket{{{labels},le="+Inf"}} {stats["count"]}')
+        lines.append(f'http_request_duration_seconds_sum{{{labels}}} {stats["sum"]}')
+        lines.append(f'http_request_duration_seconds_count{{{labels}}} {stats["count"]}')
+
+    lines += ["# HELP process_peak_rss_bytes High-water mark of the process resident memory.",
+              "# TYPE process_peak_rss_bytes gauge",
+              f"process_peak_rss_bytes {peak_rss_bytes()}"]
+    return "\n".join(lines) + "\n"
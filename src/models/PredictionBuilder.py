@@ -1,11 +1,18 @@
-from sklearn.preprocessing import OneHotEncoder
 import yaml
 from pathlib import Path
 from datetime import date, timedelta
-import joblib
-from features.feature_helpers import create_features
-from data.data_helpers import load_data
+from features.feature_helpers import create_panel_features, get_feature_columns
+from features.feature_cache import get_feature_cache
+from features.online_features import OnlineFeatureState
+from data.data_helpers import load_panel, add_panel_target
+from data.schema import compact_long, day_strings, nbytes
+from models.strategy_helpers import select_long_short
+from models.inference_helpers import predict_panel
+from models.model_registry import get_registry
+from models.performance_stats import PerformanceStats
+from instrumentation import stage
 import pandas as pd
+import numpy as np
 
 project_root = Path(__file__).resolve().parents[2]
 config_path = project_root / "config.yaml"
@@ -18,113 +25,320 @@ tickers = config['tickers']
 macro_tickers = config['macro_tickers']
 market_indices = config['market_indices']
 
-feature_columns = config['features']['returns']\
-    + config['features']['rolling_volatility']\
-    + config['features']['moving_avg']\
-    + config['features']['momentum_indicators']\
-    + config['features']['macro_features']\
-    + config['features']['volume_features']\
-    + config['features']['market_index_features']\
-    + config['features']['atr']\
-    + config['features']['bb']\
-    + config['features']['price_range']
-# add one-hot encoded values
+feature_columns = get_feature_columns(config)
 
 threshold = 0.5
 
-model = joblib.load(Path(__file__).resolve().parent / "xgb_model.pkl")
+start_date = "2025-01-02"
+target_horizon = config['split']['target_horizon']
+# trading days of raw bars kept between refreshes so rolling/EWM features can warm up
+feature_lookback = 100
+
+# feature rows scored per model call
+inference_batch_size = config['inference']['batch_size']
+
+# per-stock columns served by the API, materialized in long format from the panel
+daily_returns_columns = ['Prediction', 'Target', 'StrategyReturn', 'CumulativeReturn']
+# fields kept on the backtest panel once predictions are made; raw bars and macro series
+# are only needed to compute features, and raw_panel keeps the tail refreshes start from
+panel_columns = feature_columns + ['Target', 'Prediction', 'StrategyReturn', 'Traded', 'CumulativeReturn']
+
+def _yesterday():
+    return (date.today() - timedelta(days=1)).strftime("%Y-%m-%d")
+
 
 class PredictionBuilder:
 
-    new_data = None
+    panel = None
+    raw_panel = None
     daily_returns_df = None
     feature_columns = feature_columns
     portfolio_returns_df = None
+    online_state = None
+    latest_scores = None
+    model_version = None
+    settled_stats = None
+    stats = None
 
 
     def __init__(self):
-        yesterday = date.today() - timedelta(days=1)
-        self.new_data = self._get_new_data("2025-01-02", yesterday.strftime("%Y-%m-%d"))
-        self._compute_daily_returns_per_stock()
+        self.panel = self._get_new_data(start_date, _yesterday())
+        with stage("daily_returns_per_stock") as record:
+            self._compute_daily_returns_per_stock()
+            record.rows, record.nbytes = len(self.daily_returns_df), nbytes(self.daily_returns_df)
         # Compute portfolio-level daily returns
-        self._compute_portfolio_returns()
-    
+        with stage("portfolio_returns") as record:
+            self._compute_portfolio_returns()
+            record.rows, record.nbytes = len(self.portfolio_returns_df), nbytes(self.portfolio_returns_df)
+        with stage("performance_stats", rows=len(self.daily_returns_df)):
+            self.settled_stats, self.stats = self._performance_stats(self.panel)
+        print("Memory held: " + ", ".join(f"{name} {size / 2**20:.1f} MB" for name, size in self.memory_usage().items()))
+
+
+    def refresh(self):
+        """
+        Roll the backtest forward to yesterday without a cold rebuild.
+
+        Only the trading days after the last known bar are downloaded. Features and
+        predictions are recomputed on the cached raw tail plus the new bars, and only
+        the dates that changed (new days and the last `target_horizon` days, whose Target
+        was not known yet) are replaced. Returns the number of new trading days.
+        """
+        # the kept history must come from the model the new days are scored with
+        self.swap_model()
+        model, _ = get_registry().get(feature_columns)
+
+        last_date = self.raw_panel.dates[-1]
+        next_date = (last_date + timedelta(days=1)).strftime("%Y-%m-%d")
+        if next_date > _yesterday():
+            return 0
+
+        with stage("load_data") as record:
+            bars = load_panel(next_date, _yesterday())
+            bars = bars.slice_dates(bars.dates > last_date)
+            record.rows, record.nbytes = int(bars.mask.sum()), nbytes(bars)
+        if len(bars.dates) == 0:
+            return 0
+
+        raw = self.raw_panel.append(bars.copy(self.raw_panel.fields.keys() | self.raw_panel.series.keys()))
+        add_panel_target(raw, target_horizon)
+        raw_panel = raw.tail(feature_lookback).copy()
+        with stage("online_features") as record:
+            online_state = self.online_state.copy()
+            online_state.update_panel(bars)
+            record.rows = int(bars.mask.sum())
+
+        since = self.panel.dates[-target_horizon]
+        # the raw tail differs on every refresh, so its features are not worth caching
+        data = self._predict(raw, model, use_cache=False)
+        changed = data.slice_dates(data.dates >= since)
+        kept = self.panel.slice_dates(self.panel.dates < since)
+
+        base_growth = 1 + kept['CumulativeReturn'][-1] if len(kept.dates) else None
+        with stage("daily_returns_per_stock") as record:
+            self._strategy_returns(changed, base_growth=base_growth)
+            panel = kept.append(changed.copy(kept.fields.keys() | kept.series.keys()))
+            daily_returns_df = self._daily_returns_frame(panel)
+            record.rows, record.nbytes = len(daily_returns_df), nbytes(daily_returns_df)
+        with stage("portfolio_returns") as record:
+            portfolio_returns_df = self._append_portfolio_returns(changed, since)
+            record.rows, record.nbytes = len(portfolio_returns_df), nbytes(portfolio_returns_df)
+        with stage("performance_stats", rows=int(changed.mask.sum())):
+            settled_stats, stats = self._performance_stats(changed, self.settled_stats)
+
+        latest_scores = self._score_latest(online_state, model)
+
+        # swap the state in at the end so readers never see a half-refreshed builder
+        self.raw_panel = raw_panel
+        self.panel = panel
+        self.daily_returns_df = daily_returns_df
+        self.portfolio_returns_df = portfolio_returns_df
+        self.settled_stats, self.stats = settled_stats, stats
+        self.online_state = online_state
+        self.latest_scores = latest_scores
+
+        return len(bars.dates)
+
+
+    def swap_model(self):
+        """
+        Re-score the backtest and the latest bars when the registry serves another model
+        version than the one behind the current state. Features are kept on the panel,
+        so only inference and the strategy returns are recomputed. Returns True if swapped.
+        """
+        model, metadata = get_registry().get(feature_columns)
+        if metadata['version'] == self.model_version:
+            return False
+
+        panel = self.panel.copy()
+        with stage("predict", rows=int(panel.mask.sum())):
+            panel.set('Prediction', predict_panel(model, panel, feature_columns, inference_batch_size), dtype=float)
+        with stage("daily_returns_per_stock") as record:
+            self._strategy_returns(panel)
+            daily_returns_df = self._daily_returns_frame(panel)
+            record.rows, record.nbytes = len(daily_returns_df), nbytes(daily_returns_df)
+        with stage("portfolio_returns") as record:
+            portfolio_returns_df = self._portfolio_returns(panel)
+            record.rows, record.nbytes = len(portfolio_returns_df), nbytes(portfolio_returns_df)
+        with stage("performance_stats", rows=len(daily_returns_df)):
+            settled_stats, stats = self._performance_stats(panel)
+        latest_scores = self._score_latest(self.online_state, model)
+
+        self.panel = panel
+        self.daily_returns_df = daily_returns_df
+        self.portfolio_returns_df = portfolio_returns_df
+        self.settled_stats, self.stats = settled_stats, stats
+        self.latest_scores = latest_scores
+        self.model_version = metadata['version']
+        return True
+
 
     def _get_new_data(self, start_date, end_date):
-        # get data from yhfinance
-        data = load_data(start_date, end_date)
-        data_with_fts = create_features(data)
+        # get data from the market data store
+        with stage("load_data") as record:
+            panel = load_panel(start_date, end_date)
+            record.rows, record.nbytes = int(panel.mask.sum()), nbytes(panel)
+        with stage("load_model"):
+            model, metadata = get_registry().get(feature_columns)
+        self.model_version = metadata['version']
+        self.raw_panel = panel.tail(feature_lookback).copy()
+        with stage("online_features", rows=int(self.raw_panel.mask.sum())):
+            self.online_state = OnlineFeatureState.from_panel(self.raw_panel, feature_columns)
+        self.latest_scores = self._score_latest(self.online_state, model)
+        return self._predict(panel, model)
 
-        # one-hot encore ticker values
 
-        encoder = OneHotEncoder(handle_unknown='ignore', sparse_output=False)
-        encoded_values = encoder.fit_transform(data_with_fts[['Ticker']])
-        new_cols = encoder.get_feature_names_out(['Ticker'])
-        # self.feature_columns += new_cols.tolist()
+    def _predict(self, panel, model, use_cache=True):
+        rows = int(panel.mask.sum())
+        with stage("create_features", rows=rows) as record:
+            if use_cache:
+                get_feature_cache().panel_features(panel, feature_columns)
+            else:
+                create_panel_features(panel, feature_columns)
+            record.nbytes = nbytes(panel)
 
-        tickers_encoded = pd.DataFrame(encoded_values, columns=new_cols, index=data_with_fts.index)
-        data_with_fts = pd.concat([data_with_fts, tickers_encoded], axis=1)
+        # make predictions, a block of dates at a time
+        with stage("predict", rows=rows) as record:
+            panel.set('Prediction', predict_panel(model, panel, feature_columns, inference_batch_size), dtype=float)
+            panel.drop([name for name in [*panel.fields, *panel.series] if name not in panel_columns])
+            record.nbytes = nbytes(panel)
 
-        # make predictions
-        X_backtesting = data_with_fts[feature_columns]
-        data_with_fts["Prediction"] = model.predict(X_backtesting)
+        return panel
 
-        return data_with_fts
-    
 
-    def _compute_daily_returns_per_stock(self, top_pct=0.2, bottom_pct=0.2):
+    def _score_latest(self, state, model):
         """
-        Compute daily returns per stock using regression predictions.
+        Score the latest bar of every ticker from the online feature state. Scores only change
+        when a bar arrives, so they are computed here once per update and served from memory.
         """
-        df = self.new_data.copy()
-        df['StrategyReturn'] = 0.0
+        ready = state.ready()
+        X_latest = state.frame(np.flatnonzero(ready))
+        records = {ticker: {"ticker": ticker, "date": None, "prediction": None} for ticker in state.tickers}
+        if not ready.any():
+            return records
 
-        for date, group in df.groupby('Date'):
-            group = group.copy()
-            group = group[abs(group['Prediction']) > 0.8] # keep only strong signals
-            # print(group['Prediction'].head(2))
-            n_stocks = len(group)
-            n_top = max(1, int(top_pct * n_stocks))
-            n_bottom = max(1, int(bottom_pct * n_stocks))
+        date = state.date.strftime("%Y-%m-%d")
+        if hasattr(model, "predict_proba"):
+            proba = model.predict_proba(X_latest)
+            predictions = model.classes_[proba.argmax(axis=1)]
+        else:
+            proba, predictions = None, model.predict(X_latest)
 
-            top_stocks = group.nlargest(n_top, 'Prediction')['Ticker']
-            bottom_stocks = group.nsmallest(n_bottom, 'Prediction')['Ticker']
+        for row, ticker in enumerate(state.tickers[ready]):
+            record = records[ticker]
+            record["date"] = date
+            record["prediction"] = float(predictions[row])
+            if proba is not None:
+                record.update(zip(['probDown', 'probFlat', 'probUp'], proba[row].tolist()))
+        return records
+
+
+    def get_latest_predictions(self, tickers=None):
+        """Latest-bar predictions for `tickers` (all tickers when None); raises KeyError for unknown tickers."""
+        scores = self.latest_scores
+        if tickers is None:
+            return {"predictions": list(scores.values())}
+        unknown = [ticker for ticker in tickers if ticker not in scores]
+        if unknown:
+            raise KeyError(f"Unknown tickers: {unknown}")
+        return {"predictions": [scores[ticker] for ticker in tickers]}
+
+
+    def _compute_daily_returns_per_stock(self, top_pct=0.2, bottom_pct=0.2):
+        self._strategy_returns(self.panel, top_pct, bottom_pct)
+        self.daily_returns_df = self._daily_returns_frame(self.panel)
+
+
+    def _strategy_returns(self, panel, top_pct=0.2, bottom_pct=0.2, base_growth=None):
+        """
+        Compute daily returns per stock from the predictions (returns, or P(up) - P(down)
+        of a classifier), as panel fields.
+        `base_growth` (1 + CumulativeReturn per ticker) continues compounding from earlier days.
+        """
+        # long/short side for every (Date, Ticker) cell, ranked per date in one pass
+        side = select_long_short(panel.row_dates(), panel.row_values('Prediction'), top_pct, bottom_pct)
+        target = panel.row_values('Target').astype(float)
+        strategy_return = panel.from_row_values(np.where(side != 0, side * target, 0.0))
+        panel.set('StrategyReturn', strategy_return, dtype=float)
 
-            df.loc[(df['Date'] == date) & (df['Ticker'].isin(top_stocks)), 'StrategyReturn'] = \
-                group.loc[group['Ticker'].isin(top_stocks), 'Target']
-            df.loc[(df['Date'] == date) & (df['Ticker'].isin(bottom_stocks)), 'StrategyReturn'] = \
-                -group.loc[group['Ticker'].isin(bottom_stocks), 'Target']
-        
-        df = df.sort_values(['Ticker', 'Date'])
-        
         # Create a mask for traded days
-        df['Traded'] = df['StrategyReturn'] != 0
-        
+        traded = np.nan_to_num(strategy_return) != 0
+        panel.set('Traded', traded, dtype=bool)
+
         # Cumulative return only counting traded days
-        df['CumulativeReturn'] = df.groupby('Ticker').apply(
-            lambda x: (1 + x[x['Traded']]['StrategyReturn']).cumprod().reindex(x.index, method='ffill').fillna(1) - 1
-        ).reset_index(level=0, drop=True)
-        
-        self.daily_returns_df = df
+        growth = np.where(traded, 1 + strategy_return, 1.0)
+        cumulative = np.nancumprod(growth, axis=0)
+        if base_growth is not None:
+            cumulative *= base_growth
+        panel.set('CumulativeReturn', cumulative - 1, dtype=float)
+
+
+    def _daily_returns_frame(self, panel):
+        """
+        Long-format per-stock returns (sorted by Ticker, Date), the edge used by the API.
+        Dates are int day numbers and tickers categorical, see data.schema.
+        """
+        daily_returns_df = compact_long(panel, daily_returns_columns)
+        return daily_returns_df.sort_values(['Ticker', 'Date'], kind='stable').reset_index(drop=True)
+
+
+    def memory_usage(self):
+        """Bytes held by each part of the builder's state."""
+        return {
+            'panel': nbytes(self.panel),
+            'raw_panel': nbytes(self.raw_panel),
+            'daily_returns_df': nbytes(self.daily_returns_df),
+            'portfolio_returns_df': nbytes(self.portfolio_returns_df),
+        }
+
 
     def _compute_portfolio_returns(self):
+        self.portfolio_returns_df = self._portfolio_returns(self.panel)
+
+
+    def _portfolio_returns(self, panel, base_growth=1.0):
         """
         Compute aggregate portfolio returns across all stocks for each day.
         Assumes equal weighting across positions.
         """
+        strategy_return = np.where(panel.mask, panel['StrategyReturn'], 0.0)
+        positions = panel.mask.sum(axis=1)
+        traded_days = positions > 0
+
         # Get daily portfolio return (average of all active positions each day)
-        portfolio_daily = self.daily_returns_df.groupby('Date').agg({
-            'StrategyReturn': ['mean', 'sum', 'count'],  # mean for equal weight, sum for total
-            'Traded': 'sum'  # number of positions
-        }).reset_index()
-        
-        portfolio_daily.columns = ['Date', 'DailyReturn_EqualWeight', 'DailyReturn_Sum', 
-                                'TotalPositions', 'ActivePositions']
+        portfolio_daily = pd.DataFrame({
+            'Date': panel.dates,
+            'DailyReturn_EqualWeight': strategy_return.sum(axis=1) / np.maximum(positions, 1),  # mean for equal weight
+            'DailyReturn_Sum': strategy_return.sum(axis=1),  # sum for total
+            'TotalPositions': positions,
+            'ActivePositions': (panel['Traded'] & panel.mask).sum(axis=1),  # number of positions
+        })[traded_days].reset_index(drop=True)
         
         # Cumulative portfolio return (what you actually earned)
-        portfolio_daily['CumulativeReturn'] = (1 + portfolio_daily['DailyReturn_EqualWeight']).cumprod() - 1
+        portfolio_daily['CumulativeReturn'] = base_growth * (1 + portfolio_daily['DailyReturn_EqualWeight']).cumprod() - 1
         
-        self.portfolio_returns_df = portfolio_daily
+        return portfolio_daily
+
+
+    def _performance_stats(self, panel, settled_stats=None):
+        """
+        Statistics up to the last date of `panel`, continuing from `settled_stats` (the
+        dates before `panel`). Returns (settled, latest): only dates whose Target is known,
+        which the next refresh continues from, and all dates.
+        """
+        if settled_stats is None:
+            settled_stats = PerformanceStats(panel.tickers)
+        settled_end = panel.dates[-target_horizon] if len(panel.dates) >= target_horizon else panel.dates[0]
+        settled = settled_stats.copy().update(panel.slice_dates(panel.dates < settled_end))
+        latest = settled.copy().update(panel.slice_dates(panel.dates >= settled_end))
+        return settled, latest
+
+
+    def _append_portfolio_returns(self, panel, since):
+        kept = self.portfolio_returns_df[self.portfolio_returns_df['Date'] < since]
+        base_growth = 1 + kept['CumulativeReturn'].iloc[-1] if len(kept) else 1.0
+        appended = self._portfolio_returns(panel, base_growth)
+        return pd.concat([kept, appended], ignore_index=True)
     
 
     def get_portfolio_performance(self):
@@ -139,100 +353,39 @@ class PredictionBuilder:
     def get_daily_returns_per_stock(self):
         # Ensure Date is string for JSON
         df = self.daily_returns_df.copy()
-        df['Date'] = df['Date'].astype(str)
+        df['Date'] = day_strings(df['Date'])
+        df['Ticker'] = df['Ticker'].astype(str)
         return {"dailyReturns": df[['Date', 'Ticker', 'Prediction', 'Target', 'StrategyReturn', 'CumulativeReturn']].to_dict(orient='records')}
     
     
     def get_stats(self):
-        avgTrade = self.get_avg_trade()
-        stdDev = self.daily_returns_df["StrategyReturn"].std()
-        sharpe = avgTrade / stdDev
-
-        return {
-            "totalReturn": self.get_total_return(),
-            # "buyHoldReturn": finalBuyHold,
-            "sharpe": sharpe,
-            "winRate": self.get_win_rate(),
-            "maxDrawdown": self.get_portfolio_max_drawdown(),
-            "totalTrades": self.get_total_trades(),
-            "avgTrade": avgTrade
-        }
+        # accumulated by PerformanceStats as days are added, in one pass over the new rows
+        return self.stats.summary()
     
 
     def get_win_rate(self):
         """Get win rate (trades with StrategyReturn > 0)"""
-        positive_trades = (self.daily_returns_df["StrategyReturn"] > 0).sum()
-        total_trades = (self.daily_returns_df["StrategyReturn"] != 0).sum()
-        return positive_trades / total_trades
+        return self.stats.summary()["winRate"]
     
     def get_avg_trade(self):
-        trades = self.daily_returns_df.loc[self.daily_returns_df["StrategyReturn"] != 0, "StrategyReturn"]
-        return trades.mean()
+        return self.stats.summary()["avgTrade"]
     
     def get_total_trades(self):
-        return int((self.daily_returns_df["StrategyReturn"] != 0).sum())
+        return self.stats.summary()["totalTrades"]
     
     def get_total_return(self):
         # compounded, averaged over all stocks
-        daily_portfolio_returns = self.daily_returns_df.groupby("Date")["StrategyReturn"].mean()
-        return  (1 + daily_portfolio_returns).prod() - 1
+        return self.stats.summary()["totalReturn"]
     
     def get_portfolio_max_drawdown(self):
         """Calculate the maximum drawdown of the entire portfolio."""
-        if self.portfolio_returns_df.empty:
-            return 0.0
-        
-        # Use your portfolio daily return column (adjust the column name as needed)
-        returns = self.portfolio_returns_df["DailyReturn_EqualWeight"]  # or whatever your portfolio return column is
-        
-        # Compute cumulative returns
-        cum_returns = (1 + returns).cumprod()
-        
-        # Compute drawdowns
-        rolling_max = cum_returns.cummax()
-        drawdowns = (cum_returns - rolling_max) / rolling_max
-        
-        # Return the worst drawdown
-        return drawdowns.min()
+        return self.stats.summary()["maxDrawdown"]
 
 
 
     def get_stock_performance(self):
         """
-        Compute per-stock metrics using StrategyReturn.
-        FIXED: Annualized Sharpe ratio and proper handling of edge cases.
+        Per-stock metrics using StrategyReturn (annualized Sharpe ratio, 0 for constant
+        returns or a single trade), from the running per-ticker statistics.
         """
-        stock_perf = []
-        
-        for ticker, group in self.daily_returns_df.groupby('Ticker'):
-            # Only look at days when stock was actually traded
-            trades_df = group[group['StrategyReturn'] != 0]
-            trades = len(trades_df)
-            
-            if trades == 0:
-                continue  # Skip stocks never traded
-            
-            wins = (trades_df['StrategyReturn'] > 0).sum()
-            avg_return = trades_df['StrategyReturn'].mean()
-            std_return = trades_df['StrategyReturn'].std()
-            
-            # FIXED: Proper Sharpe ratio calculation
-            # Annualized Sharpe (assuming 252 trading days)
-            if std_return > 0 and trades > 1:
-                sharpe = (avg_return / std_return) * (252 ** 0.5)
-            else:
-                sharpe = 0.0  # Undefined for constant returns or single trade
-            
-            # Total return for this stock (last cumulative return value when traded)
-            total_return = trades_df['CumulativeReturn'].iloc[-1] if trades > 0 else 0.0
-            
-            stock_perf.append({
-                'ticker': ticker,
-                'trades': trades,
-                'winRate': round(wins / trades, 2),
-                'avgReturn': round(avg_return, 4),
-                'totalReturn': round(total_return, 4),
-                'sharpe': round(sharpe, 2)
-            })
-        
-        return {"stockPerformance": stock_perf}
\ No newline at end of file
+        return {"stockPerformance": self.stats.stock_performance()}
@@ -0,0 +1,59 @@
+import numpy as np
+import pandas as pd
+
+
+def predict_batches(model, batches):
+    """
+    Run the model once per batch of feature rows and yield (labels, probabilities).
+
+    Classifiers are only evaluated through predict_proba; labels are the argmax class,
+    which is what predict would return. Regressors yield (predictions, None).
+    """
+    for X in batches:
+        if hasattr(model, "predict_proba"):
+            proba = model.predict_proba(X)
+            yield model.classes_[proba.argmax(axis=1)], proba
+        else:
+            yield model.predict(X), None
+
+
+def predict_horizon_batches(model, batches):
+    """
+    predict_batches for a MultiHorizonModel: yields (labels, probabilities, horizon
+    probabilities) per batch, the first two for the target horizon and the last
+    (rows x horizons x classes) for every horizon, all from one pass over the batch.
+    """
+    for X in batches:
+        horizon_proba = model.predict_horizons(X)
+        proba = horizon_proba[:, model.target_index]
+        yield model.classes_[proba.argmax(axis=1)], proba, horizon_proba
+
+
+def signed_scores(model, proba):
+    """
+    P(highest class) - P(lowest class) of each row, i.e. P(up) - P(down) for the
+    down/flat/up classifiers: a signal in [-1, 1] that ranks like a regressor's return.
+    """
+    classes = np.asarray(model.classes_)
+    return proba[:, classes.argmax()] - proba[:, classes.argmin()]
+
+
+def predict_panel(model, panel, columns, batch_size=50_000):
+    """
+    Model output for every present cell of a MarketPanel, as a (date x ticker) array:
+    a regressor's predictions, or a classifier's signed_scores (its class labels do not
+    rank as a long/short signal). Feature rows are built and scored a block of dates at
+    a time, so at most about `batch_size` rows are held in memory whatever the history length.
+    """
+    out = np.full(panel.shape, np.nan)
+    dates_per_batch = max(1, batch_size // max(len(panel.tickers), 1))
+    blocks = [slice(start, start + dates_per_batch) for start in range(0, len(panel.dates), dates_per_batch)]
+
+    def batches():
+        for block in blocks:
+            rows = panel.slice_dates(block)
+            yield pd.DataFrame({name: rows.row_values(name) for name in columns})
+
+    for block, (labels, proba) in zip(blocks, predict_batches(model, batches())):
+        out[block][panel.mask[block]] = labels if proba is None else signed_scores(model, proba)
+    return out
@@ -0,0 +1,166 @@
+import argparse
+import hashlib
+import json
+import threading
+from datetime import datetime
+from pathlib import Path
+
+import joblib
+import yaml
+
+project_root = Path(__file__).resolve().parents[2]
+config_path = project_root / "config.yaml"
+
+with open(config_path, "r") as f:
+    config = yaml.safe_load(f)
+
+# model trained before the registry, served when no version has been registered yet
+legacy_model_path = Path(__file__).resolve().parent / "xgb_model.pkl"
+
+
+def config_hash(config):
+    return hashlib.sha256(json.dumps(config, sort_keys=True, default=str).encode()).hexdigest()[:16]
+
+
+class ModelRegistry:
+    """
+    Versioned model artifacts under <root>/<version>/, each an uncompressed joblib
+    dump (model.joblib) with a metadata.json recording its feature columns and the hash
+    of the config it was trained with. <root>/CURRENT names the version being served.
+
+    Loading is lazy and uses mmap_mode='r', so the NumPy arrays of an artifact are paged
+    in from the OS cache and shared by every worker process that maps the same file.
+    `get` re-reads CURRENT (one small file read) and loads the new version after an
+    `activate`, which is how models are hot-swapped without a restart.
+    """
+
+    def __init__(self, root):
+        self.root = Path(root)
+        self.current_path = self.root / "CURRENT"
+        self._loaded = None  # (version, model, metadata)
+        self._lock = threading.Lock()
+
+    def versions(self):
+        if not self.root.exists():
+            return []
+        return sorted(path.parent.name for path in self.root.glob("*/metadata.json"))
+
+    def current_version(self):
+        if not self.current_path.exists():
+            return None
+        return self.current_path.read_text().strip()
+
+    def metadata(self, version):
+        with open(self.root / version / "metadata.json", "r") as f:
+            return json.load(f)
+
+    def register(self, model, feature_columns, config, version=None, activate=True):
+        """Save `model` as a new version (a timestamp by default) and make it current."""
+        version = version or datetime.now().strftime("%Y%m%d-%H%M%S")
+        version_dir = self.root / version
+        if version_dir.exists():
+            raise ValueError(f"Model version {version} already exists")
+        version_dir.mkdir(parents=True)
+
+        # uncompressed, so the arrays can be memory-mapped on load
+        joblib.dump(model, version_dir / "model.joblib")
+        metadata = {
+            'version': version,
+            'model_class': type(model).__name__,
+            'feature_columns': list(feature_columns),
+            'config_hash': config_hash(config),
+            'created': datetime.now().isoformat(timespec="seconds"),
+        }
+        with open(version_dir / "metadata.json", "w") as f:
+            json.dump(metadata, f, indent=2)
+
+        if activate:
+            self.activate(version)
+        return version
+
+    def activate(self, version):
+        if version not in self.versions():
+            raise KeyError(f"Unknown model version: {version}")
+        # write then rename, so readers never see a partial pointer
+        tmp_path = self.current_path.with_suffix(".tmp")
+        tmp_path.write_text(version)
+        tmp_path.replace(self.current_path)
+
+    def get(self, feature_columns=None):
+        """
+        (model, metadata) of the current version, loaded on first use or after a swap.
+        Raises ValueError when the model was trained on other features than `feature_columns`.
+        """
+        version = self.current_version()
+        loaded = self._loaded
+        if loaded is None or loaded[0] != version:
+            with self._lock:
+                loaded = self._loaded
+                if loaded is None or loaded[0] != version:
+                    loaded = self._load(version)
+                    self._loaded = loaded
+
+        _, model, metadata = loaded
+        expected = metadata['feature_columns']
+        if feature_columns is not None and expected is not None and expected != list(feature_columns):
+            raise ValueError(f"Model {metadata['version']} expects features {expected}")
+        return model, metadata
+
+    def _load(self, version):
+        if version is None:
+            print(f"No registered model, loading {legacy_model_path.name}...")
+            model = joblib.load(legacy_model_path)
+            metadata = {
+                'version': 'legacy',
+                'model_class': type(model).__name__,
+                'feature_columns': list(model.feature_names_in_) if hasattr(model, 'feature_names_in_') else None,
+            }
+            return version, model, metadata
+
+        print(f"Loading model {version}...")
+        model = joblib.load(self.root / version / "model.joblib", mmap_mode="r")
+        return version, model, self.metadata(version)
+
+
+_registry = None
+
+
+def get_registry():
+    """Registry at the configured path, created on first use."""
+    global _registry
+    if _registry is None:
+        _registry = ModelRegistry(project_root / config["data"]["model_registry"])
+    return _registry
+
+
+def get_model(feature_columns=None):
+    """Current model of the configured registry."""
+    return get_registry().get(feature_columns)[0]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    subparsers.add_parser("list", help="list registered versions")
+    activate_parser = subparsers.add_parser("activate", help="serve another version")
+    activate_parser.add_argument("version")
+    import_parser = subparsers.add_parser("import", help="register an existing joblib/pickle model")
+    import_parser.add_argument("path", nargs="?", default=str(legacy_model_path))
+    import_parser.add_argument("--version")
+    args = parser.parse_args()
+
+    registry = get_registry()
+    if args.command == "list":
+        current = registry.current_version()
+        for version in registry.versions():
+            metadata = registry.metadata(version)
+            marker = "*" if version == current else " "
+            print(f"{marker} {version}  {metadata['model_class']}  config {metadata['config_hash']}  {len(metadata['feature_columns'])} features")
+    elif args.command == "activate":
+        registry.activate(args.version)
+        print(f"Serving model {args.version}")
+    else:
+        from features.feature_helpers import get_feature_columns
+        model = joblib.load(args.path)
+        version = registry.register(model, get_feature_columns(config), config, args.version)
+        print(f"Registered {args.path} as model {version}")
@@ -0,0 +1,38 @@
+import numpy as np
+
+# down, flat, up (data.split_helpers.class_labels)
+classes = np.array([0, 1, 2])
+
+
+class MultiHorizonModel:
+    """
+    Down/flat/up classifiers of several forward-return horizons behind one model
+    artifact. predict and predict_proba answer for `target_horizon`, so the model is
+    served wherever a single classifier is (model registry, predict_batches,
+    PredictionBuilder); predict_horizons scores every horizon on the same feature batch.
+    """
+
+    def __init__(self, horizons, target_horizon, estimators):
+        self.horizons = list(horizons)
+        self.target_horizon = target_horizon
+        self.target_index = self.horizons.index(target_horizon)
+        self.estimators = list(estimators)
+        self.classes_ = classes
+        if hasattr(self.estimators[0], "feature_names_in_"):
+            self.feature_names_in_ = self.estimators[0].feature_names_in_
+
+    def _proba(self, estimator, X):
+        # a class missing from a horizon's training labels gets probability 0
+        proba = np.zeros((len(X), len(classes)))
+        proba[:, np.searchsorted(classes, estimator.classes_)] = estimator.predict_proba(X)
+        return proba
+
+    def predict_horizons(self, X):
+        """(rows x horizons x classes) probabilities of every horizon."""
+        return np.stack([self._proba(estimator, X) for estimator in self.estimators], axis=1)
+
+    def predict_proba(self, X):
+        return self._proba(self.estimators[self.target_index], X)
+
+    def predict(self, X):
+        return classes[self.predict_proba(X).argmax(axis=1)]
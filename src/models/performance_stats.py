@@ -0,0 +1,145 @@
+import numpy as np
+
+
+def _merge_moments(count, mean, m2, batch_count, batch_mean, batch_m2):
+    """Combine running (count, mean, M2) with a batch's (Chan et al.'s parallel Welford update)."""
+    total = count + batch_count
+    delta = batch_mean - mean
+    weight = np.divide(batch_count, total, out=np.zeros_like(mean), where=total > 0)
+    mean = mean + delta * weight
+    m2 = m2 + batch_m2 + delta ** 2 * count * weight
+    return total, mean, m2
+
+
+def _batch_moments(values, valid, axis):
+    """Count, mean and M2 of the `valid` entries of `values` along `axis`."""
+    count = valid.sum(axis=axis)
+    total = np.where(valid, values, 0.0).sum(axis=axis)
+    mean = np.divide(total, count, out=np.zeros(np.shape(count)), where=count > 0)
+    deviation = np.where(valid, values - (mean if axis is None else np.expand_dims(mean, axis)), 0.0)
+    return count, mean, (deviation ** 2).sum(axis=axis)
+
+
+class PerformanceStats:
+    """
+    Running backtest statistics behind PredictionBuilder.get_stats and get_stock_performance.
+
+    Every update consumes a block of dates of a panel with StrategyReturn and
+    CumulativeReturn fields, vectorized over tickers: trade counts and wins, running
+    mean/variance (Welford, merged per block) of the traded returns per ticker and of all
+    returns, the compounded mean daily return and the running max drawdown of the equal
+    weight portfolio. Appending days is O(new rows). A trade is a row with a known,
+    non-zero return, the same rule as PredictionBuilder's Traded field: rows whose Target
+    is not known yet (NaN) are neither trades nor part of the means and deviations.
+    """
+
+    def __init__(self, tickers):
+        self.tickers = np.asarray(tickers)
+        n = len(self.tickers)
+        # per ticker, over traded rows
+        self.trades = np.zeros(n, dtype=np.int64)
+        self.wins = np.zeros(n, dtype=np.int64)
+        self.trade_count = np.zeros(n)
+        self.trade_mean = np.zeros(n)
+        self.trade_m2 = np.zeros(n)
+        self.last_cumulative = np.full(n, np.nan)
+        # portfolio, over every row
+        self.row_count, self.row_mean, self.row_m2 = 0.0, 0.0, 0.0
+        self.growth = 1.0
+        self.n_portfolio_days = 0
+        self.equity = 1.0
+        self.peak = -np.inf
+        self.max_drawdown = np.nan
+
+    @classmethod
+    def from_panel(cls, panel):
+        return cls(panel.tickers).update(panel)
+
+    def copy(self):
+        stats = PerformanceStats.__new__(PerformanceStats)
+        stats.__dict__ = {name: value.copy() if isinstance(value, np.ndarray) else value
+                          for name, value in self.__dict__.items()}
+        return stats
+
+    def update(self, panel):
+        """Add the dates of `panel` (after every date seen so far), returns self."""
+        returns = np.where(panel.mask, panel['StrategyReturn'], 0.0)
+        present = ~np.isnan(returns) & panel.mask
+        traded = (np.nan_to_num(returns) != 0) & panel.mask
+
+        # ===== Per ticker =====
+
+        self.trades += traded.sum(axis=0)
+        self.wins += (traded & (returns > 0)).sum(axis=0)
+        self.trade_count, self.trade_mean, self.trade_m2 = _merge_moments(
+            self.trade_count, self.trade_mean, self.trade_m2, *_batch_moments(returns, traded, axis=0))
+
+        last_row = len(panel.dates) - 1 - np.argmax(traded[::-1], axis=0)
+        has_trade = traded.any(axis=0)
+        cumulative = panel['CumulativeReturn'][last_row, np.arange(len(self.tickers))]
+        self.last_cumulative = np.where(has_trade, cumulative, self.last_cumulative)
+
+        # ===== Portfolio =====
+
+        row_moments = _merge_moments(np.float64(self.row_count), np.float64(self.row_mean), np.float64(self.row_m2),
+                                     *_batch_moments(returns, present, axis=None))
+        self.row_count, self.row_mean, self.row_m2 = map(float, row_moments)
+
+        # compounded mean return of the present rows of each date
+        date_counts = present.sum(axis=1)
+        date_means = np.where(present, returns, 0.0).sum(axis=1)[date_counts > 0] / date_counts[date_counts > 0]
+        self.growth *= np.prod(1 + date_means)
+
+        # equal weight daily returns, as in portfolio_returns_df (NaN on dates with a NaN return)
+        positions = panel.mask.sum(axis=1)
+        daily = returns.sum(axis=1)[positions > 0] / positions[positions > 0]
+        self.n_portfolio_days += len(daily)
+        valid = ~np.isnan(daily)
+        if valid.any():
+            equity = self.equity * np.cumprod(1 + daily[valid])
+            peak = np.maximum(self.peak, np.maximum.accumulate(equity))
+            drawdown = ((equity - peak) / peak).min()
+            self.max_drawdown = drawdown if np.isnan(self.max_drawdown) else min(self.max_drawdown, drawdown)
+            self.equity, self.peak = equity[-1], peak[-1]
+        return self
+
+    # ===== Results =====
+
+    def _trade_std(self):
+        return np.sqrt(np.divide(self.trade_m2, self.trade_count - 1, out=np.full(len(self.tickers), np.nan),
+                                 where=self.trade_count > 1))
+
+    def summary(self):
+        """get_stats' portfolio statistics (the trade statistics are 0 without trades, like maxDrawdown without days)."""
+        total_trades = int(self.trades.sum())
+        avg_trade = (self.trade_mean * self.trade_count).sum() / total_trades if total_trades else 0.0
+        std = np.sqrt(self.row_m2 / (self.row_count - 1)) if self.row_count > 1 else np.nan
+        return {
+            "totalReturn": float(self.growth - 1),
+            "sharpe": float(avg_trade / std) if total_trades and std > 0 else 0.0,
+            "winRate": float(self.wins.sum() / total_trades) if total_trades else 0.0,
+            "maxDrawdown": float(self.max_drawdown) if self.n_portfolio_days else 0.0,
+            "totalTrades": total_trades,
+            "avgTrade": float(avg_trade),
+        }
+
+    def stock_performance(self):
+        """get_stock_performance's per-ticker statistics, for tickers with at least one trade."""
+        mean = np.where(self.trade_count > 0, self.trade_mean, np.nan)
+        std = self._trade_std()
+        with np.errstate(invalid='ignore', divide='ignore'):
+            sharpe = np.where((std > 0) & (self.trades > 1), mean / std * 252 ** 0.5, 0.0)
+
+        stock_perf = []
+        for i in np.argsort(self.tickers, kind='stable'):
+            if self.trades[i] == 0:
+                continue  # Skip stocks never traded
+            stock_perf.append({
+                'ticker': str(self.tickers[i]),
+                'trades': int(self.trades[i]),
+                'winRate': round(float(self.wins[i] / self.trades[i]), 2),
+                'avgReturn': round(float(mean[i]), 4),
+                'totalReturn': round(float(self.last_cumulative[i]), 4),
+                'sharpe': round(float(sharpe[i]), 2),
+            })
+        return stock_perf
@@ -1,8 +1,12 @@
-import joblib
 import pandas as pd
 from pathlib import Path
 import yaml
 import shutil
+import json
+from data.split_helpers import load_split
+from models.inference_helpers import predict_batches, predict_horizon_batches
+from models.model_registry import get_registry
+from instrumentation import stage
 
 project_root = Path(__file__).resolve().parents[2]
 config_path = project_root / "config.yaml"
@@ -10,30 +14,62 @@ config_path = project_root / "config.yaml"
 with open(config_path, "r") as f:
     config = yaml.safe_load(f)
 
+batch_size = config['inference']['batch_size']
 
-print("Loading test data...")
-processed_data_path = project_root / config["data"]["processed"]
-X_test = pd.read_csv(processed_data_path / "X_test.csv", index_col=0)
-y_test = pd.read_csv(processed_data_path / "y_test.csv", index_col=0)
 
-print("Loading trained model...")
-model = joblib.load(Path(__file__).resolve().parent / "xgb_model.pkl")
+def main():
+    """Score the test set in batches and save the predictions to the experiment directory."""
+    split, metadata = load_split(project_root / config["data"]["split"])
 
-print("Making predictions...")
-y_pred = model.predict(X_test)
-y_proba = model.predict_proba(X_test)
+    # the registry refuses a model trained on other features than the split's
+    print("Loading trained model...")
+    model, model_metadata = get_registry().get(metadata['feature_columns'])
 
+    prediction_dir = project_root / config["data"]["experiment"]
+    prediction_dir.mkdir(parents=True, exist_ok=True) 
 
-# ===== Saving predictions =====
-prediction_dir = Path(__file__).resolve().parents[2]/ "experiments" / "run3"
-prediction_dir.mkdir(parents=True, exist_ok=True) 
 
-print("Saving this run's predictions...")
-df_pred = pd.DataFrame(y_pred, columns=["Target"])
-df_pred.to_csv(prediction_dir / "predictions.csv")
+    # ===== Streaming predictions =====
+    # the memory-mapped test rows are scored and saved one chunk at a time, so memory does not grow with the test set
 
-df_prob = pd.DataFrame(y_proba, columns=['Prob_Down', 'Prob_Flat', 'Prob_Up'])
-df_prob.to_csv(prediction_dir / "predictions_prob.csv")
+    print("Making predictions...")
+    X_test = split['X_test']
+    X_test_chunks = (pd.DataFrame(X_test[start:start + batch_size], columns=metadata['feature_columns'])
+                     for start in range(0, len(X_test), batch_size))
 
-print("Copying this run's config...")
-shutil.copy(config_path, prediction_dir)
\ No newline at end of file
+    # a multi-horizon model also writes the probabilities of every horizon, Prob_Down_<h>d etc.
+    if hasattr(model, "predict_horizons"):
+        batches = predict_horizon_batches(model, X_test_chunks)
+    else:
+        batches = ((labels, proba, None) for labels, proba in predict_batches(model, X_test_chunks))
+
+    offset = 0
+    with stage("predict") as record:
+        for labels, proba, horizon_proba in batches:
+            index = pd.RangeIndex(offset, offset + len(labels))
+            first_chunk = offset == 0
+            mode = "w" if first_chunk else "a"
+
+            df_pred = pd.DataFrame(labels, columns=["Target"], index=index)
+            df_pred.to_csv(prediction_dir / "predictions.csv", mode=mode, header=first_chunk)
+
+            df_prob = pd.DataFrame(proba, columns=['Prob_Down', 'Prob_Flat', 'Prob_Up'], index=index)
+            if horizon_proba is not None:
+                for j, horizon in enumerate(model.horizons):
+                    for k, side in enumerate(['Down', 'Flat', 'Up']):
+                        df_prob[f"Prob_{side}_{horizon}d"] = horizon_proba[:, j, k]
+            df_prob.to_csv(prediction_dir / "predictions_prob.csv", mode=mode, header=first_chunk)
+
+            offset += len(labels)
+        record.rows = offset
+
+    print(f"Saved {offset} predictions to {prediction_dir}")
+
+    print("Copying this run's config and model version...")
+    shutil.copy(config_path, prediction_dir)
+    with open(prediction_dir / "model.json", "w") as f:
+        json.dump(model_metadata, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,45 @@
+import numpy as np
+import pandas as pd
+
+
+def select_long_short(dates, predictions, top_pct=0.2, bottom_pct=0.2, min_signal=0.8):
+    """
+    Cross-sectional long/short selection for every date in a single pass.
+
+    Only predictions with abs(prediction) > min_signal are eligible. On each date the
+    top `top_pct` eligible rows go long (+1) and the bottom `bottom_pct` go short (-1),
+    with at least one of each when any row is eligible. Ties are broken by row order,
+    like `nlargest`/`nsmallest` with keep='first'. A row picked on both sides ends up short.
+
+    Returns an int8 array aligned with the inputs: +1 long, -1 short, 0 no position.
+    """
+    predictions = np.asarray(predictions, dtype=float)
+    date_codes, _ = pd.factorize(np.asarray(dates))
+    side = np.zeros(len(predictions), dtype=np.int8)
+
+    eligible = np.flatnonzero(np.abs(predictions) > min_signal)
+    if eligible.size == 0:
+        return side
+
+    codes = date_codes[eligible]
+    scores = predictions[eligible]
+
+    counts = np.bincount(codes)
+    starts = np.cumsum(counts) - counts
+    n_top = np.maximum(1, (top_pct * counts).astype(int))
+    n_bottom = np.maximum(1, (bottom_pct * counts).astype(int))
+
+    # sort by date, then score, then original position (stable tie-break)
+    order_desc = np.lexsort((eligible, -scores, codes))
+    order_asc = np.lexsort((eligible, scores, codes))
+    rank = np.arange(eligible.size)
+
+    desc_codes = codes[order_desc]
+    top = eligible[order_desc[rank - starts[desc_codes] < n_top[desc_codes]]]
+
+    asc_codes = codes[order_asc]
+    bottom = eligible[order_asc[rank - starts[asc_codes] < n_bottom[asc_codes]]]
+
+    side[top] = 1
+    side[bottom] = -1
+    return side
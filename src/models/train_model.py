@@ -1,11 +1,14 @@
-import numpy as np
-from sklearn.ensemble import RandomForestRegressor
-from sklearn.utils import compute_class_weight
+import argparse
 import yaml
 from pathlib import Path
+import numpy as np
 import pandas as pd
-import joblib
-from sklearn.preprocessing import OneHotEncoder
+from data.schema import from_day_numbers
+from data.split_helpers import load_split
+from models.model_registry import get_registry
+from models.training_helpers import build_model, balanced_sample_weight, walk_forward_folds, train_walk_forward, \
+    train_multi_horizon
+from instrumentation import stage
 
 
 project_root = Path(__file__).resolve().parents[2]
@@ -14,64 +17,68 @@ config_path = project_root / "config.yaml"
 with open(config_path, "r") as f:
     config = yaml.safe_load(f)
 
-processed_data_path = project_root / config["data"]["processed"]
-data_with_fts_path = processed_data_path / "data_with_fts.csv"
-
-print("Loading data with features")
-data = pd.read_csv(data_with_fts_path, index_col=0)
-
-
-# one-hot encore ticker values
 
-encoder = OneHotEncoder(handle_unknown='ignore', sparse_output=False)
-encoded_values = encoder.fit_transform(data[['Ticker']])
-new_cols = encoder.get_feature_names_out(['Ticker'])
+def main():
+    """Train and register the model (one per horizon with --multi-horizon), or evaluate it on walk-forward folds with --walk-forward."""
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--walk-forward", action="store_true", help="evaluate on expanding-window folds instead of training the final model")
+    parser.add_argument("--multi-horizon", action="store_true", help="train down/flat/up classifiers of every split horizon as one model")
+    args = parser.parse_args()
 
-tickers_encoded = pd.DataFrame(encoded_values, columns=new_cols, index=data.index)
-data = pd.concat([data, tickers_encoded], axis=1)
+    # labelled by data/split_data.py: features lagged a day, rows without a target or features dropped
+    print("Loading the train split")
+    split, metadata = load_split(project_root / config["data"]["split"])
+    feature_columns = metadata['feature_columns']
+    target = metadata['horizons'].index(metadata['target_horizon'])
 
-# get all feature columns
 
-feature_columns = config['features']['returns']\
-    + config['features']['rolling_volatility']\
-    + config['features']['moving_avg']\
-    + config['features']['momentum_indicators']\
-    + config['features']['macro_features']\
-    + config['features']['volume_features']\
-    + config['features']['market_index_features']\
-    + config['features']['atr']\
-    + config['features']['bb']\
-    + config['features']['price_range']
-    # + new_cols.tolist()
+    # training data (forward return of the target horizon)
 
+    X_train = pd.DataFrame(split['X_train'], columns=feature_columns)
+    y_train = pd.Series(split['returns_train'][:, target])
 
-# prevent data leakage from using same-day data
-data[feature_columns] = data.groupby('Ticker')[feature_columns].shift(1) 
-data.dropna()
 
+    # ===== Walk-forward evaluation =====
 
-# training data
+    if args.walk_forward:
+        walk_forward = config['training']['walk_forward']
+        # every labelled row, train and test split alike, in date order
+        dates = from_day_numbers(np.concatenate([split['dates_train'], split['dates_test']]))
+        X = np.concatenate([split['X_train'], split['X_test']])
+        y = np.concatenate([split['returns_train'][:, target], split['returns_test'][:, target]])
+        folds = walk_forward_folds(dates, walk_forward['n_folds'], walk_forward['test_days'], walk_forward['embargo_days'])
 
-X_train = data[feature_columns]
-y_train = data["Target"]
+        print(f"Training {len(folds)} walk-forward folds...")
+        with stage("walk_forward", rows=len(X)):
+            fold_metrics = train_walk_forward(dates.to_numpy(), X, y, folds,
+                                              project_root / walk_forward['cache'], config['training']['n_jobs'])
+        print(fold_metrics.to_string(index=False))
 
+        fold_metrics.to_csv(project_root / walk_forward['cache'] / "fold_metrics.csv", index=False)
+        print("Fold metrics saved to fold_metrics.csv")
+        return
 
-# Account for class imbalance
 
-classes = np.unique(y_train)
-weights_array = compute_class_weight("balanced", classes=classes, y=y_train)
-class_weights = dict(zip(classes, weights_array))
-sample_weight = y_train.map(class_weights)
+    # Train model on entire dataset (Account for class imbalance)
 
+    print("Training model...")
+    if args.multi_horizon:
+        # the classes of every horizon, fitted together on the same feature matrix
+        print(f"One classifier per horizon: {metadata['horizons']} days")
+        with stage("fit", rows=len(X_train)):
+            model = train_multi_horizon(X_train, split['y_train'], metadata['horizons'], metadata['target_horizon'],
+                                        config['training']['n_jobs'])
+    else:
+        model = build_model(config['training']['n_jobs'])
+        with stage("fit", rows=len(X_train)):
+            model.fit(X_train, y_train, sample_weight=balanced_sample_weight(y_train.to_numpy()))
 
-# Train model on entire dataset
 
-print("Training model...")
-model = RandomForestRegressor(n_estimators=200, max_depth=8)
-model.fit(X_train, y_train, sample_weight=sample_weight)
+    # Register model to make predicitons in the future
 
+    version = get_registry().register(model, feature_columns, config)
+    print(f"Model registered as version {version}")
 
-# Save model to make predicitons in the future
 
-joblib.dump(model, Path(__file__).resolve().parent / "xgb_model.pkl")
-print("Model saved to xgb_model.pkl")
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,148 @@
+import os
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+import joblib
+import numpy as np
+import pandas as pd
+from sklearn.ensemble import RandomForestClassifier, RandomForestRegressor
+from sklearn.metrics import mean_absolute_error, mean_squared_error
+from sklearn.utils import compute_class_weight
+from models.multi_horizon import MultiHorizonModel
+
+
+model_params = {'n_estimators': 200, 'max_depth': 8}
+
+
+def build_model(n_jobs=1):
+    return RandomForestRegressor(**model_params, n_jobs=n_jobs)
+
+
+def build_classifier(n_jobs=1):
+    return RandomForestClassifier(**model_params, n_jobs=n_jobs)
+
+
+def balanced_sample_weight(y):
+    """Per-row weights that balance the classes of `y` (compute_class_weight("balanced"))."""
+    classes = np.unique(y)
+    weights_array = compute_class_weight("balanced", classes=classes, y=y)
+    return pd.Series(y).map(dict(zip(classes, weights_array))).to_numpy()
+
+
+def walk_forward_folds(dates, n_folds, test_days, embargo_days=0):
+    """
+    Expanding-window folds over the sorted unique `dates`. The last n_folds * test_days
+    dates are split into consecutive test blocks; each fold trains on every date before
+    its block except the last `embargo_days`, whose targets overlap the test period.
+    """
+    unique_dates = np.sort(pd.unique(pd.to_datetime(dates)))
+    first_test = len(unique_dates) - n_folds * test_days
+    if first_test - embargo_days < 1:
+        raise ValueError(f"{len(unique_dates)} dates are too few for {n_folds} folds of {test_days} test days")
+
+    folds = []
+    for fold in range(n_folds):
+        test_start = first_test + fold * test_days
+        folds.append({
+            'fold': fold,
+            'train_start': unique_dates[0],
+            'train_end': unique_dates[test_start - embargo_days - 1],
+            'test_start': unique_dates[test_start],
+            'test_end': unique_dates[test_start + test_days - 1],
+        })
+    return folds
+
+
+def regression_metrics(y_true, y_pred):
+    """Out-of-sample error, directional accuracy and rank information coefficient."""
+    valid = np.isfinite(y_true) & np.isfinite(y_pred)
+    y_true, y_pred = y_true[valid], y_pred[valid]
+    return {
+        'rows': int(valid.sum()),
+        'mse': mean_squared_error(y_true, y_pred),
+        'mae': mean_absolute_error(y_true, y_pred),
+        'hit_rate': float(np.mean(np.sign(y_true) == np.sign(y_pred))),
+        'ic': float(np.corrcoef(pd.Series(y_true).rank(), pd.Series(y_pred).rank())[0, 1]),
+    }
+
+
+# ===== Parallel fold training =====
+
+# training arrays, set once per process and only read by the folds
+_inputs = {}
+
+
+def _set_inputs(inputs):
+    _inputs.update(inputs)
+
+
+def _train_fold(task):
+    fold, cache_path, n_jobs = task
+    dates, X, y = _inputs['dates'], _inputs['X'], _inputs['y']
+    train = (dates >= fold['train_start']) & (dates <= fold['train_end'])
+    test = (dates >= fold['test_start']) & (dates <= fold['test_end'])
+
+    cached = cache_path.exists()
+    if cached:
+        model = joblib.load(cache_path)
+    else:
+        model = build_model(n_jobs)
+        model.fit(X[train], y[train], sample_weight=balanced_sample_weight(y[train]))
+        joblib.dump(model, cache_path)
+
+    metrics = regression_metrics(y[test], model.predict(X[test]))
+    return {**fold, 'cached': cached, **metrics}
+
+
+def train_walk_forward(dates, X, y, folds, cache_dir, n_jobs=-1):
+    """
+    Train one model per fold, folds in a process pool, and return the per-fold
+    out-of-sample metrics. `n_jobs` cores are split between concurrent folds and the
+    trees of each forest, so the two levels never oversubscribe the machine.
+
+    Each fold's model is cached in `cache_dir` under a hash of the training data, the
+    fold bounds and the model parameters; re-running with the same inputs only evaluates.
+    """
+    if n_jobs in (None, -1):
+        n_jobs = os.cpu_count() or 1
+    fold_workers = max(1, min(n_jobs, len(folds)))
+    tree_jobs = max(1, n_jobs // fold_workers)
+
+    cache_dir.mkdir(parents=True, exist_ok=True)
+    data_hash = joblib.hash((dates, X, y))
+    tasks = [(fold, cache_dir / f"fold_{joblib.hash((data_hash, fold, model_params))}.pkl", tree_jobs) for fold in folds]
+
+    inputs = {'dates': np.asarray(dates), 'X': X, 'y': y}
+    if fold_workers == 1:
+        _set_inputs(inputs)
+        results = [_train_fold(task) for task in tasks]
+    else:
+        with ProcessPoolExecutor(fold_workers, initializer=_set_inputs, initargs=(inputs,)) as pool:
+            results = list(pool.map(_train_fold, tasks))
+
+    return pd.DataFrame(results)
+
+
+# ===== Multi-horizon training =====
+
+def _fit_horizon(X, labels, n_jobs):
+    known = labels >= 0
+    model = build_classifier(n_jobs)
+    return model.fit(X[known], labels[known], sample_weight=balanced_sample_weight(labels[known]))
+
+
+def train_multi_horizon(X, Y, horizons, target_horizon, n_jobs=-1):
+    """
+    One down/flat/up classifier per horizon (column of Y, -1 for unknown labels) on the
+    shared feature matrix X, fitted concurrently and returned as one MultiHorizonModel.
+    The fits run in threads, which forest fitting does not serialize on the GIL, so X
+    (typically memory-mapped) is shared instead of copied to worker processes; `n_jobs`
+    cores are split between the concurrent fits and the trees of each forest.
+    """
+    if n_jobs in (None, -1):
+        n_jobs = os.cpu_count() or 1
+    horizon_workers = max(1, min(n_jobs, len(horizons)))
+    tree_jobs = max(1, n_jobs // horizon_workers)
+
+    with ThreadPoolExecutor(horizon_workers) as pool:
+        estimators = list(pool.map(lambda j: _fit_horizon(X, Y[:, j], tree_jobs), range(len(horizons))))
+    return MultiHorizonModel(horizons, target_horizon, estimators)
@@ -0,0 +1,284 @@
+import base64
+import fcntl
+import json
+import mmap
+import shutil
+import threading
+import time
+import uuid
+from datetime import datetime
+from pathlib import Path
+
+import pandas as pd
+import pyarrow as pa
+from data.schema import TickerDateIndex, day_numbers, from_record_batch, to_record_batch
+
+
+def _write_json(path, payload):
+    # write then rename, so readers never see a partial file
+    tmp_path = path.with_name(path.name + ".tmp")
+    tmp_path.write_text(json.dumps(payload))
+    tmp_path.replace(path)
+
+
+def _encode_cursor(ticker, day):
+    # (ticker, day) of the next row rather than a row position, so cursors stay valid across refreshes
+    return base64.urlsafe_b64encode(json.dumps([str(ticker), int(day)]).encode()).decode()
+
+
+def _decode_cursor(cursor):
+    try:
+        ticker, day = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+    except (ValueError, TypeError):
+        raise ValueError("Invalid cursor")
+    # any JSON decodes, only [ticker, day] is a cursor
+    if not isinstance(ticker, str) or not isinstance(day, int) or isinstance(day, bool):
+        raise ValueError("Invalid cursor")
+    return ticker, day
+
+
+class Snapshot:
+    """
+    What the API serves: the materialized response bodies ({name: (etag, body)}), the
+    latest-bar scores and the per-stock daily returns, for one version of the backtest.
+    """
+
+    def __init__(self, responses, latest_scores, daily_returns_df, model_version, generation=None):
+        self.responses = responses
+        self.latest_scores = latest_scores
+        self.daily_returns_df = daily_returns_df
+        self.model_version = model_version
+        self.generation = generation
+        self._daily_returns_index = None
+
+    def get_latest_predictions(self, tickers=None):
+        """Latest-bar predictions for `tickers` (all tickers when None); raises KeyError for unknown tickers."""
+        scores = self.latest_scores
+        if tickers is None:
+            return {"predictions": list(scores.values())}
+        unknown = [ticker for ticker in tickers if ticker not in scores]
+        if unknown:
+            raise KeyError(f"Unknown tickers: {unknown}")
+        return {"predictions": [scores[ticker] for ticker in tickers]}
+
+    def daily_returns_page(self, tickers=None, start=None, end=None, columns=None, cursor=None, limit=1000):
+        """
+        Up to `limit` per-stock daily returns of `tickers` between the dates `start` and `end`
+        (inclusive) in (Ticker, Date) order, with the Date, Ticker and `columns` (all when None)
+        columns. `cursor` continues from the previous page. Returns (page, next cursor or None);
+        raises KeyError for unknown tickers and ValueError for unknown columns or a bad cursor.
+        """
+        df = self.daily_returns_df
+        value_columns = [name for name in df.columns if name not in ('Date', 'Ticker')]
+        columns = value_columns if columns is None else list(columns)
+        unknown = [name for name in columns if name not in value_columns]
+        if unknown:
+            raise ValueError(f"Unknown columns: {unknown}, expected some of {value_columns}")
+
+        # built on first use, once per snapshot
+        if self._daily_returns_index is None:
+            self._daily_returns_index = TickerDateIndex(df)
+        index = self._daily_returns_index
+        after = None
+        if cursor is not None:
+            ticker, day = _decode_cursor(cursor)
+            if ticker not in index.tickers:
+                raise ValueError("Invalid cursor")
+            after = (index.tickers.get_loc(ticker), day)
+
+        positions, next_row = index.page(
+            tickers,
+            start=day_numbers([start])[0] if start is not None else None,
+            end=day_numbers([end])[0] if end is not None else None,
+            after=after, limit=limit)
+        # only the page's rows are read, per column (iloc over a column list copies the columns first)
+        page = pd.DataFrame({name: df[name].array.take(positions) for name in ['Date', 'Ticker'] + columns})
+        next_cursor = _encode_cursor(index.tickers[next_row[0]], next_row[1]) if next_row is not None else None
+        return page, next_cursor
+
+
+class SharedState:
+    """
+    Backtest state built by one API worker and served by all of them.
+
+    The worker holding <root>/builder.lock runs the PredictionBuilder and publishes every
+    version of its state as a generation directory <root>/<generation>/: the response
+    bodies as files, the per-stock daily returns as an uncompressed Arrow IPC file and a
+    manifest.json with the ETags and latest scores. <root>/CURRENT names the served
+    generation along with the builder's startup status. The other workers memory-map the
+    current generation, so its pages live once in the OS cache however many workers run,
+    and `current` re-reads CURRENT (one small file read) to attach to a new generation
+    after a refresh. Commands that need the builder (refresh, model reload) are forwarded
+    to it as files under <root>/commands/.
+
+    CURRENT also names the builder that wrote it, which holds <root>/builder-<boot>.lock
+    for as long as its process runs. A CURRENT whose builder is gone (left by an earlier
+    run, or by a builder that exited) reads as "starting", and the workers retry the
+    builder lock every `takeover_seconds` so one of them takes over.
+    """
+
+    poll_seconds = 0.2
+    takeover_seconds = 5
+
+    def __init__(self, root):
+        self.root = Path(root)
+        self.current_path = self.root / "CURRENT"
+        self.commands_dir = self.root / "commands"
+        self.commands_dir.mkdir(parents=True, exist_ok=True)
+        self.is_builder = False
+        self._lock_file = None
+        self._pointer = {"status": "starting", "error": None, "generation": None, "builder": None}
+        self._boot_lock_file = None
+        self._attached = None
+        self._lock = threading.Lock()
+
+    # ===== Builder =====
+
+    def acquire_builder(self):
+        """Try to become the builder; the lock is held until the process exits."""
+        lock_file = open(self.root / "builder.lock", "w")
+        try:
+            fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            lock_file.close()
+            return False
+        self._lock_file = lock_file
+        self.is_builder = True
+
+        boot = uuid.uuid4().hex
+        self._boot_lock_file = open(self.root / f"builder-{boot}.lock", "w")
+        fcntl.flock(self._boot_lock_file, fcntl.LOCK_EX)
+        # commands and builder locks left by an earlier builder are stale
+        for path in self.commands_dir.iterdir():
+            path.unlink(missing_ok=True)
+        for path in self.root.glob("builder-*.lock"):
+            if path.name != f"builder-{boot}.lock":
+                path.unlink(missing_ok=True)
+        self._pointer["builder"] = boot
+        self.set_status("starting")
+        return True
+
+    def set_status(self, status, error=None):
+        self._pointer.update(status=status, error=error)
+        if status == "starting":
+            self._pointer["generation"] = None
+        _write_json(self.current_path, self._pointer)
+
+    def publish(self, snapshot):
+        """Write `snapshot` as a new generation and make it current, returns the generation."""
+        generation = datetime.now().strftime("%Y%m%d-%H%M%S-%f")
+        tmp_dir = self.root / f"{generation}.tmp"
+        tmp_dir.mkdir()
+
+        for name, (_, body) in snapshot.responses.items():
+            (tmp_dir / f"{name}.json").write_bytes(body)
+        batch = to_record_batch(snapshot.daily_returns_df)
+        with pa.OSFile(str(tmp_dir / "daily_returns.arrow"), "wb") as sink:
+            with pa.ipc.new_file(sink, batch.schema) as writer:
+                writer.write_batch(batch)
+        manifest = {
+            'generation': generation,
+            'created': datetime.now().isoformat(timespec="seconds"),
+            'modelVersion': snapshot.model_version,
+            'etags': {name: etag for name, (etag, _) in snapshot.responses.items()},
+            'latestScores': snapshot.latest_scores,
+        }
+        with open(tmp_dir / "manifest.json", "w") as f:
+            json.dump(manifest, f)
+        tmp_dir.rename(self.root / generation)
+
+        previous = self._pointer["generation"]
+        self._pointer["generation"] = generation
+        _write_json(self.current_path, self._pointer)
+        # workers still mapping an older generation keep reading it after the unlink
+        for path in self.root.iterdir():
+            if path.is_dir() and path.name not in (generation, previous, self.commands_dir.name):
+                shutil.rmtree(path, ignore_errors=True)
+        return generation
+
+    def serve_commands(self, handler):
+        """Builder loop: run the commands other workers submit, handler(command) -> (status code, body)."""
+        while True:
+            for request_path in sorted(self.commands_dir.glob("*.json")):
+                try:
+                    command = json.loads(request_path.read_text())["command"]
+                    request_path.unlink()
+                except FileNotFoundError:
+                    continue  # withdrawn by a worker that gave up waiting
+                try:
+                    status_code, body = handler(command)
+                except Exception as e:
+                    status_code, body = 500, {"detail": repr(e)}
+                _write_json(request_path.with_suffix(".result"), {"statusCode": status_code, "body": body})
+            time.sleep(self.poll_seconds)
+
+    # ===== Workers =====
+
+    def status(self):
+        """The builder's startup status and current generation, "starting" until a running builder has written them."""
+        try:
+            pointer = json.loads(self.current_path.read_text())
+        except FileNotFoundError:
+            pointer = {}
+        if not self._builder_alive(pointer.get("builder")):
+            return {"status": "starting", "error": None, "generation": None, "builder": None}
+        return pointer
+
+    def _builder_alive(self, boot):
+        # the builder's lock is released with its process, so taking it means the builder is gone
+        if boot is None:
+            return False
+        try:
+            with open(self.root / f"builder-{boot}.lock", "r") as f:
+                try:
+                    fcntl.flock(f, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                except BlockingIOError:
+                    return True
+                return False
+        except FileNotFoundError:
+            return False
+
+    def current(self):
+        """Snapshot of the current generation, attached on first use or after a publish; None before the first."""
+        generation = self.status()["generation"]
+        if generation is None:
+            return None
+        attached = self._attached
+        if attached is None or attached.generation != generation:
+            with self._lock:
+                attached = self._attached
+                if attached is None or attached.generation != generation:
+                    attached = self._attach(generation)
+                    self._attached = attached
+        return attached
+
+    def _attach(self, generation):
+        generation_dir = self.root / generation
+        with open(generation_dir / "manifest.json", "r") as f:
+            manifest = json.load(f)
+
+        responses = {}
+        for name, etag in manifest['etags'].items():
+            with open(generation_dir / f"{name}.json", "rb") as f:
+                # the mapping outlives the file descriptor, the memoryview keeps it open
+                body = memoryview(mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ))
+            responses[name] = (etag, body)
+
+        reader = pa.ipc.open_file(pa.memory_map(str(generation_dir / "daily_returns.arrow"), "r"))
+        daily_returns_df = from_record_batch(reader.get_batch(0))
+        return Snapshot(responses, manifest['latestScores'], daily_returns_df, manifest['modelVersion'], generation)
+
+    def submit(self, command, timeout):
+        """Have the builder run `command`, returns its (status code, body); raises TimeoutError."""
+        request_path = self.commands_dir / f"{uuid.uuid4().hex}.json"
+        result_path = request_path.with_suffix(".result")
+        _write_json(request_path, {"command": command})
+        deadline = time.monotonic() + timeout
+        while not result_path.exists():
+            if time.monotonic() > deadline:
+                request_path.unlink(missing_ok=True)
+                raise TimeoutError(f"The builder did not run {command} within {timeout}s")
+            time.sleep(self.poll_seconds)
+        result = json.loads(result_path.read_text())
+        result_path.unlink()
+        return result["statusCode"], result["body"]
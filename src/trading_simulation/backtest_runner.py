@@ -0,0 +1,137 @@
+import argparse
+import inspect
+import itertools
+import os
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import pandas as pd
+import yaml
+from trading_simulation.simulation_helpers import load_simulation_data, run_backtest, summarize_backtest, \
+    simulate_portfolio, summarize_portfolio
+
+project_root = Path(__file__).resolve().parents[2]
+config_path = project_root / "config.yaml"
+experiments_path = project_root / "experiments"
+
+with open(config_path, "r") as f:
+    config = yaml.safe_load(f)
+
+# Compare backtests over experiment directories and parameter grids, headless and in parallel.
+# Usage (from src/): python -m trading_simulation.backtest_runner --experiments run1 run3 --holding-horizon 1 3 5 --top-pct 0.2 1.0
+
+# simulation data per experiment, loaded once per process and only read by the backtests
+_inputs = {}
+
+# backtest function of each engine, whose keyword parameters the grid may vary
+engines = {"rows": run_backtest, "portfolio": simulate_portfolio}
+
+
+def _load_inputs(experiment_dirs):
+    for experiment_dir in experiment_dirs:
+        if experiment_dir not in _inputs:
+            _inputs[experiment_dir] = load_simulation_data(experiment_dir)
+
+
+def _experiment_params(experiment_dir):
+    """Trading parameters of the config saved with the experiment (the current config's when it has none)."""
+    trading = config['trading']
+    experiment_config_path = experiment_dir / "config.yaml"
+    if experiment_config_path.exists():
+        with open(experiment_config_path, "r") as f:
+            trading = (yaml.safe_load(f) or {}).get('trading', trading)
+    return {'holding_horizon': trading['holding_horizon'], 'threshold_flat': trading['threshold_flat'],
+            'prediction_horizon': trading.get('prediction_horizon')}
+
+
+def _run_one(task):
+    experiment_dir, engine, params = task
+    if engine == "portfolio":
+        summary = summarize_portfolio(simulate_portfolio(_inputs[experiment_dir], **params))
+    else:
+        _, portfolio_returns = run_backtest(_inputs[experiment_dir], **params)
+        summary = summarize_backtest(portfolio_returns)
+    return {'experiment': experiment_dir.name, **params, **summary}
+
+
+def run_experiments(experiment_dirs=None, grid=None, n_jobs=None, engine="rows"):
+    """
+    Backtest every experiment directory with every combination of `grid` (a dict of
+    parameter -> list of values for run_backtest). Parameters left out of the grid come
+    from the trading section of the experiment's config.yaml. Returns one comparison table.
+
+    engine="rows" runs the per-row backtest of trading_simulation.py, engine="portfolio"
+    the tranche portfolio simulation, which also takes cost_bps, slippage_bps and slippage_vol.
+    Grid parameters the engine does not take raise a ValueError before anything runs.
+
+    Experiments are loaded once before the process pool starts; forked workers share
+    them read-only, other start methods load them once per worker.
+    """
+    if engine not in engines:
+        raise ValueError(f"Unknown engine {engine!r}, expected one of {list(engines)}")
+    # checked before any backtest runs, e.g. cost_bps on the rows engine
+    parameters = set(inspect.signature(engines[engine]).parameters) - {'data'}
+    unsupported = sorted(set(grid or {}) - parameters)
+    if unsupported:
+        raise ValueError(f"The {engine} engine does not take {unsupported}")
+
+    if experiment_dirs is None:
+        experiment_dirs = sorted(path.parent for path in experiments_path.glob("*/trading_sim_data.csv"))
+    experiment_dirs = [Path(path) for path in experiment_dirs]
+    _load_inputs(experiment_dirs)
+
+    tasks = []
+    for experiment_dir in experiment_dirs:
+        base_params = _experiment_params(experiment_dir)
+        grid_items = (grid or {}).items()
+        for values in itertools.product(*[values for _, values in grid_items]):
+            tasks.append((experiment_dir, engine, {**base_params, **dict(zip([name for name, _ in grid_items], values))}))
+
+    n_jobs = min(n_jobs or os.cpu_count() or 1, len(tasks))
+    if n_jobs <= 1:
+        results = [_run_one(task) for task in tasks]
+    else:
+        with ProcessPoolExecutor(n_jobs, initializer=_load_inputs, initargs=(experiment_dirs,)) as pool:
+            results = list(pool.map(_run_one, tasks, chunksize=max(1, len(tasks) // (4 * n_jobs))))
+
+    return pd.DataFrame(results).sort_values('sharpe', ascending=False, ignore_index=True)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--experiments", nargs="+", help="experiment directories or names under experiments/ (default: all)")
+    parser.add_argument("--holding-horizon", nargs="+", type=int)
+    parser.add_argument("--threshold-flat", nargs="+", type=float)
+    parser.add_argument("--prediction-horizon", nargs="+", type=int, help="horizons of a multi-horizon model's probabilities")
+    parser.add_argument("--top-pct", nargs="+", type=float)
+    parser.add_argument("--bottom-pct", nargs="+", type=float)
+    parser.add_argument("--engine", choices=list(engines), default="rows")
+    parser.add_argument("--cost-bps", nargs="+", type=float, help="portfolio engine only")
+    parser.add_argument("--slippage-bps", nargs="+", type=float, help="portfolio engine only")
+    parser.add_argument("--slippage-vol", nargs="+", type=float, help="portfolio engine only")
+    parser.add_argument("--n-jobs", type=int)
+    parser.add_argument("--output", help="save the comparison table to this CSV file")
+    args = parser.parse_args()
+
+    experiment_dirs = None
+    if args.experiments:
+        experiment_dirs = [Path(name) if Path(name).is_dir() else experiments_path / name for name in args.experiments]
+
+    grid = {name: values for name, values in [
+        ('holding_horizon', args.holding_horizon),
+        ('threshold_flat', args.threshold_flat),
+        ('prediction_horizon', args.prediction_horizon),
+        ('top_pct', args.top_pct),
+        ('bottom_pct', args.bottom_pct),
+        ('cost_bps', args.cost_bps),
+        ('slippage_bps', args.slippage_bps),
+        ('slippage_vol', args.slippage_vol),
+    ] if values}
+
+    print("Running backtests...")
+    results = run_experiments(experiment_dirs, grid, args.n_jobs, args.engine)
+    print(results.to_string(index=False))
+
+    if args.output:
+        results.to_csv(args.output, index=False)
+        print(f"Saved comparison table to {args.output}")
@@ -1,6 +1,9 @@
+import argparse
 import yaml
 from pathlib import Path
 import pandas as pd
+from data.schema import day_strings
+from data.split_helpers import load_split
 
 project_root = Path(__file__).resolve().parents[2]
 config_path = project_root / "config.yaml"
@@ -8,16 +11,30 @@ config_path = project_root / "config.yaml"
 with open(config_path, "r") as f:
     config = yaml.safe_load(f)
 
-processed_data_path = project_root / config["data"]["processed"] / 'X_test_sim.csv'
-prediction_path = Path(__file__).resolve().parents[2]/ "experiments" / "run3"
 
-print("Loading data...")
-X_test_sim = pd.read_csv(processed_data_path, index_col=0)
-y_proba = pd.read_csv(prediction_path / "predictions_prob.csv", index_col=0)
-y_proba = y_proba.to_numpy()
+def main():
+    """Join the test rows with the predicted probabilities into trading_sim_data.csv."""
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--experiment", default=config["data"]["experiment"], help="experiment directory, relative to the project root")
+    args = parser.parse_args()
 
-X_test_sim['Prob_Down'] = y_proba[:, 0]
-X_test_sim['Prob_Flat'] = y_proba[:, 1]
-X_test_sim['Prob_Up']   = y_proba[:, 2]
+    prediction_path = project_root / args.experiment
 
-X_test_sim.to_csv(prediction_path / "trading_sim_data.csv")
\ No newline at end of file
+    print("Loading data...")
+    split, metadata = load_split(project_root / config["data"]["split"])
+    X_test_sim = pd.DataFrame({
+        'Date': day_strings(split['dates_test']),
+        'Close': split['close_test'],
+        'Ticker': pd.Categorical.from_codes(split['tickers_test'], categories=metadata['tickers']),
+    })
+    y_proba = pd.read_csv(prediction_path / "predictions_prob.csv", index_col=0)
+
+    # Prob_Down/Flat/Up, and those of every horizon for a multi-horizon model
+    for column in y_proba.columns:
+        X_test_sim[column] = y_proba[column].to_numpy()
+
+    X_test_sim.to_csv(prediction_path / "trading_sim_data.csv")
+
+
+if __name__ == "__main__":
+    main()
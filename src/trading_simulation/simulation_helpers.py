@@ -0,0 +1,160 @@
+import numpy as np
+import pandas as pd
+
+
+def load_simulation_data(experiment_dir):
+    """trading_sim_data.csv of an experiment, sorted by (Ticker, Date)."""
+    data = pd.read_csv(experiment_dir / "trading_sim_data.csv", index_col=0)
+    return data.sort_values(['Ticker', 'Date'])
+
+
+def probability_columns(data, prediction_horizon=None):
+    """
+    Up, down and flat probability columns of `prediction_horizon` days (Prob_Up_<h>d etc.,
+    written for a multi-horizon model), or of the model's target horizon when None.
+    """
+    suffix = "" if prediction_horizon is None else f"_{prediction_horizon}d"
+    columns = [f"Prob_{side}{suffix}" for side in ('Up', 'Down', 'Flat')]
+    missing = [name for name in columns if name not in data.columns]
+    if missing:
+        raise KeyError(f"No {prediction_horizon}-day probabilities {missing}, train with --multi-horizon to predict every horizon")
+    return columns
+
+
+def compute_positions(data, threshold_flat=0.5, top_pct=None, bottom_pct=None, prediction_horizon=None):
+    """
+    Soft positions Prob_Up - Prob_Down, set to 0 when Flat is the most likely class or
+    Prob_Flat > threshold_flat (with three classes any threshold >= 0.5 only keeps the first rule).
+    With top_pct/bottom_pct, only longs ranked in the top pct and shorts ranked in the
+    bottom pct of each date's rows are kept (at least one each, None keeps the whole side).
+    `prediction_horizon` picks the probabilities of that horizon (see probability_columns).
+    """
+    up, down, flat_column = probability_columns(data, prediction_horizon)
+    position = (data[up] - data[down]).to_numpy()
+    probs = data[[up, down, flat_column]]
+    flat = (probs.idxmax(axis=1) == flat_column).to_numpy() | (data[flat_column] > threshold_flat).to_numpy()
+    position = np.where(flat, 0.0, position)
+
+    by_date = pd.Series(position, index=data.index).groupby(data['Date'].to_numpy())
+    counts = by_date.transform('size').to_numpy()
+    if top_pct is not None:
+        rank = by_date.rank(ascending=False, method='first').to_numpy()
+        position = np.where((position > 0) & (rank > np.maximum(1, (top_pct * counts).astype(int))), 0.0, position)
+    if bottom_pct is not None:
+        rank = by_date.rank(ascending=True, method='first').to_numpy()
+        position = np.where((position < 0) & (rank > np.maximum(1, (bottom_pct * counts).astype(int))), 0.0, position)
+    return position
+
+
+def run_backtest(data, holding_horizon=3, threshold_flat=0.5, top_pct=None, bottom_pct=None, prediction_horizon=None):
+    """
+    Backtest on trading_sim_data rows sorted by (Ticker, Date), without touching `data`.
+    Returns the per-row frame (Date, Ticker, Position, Forward_Return, PnL) and the daily portfolio returns.
+    """
+    trades = data[['Date', 'Ticker']].copy()
+    trades['Position'] = compute_positions(data, threshold_flat, top_pct, bottom_pct, prediction_horizon)
+
+    # forward returns over the holding horizon
+    trades['Forward_Return'] = data.groupby('Ticker')['Close'].shift(-holding_horizon) / data['Close'] - 1
+
+    # Drop last rows with NaN forward returns
+    trades = trades.dropna(subset=['Forward_Return'])
+    trades['PnL'] = trades['Position'] * trades['Forward_Return']
+
+    # Aggregate portfolio returns per day (mean, not sum, across tickers)
+    portfolio_returns = trades.groupby('Date')['PnL'].mean().reset_index()
+    portfolio_returns.rename(columns={'PnL': 'Portfolio_Return'}, inplace=True)
+    portfolio_returns['Cumulative_Return'] = (1 + portfolio_returns['Portfolio_Return']).cumprod() - 1
+
+    return trades, portfolio_returns
+
+
+def summarize_backtest(portfolio_returns):
+    """Annualized Sharpe ratio, total return and max drawdown of the daily portfolio returns."""
+    returns = portfolio_returns['Portfolio_Return']
+    growth = (1 + returns).cumprod()
+    drawdowns = growth / growth.cummax() - 1
+    return {
+        'sharpe': returns.mean() / returns.std() * np.sqrt(252),
+        'total_return': growth.iloc[-1] - 1 if len(growth) else 0.0,
+        'max_drawdown': drawdowns.min() if len(drawdowns) else 0.0,
+        'trading_days': len(returns),
+    }
+
+
+# ===== Portfolio simulation =====
+
+def simulate_portfolio(data, holding_horizon=3, threshold_flat=0.5, top_pct=None, bottom_pct=None,
+                       cost_bps=0.0, slippage_bps=0.0, slippage_vol=0.0, vol_window=20, prediction_horizon=None):
+    """
+    Daily mark-to-market portfolio on a (date x ticker) matrix, in NumPy without loops.
+
+    Every day opens a tranche with 1/holding_horizon of the capital, spread over the
+    day's soft positions like the per-row backtest (position / number of tickers), and
+    holds it for `holding_horizon` days, so overlapping tranches add up instead of each
+    row's forward return being counted on its own. Positions are entered at the close
+    and earn the next day's close-to-close return.
+
+    Trading costs are charged on the traded weight (the change from the drifted
+    previous weights) at cost_bps + slippage_bps, plus slippage_vol times the ticker's
+    rolling `vol_window`-day return volatility.
+    """
+    from data.panel import MarketPanel
+
+    frame = data[['Date', 'Ticker', 'Close']].copy()
+    frame['Position'] = compute_positions(data, threshold_flat, top_pct, bottom_pct, prediction_horizon)
+    panel = MarketPanel.from_long(frame, ['Close', 'Position'], dtype=np.float64)
+
+    close = panel['Close']
+    returns = np.zeros(panel.shape)
+    returns[1:] = np.nan_to_num(close[1:] / close[:-1] - 1)
+
+    # tranche opened each day, then the average of the last holding_horizon tranches
+    tickers_per_day = np.maximum(panel.mask.sum(axis=1, keepdims=True), 1)
+    tranche = np.nan_to_num(panel['Position']) / tickers_per_day
+    opened = np.cumsum(tranche, axis=0)
+    closed = np.zeros(panel.shape)
+    closed[holding_horizon:] = opened[:-holding_horizon]
+    weights = (opened - closed) / holding_horizon
+    weights[~panel.mask] = 0.0
+
+    # weights held over day t earn day t + 1's returns
+    gross = np.zeros(len(panel.dates))
+    gross[1:] = (weights[:-1] * returns[1:]).sum(axis=1)
+
+    # trades: from yesterday's weights after today's moves to today's targets
+    drifted = np.zeros(panel.shape)
+    drifted[1:] = weights[:-1] * (1 + returns[1:]) / (1 + gross[1:, None])
+    traded = np.abs(weights - drifted)
+
+    volatility = pd.DataFrame(returns).rolling(vol_window, min_periods=2).std().fillna(0).to_numpy()
+    cost_rate = (cost_bps + slippage_bps) / 1e4 + slippage_vol * volatility
+    costs = (traded * cost_rate).sum(axis=1)
+
+    net = gross - costs
+    equity = np.cumprod(1 + net)
+    return pd.DataFrame({
+        'Date': panel.dates,
+        'Gross_Return': gross,
+        'Costs': costs,
+        'Net_Return': net,
+        'Turnover': traded.sum(axis=1),
+        'Gross_Exposure': np.abs(weights).sum(axis=1),
+        'Equity': equity,
+    })
+
+
+def summarize_portfolio(portfolio):
+    """Annualized Sharpe ratio, total return, max drawdown and turnover of simulate_portfolio's net returns."""
+    returns = portfolio['Net_Return']
+    equity = portfolio['Equity']
+    # from the starting capital of 1, so a first-day loss is a drawdown too
+    drawdowns = equity / equity.cummax().clip(lower=1.0) - 1
+    return {
+        'sharpe': returns.mean() / returns.std() * np.sqrt(252),
+        'total_return': equity.iloc[-1] - 1 if len(equity) else 0.0,
+        'max_drawdown': min(drawdowns.min(), 0.0) if len(drawdowns) else 0.0,
+        'annual_turnover': portfolio['Turnover'].mean() * 252,
+        'total_costs': portfolio['Costs'].sum(),
+        'trading_days': len(returns),
+    }
@@ -0,0 +1,184 @@
+import argparse
+import csv
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import yaml
+from trading_simulation.simulation_helpers import compute_positions
+
+project_root = Path(__file__).resolve().parents[2]
+config_path = project_root / "config.yaml"
+
+with open(config_path, "r") as f:
+    config = yaml.safe_load(f)
+
+# Event-driven version of simulate_portfolio for histories that do not fit in memory.
+# Usage (from src/): python -m trading_simulation.streaming_backtest --experiment experiments/run3
+
+
+def read_date_events(path, chunksize=100_000):
+    """
+    Yield (date, rows) for each date of a trading_sim_data-style CSV sorted by Date,
+    reading `chunksize` rows at a time. Rows of a date split across chunks are joined.
+    """
+    pending = None
+    for chunk in pd.read_csv(path, index_col=0, chunksize=chunksize):
+        if pending is not None:
+            chunk = pd.concat([pending, chunk])
+        last_date = chunk['Date'].iloc[-1]
+        pending = chunk[chunk['Date'] == last_date]
+        for date, rows in chunk[chunk['Date'] != last_date].groupby('Date', sort=False):
+            yield date, rows
+    if pending is not None and len(pending):
+        yield pending['Date'].iloc[0], pending
+
+
+class StreamingPortfolio:
+    """
+    Rolling state of the tranche portfolio: the open tranches of the last
+    holding_horizon days, the previous closes and weights, the last vol_window daily
+    returns, equity and its high-water mark. Memory is O(tickers x (holding_horizon +
+    vol_window)) whatever the history length, and every `step` gives the same numbers
+    as simulate_portfolio on the full (date x ticker) matrix.
+    """
+
+    def __init__(self, holding_horizon=3, cost_bps=0.0, slippage_bps=0.0, slippage_vol=0.0, vol_window=20):
+        self.holding_horizon = holding_horizon
+        self.cost_rate = (cost_bps + slippage_bps) / 1e4
+        self.slippage_vol = slippage_vol
+        self.vol_window = vol_window
+
+        self.columns = {}
+        self.tranches = np.zeros((holding_horizon, 0))
+        self.returns = np.zeros((vol_window, 0))
+        self.prev_close = np.zeros(0)
+        self.prev_weights = np.zeros(0)
+        self.n_dates = 0
+        self.equity = 1.0
+        self.high_water_mark = 1.0
+
+    def _positions(self, tickers):
+        new = [ticker for ticker in pd.unique(tickers) if ticker not in self.columns]
+        if new:
+            for ticker in new:
+                self.columns[ticker] = len(self.columns)
+            # tickers seen for the first time have no tranches and zero past returns
+            grow = len(new)
+            self.tranches = np.pad(self.tranches, ((0, 0), (0, grow)))
+            self.returns = np.pad(self.returns, ((0, 0), (0, grow)))
+            self.prev_close = np.pad(self.prev_close, (0, grow), constant_values=np.nan)
+            self.prev_weights = np.pad(self.prev_weights, (0, grow))
+        return np.array([self.columns[ticker] for ticker in tickers], dtype=int)
+
+    def step(self, date, tickers, close, position):
+        """Process one date's close and soft position per ticker, return that day's results."""
+        cols = self._positions(tickers)
+        n = len(self.columns)
+
+        today_close = np.full(n, np.nan)
+        today_close[cols] = close
+        returns = np.nan_to_num(today_close / self.prev_close - 1) if self.n_dates else np.zeros(n)
+
+        # open today's tranche in place of the one opened holding_horizon days ago
+        tranche = np.zeros(n)
+        tranche[cols] = np.nan_to_num(position) / max(len(cols), 1)
+        self.tranches[self.n_dates % self.holding_horizon] = tranche
+        weights = np.zeros(n)
+        weights[cols] = self.tranches[:, cols].sum(axis=0) / self.holding_horizon
+
+        gross = (self.prev_weights * returns).sum()
+        drifted = self.prev_weights * (1 + returns) / (1 + gross)
+        traded = np.abs(weights - drifted)
+
+        self.returns[self.n_dates % self.vol_window] = returns
+        window = min(self.n_dates + 1, self.vol_window)
+        volatility = self.returns[:window].std(axis=0, ddof=1) if window >= 2 else np.zeros(n)
+        costs = (traded * (self.cost_rate + self.slippage_vol * volatility)).sum()
+
+        net = gross - costs
+        self.equity *= 1 + net
+        self.high_water_mark = max(self.high_water_mark, self.equity)
+        self.prev_close, self.prev_weights = today_close, weights
+        self.n_dates += 1
+
+        return {
+            'Date': date,
+            'Gross_Return': gross,
+            'Costs': costs,
+            'Net_Return': net,
+            'Turnover': traded.sum(),
+            'Gross_Exposure': np.abs(weights).sum(),
+            'Equity': self.equity,
+            'Drawdown': self.equity / self.high_water_mark - 1,
+        }
+
+
+def stream_backtest(events, holding_horizon=3, threshold_flat=0.5, top_pct=None, bottom_pct=None,
+                    prediction_horizon=None, **costs):
+    """Yield one result per (date, rows) event, computing each date's positions as it arrives."""
+    portfolio = StreamingPortfolio(holding_horizon, **costs)
+    for date, rows in events:
+        position = compute_positions(rows, threshold_flat, top_pct, bottom_pct, prediction_horizon)
+        yield portfolio.step(date, rows['Ticker'].to_numpy(), rows['Close'].to_numpy(dtype=float), position)
+
+
+class RunningSummary:
+    """summarize_portfolio's statistics, updated one daily result at a time (Welford mean/variance)."""
+
+    def __init__(self):
+        self.count, self.mean, self.m2 = 0, 0.0, 0.0
+        self.equity, self.max_drawdown, self.turnover, self.costs = 1.0, 0.0, 0.0, 0.0
+
+    def update(self, result):
+        self.count += 1
+        delta = result['Net_Return'] - self.mean
+        self.mean += delta / self.count
+        self.m2 += delta * (result['Net_Return'] - self.mean)
+        self.equity = result['Equity']
+        self.max_drawdown = min(self.max_drawdown, result['Drawdown'])
+        self.turnover += result['Turnover']
+        self.costs += result['Costs']
+
+    def summary(self):
+        std = np.sqrt(self.m2 / (self.count - 1)) if self.count > 1 else np.nan
+        return {
+            'sharpe': self.mean / std * np.sqrt(252),
+            'total_return': self.equity - 1,
+            'max_drawdown': self.max_drawdown,
+            'annual_turnover': self.turnover / max(self.count, 1) * 252,
+            'total_costs': self.costs,
+            'trading_days': self.count,
+        }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--experiment", default=config["data"]["experiment"], help="experiment directory, relative to the project root")
+    parser.add_argument("--chunksize", type=int, default=100_000, help="CSV rows read at a time")
+    args = parser.parse_args()
+
+    experiment_path = project_root / args.experiment
+    trading = config['trading']
+    results = stream_backtest(
+        read_date_events(experiment_path / "trading_sim_data.csv", args.chunksize),
+        trading['holding_horizon'], trading['threshold_flat'], prediction_horizon=trading['prediction_horizon'],
+        cost_bps=trading['cost_bps'], slippage_bps=trading['slippage_bps'], slippage_vol=trading['slippage_vol'])
+
+    print("Streaming backtest...")
+    running = RunningSummary()
+    output_path = experiment_path / "streaming_portfolio.csv"
+    with open(output_path, "w", newline="") as f:
+        writer = None
+        for result in results:
+            if writer is None:
+                writer = csv.DictWriter(f, fieldnames=list(result))
+                writer.writeheader()
+            writer.writerow(result)
+            running.update(result)
+
+    summary = running.summary()
+    print(f"Sharpe Ratio: {summary['sharpe']:.2f}")
+    print(f"Total return: {summary['total_return']:.2%} (costs {summary['total_costs']:.2%})")
+    print(f"Max drawdown: {summary['max_drawdown']:.2%}, annual turnover {summary['annual_turnover']:.1f}x")
+    print(f"Saved daily results to {output_path}")
@@ -1,8 +1,9 @@
+import argparse
 import yaml
 from pathlib import Path
-import pandas as pd
-import numpy as np
-import matplotlib.pyplot as plt
+from trading_simulation.simulation_helpers import load_simulation_data, run_backtest, summarize_backtest, \
+    simulate_portfolio, summarize_portfolio
+from instrumentation import stage
 
 project_root = Path(__file__).resolve().parents[2]
 config_path = project_root / "config.yaml"
@@ -10,81 +11,88 @@ config_path = project_root / "config.yaml"
 with open(config_path, "r") as f:
     config = yaml.safe_load(f)
 
-prediction_path = Path(__file__).resolve().parents[2]/ "experiments" / "run3" / "trading_sim_data.csv"
-data = pd.read_csv(prediction_path, index_col=0)
 
-holding_horizon = config['trading']['holding_horizon']
-threshold_flat = config['trading']['threshold_flat']
-
-# Step 1: Compute soft positions
-data['Position'] = data['Prob_Up'] - data['Prob_Down']
-
-# Set position to 0 if Flat is highest
-data.loc[data[['Prob_Up', 'Prob_Down', 'Prob_Flat']].idxmax(axis=1) == 'Prob_Flat', 'Position'] = 0
-
-# Step 2: Compute forward returns
-data = data.sort_values(['Ticker', 'Date'])
-data['Forward_Return'] = data.groupby('Ticker')['Close'].shift(-holding_horizon) / data['Close'] - 1
-
-# Drop last rows with NaN forward returns
-data = data.dropna(subset=['Forward_Return'])
-
-# Step 3: Calculate per-row P&L
-data['PnL'] = data['Position'] * data['Forward_Return']
-
-# Step 4: Aggregate portfolio returns per day
-portfolio_returns = data.groupby('Date')['PnL'].mean().reset_index() # don't want to calculate sum across tickers
-portfolio_returns.rename(columns={'PnL': 'Portfolio_Return'}, inplace=True)
-
-# Step 5: Cumulative returns
-portfolio_returns['Cumulative_Return'] = (
-    (1 + portfolio_returns['Portfolio_Return']).cumprod() - 1
-)
-
-
-
-# Sharpe ratio
-daily_mean = portfolio_returns['Portfolio_Return'].mean()
-daily_std = portfolio_returns['Portfolio_Return'].std()
-sharpe_ratio = (daily_mean / daily_std) * np.sqrt(252)  # annualized
-
-print(f"Sharpe Ratio: {sharpe_ratio:.2f}")
-print(f"Total cumulative return: {portfolio_returns['Cumulative_Return'].iloc[-1]:.2%}")
-
-
-# ===== Vizualization =====
-
-# Portfolio equity curve
-plt.figure(figsize=(12, 6))
-plt.plot(portfolio_returns['Date'], portfolio_returns['Cumulative_Return'], label='Portfolio Cumulative Return', color='blue')
-plt.title('Portfolio Equity Curve')
-plt.xlabel('Date')
-plt.ylabel('Cumulative Return')
-plt.legend()
-plt.grid(True)
-plt.show()
-
-# Per-stock cumulative PnL
-
-per_stock_pnl = data.groupby(['Date', 'Ticker'])['PnL'].mean().unstack(fill_value=0)
-per_stock_cum = (1 + per_stock_pnl).cumprod() - 1
-
-plt.figure(figsize=(14, 7))
-for ticker in per_stock_cum.columns:
-    plt.plot(per_stock_cum.index, per_stock_cum[ticker], label=ticker)
-plt.title('Per-Stock Cumulative Returns (Compounded)')
-plt.xlabel('Date')
-plt.ylabel('Cumulative Return')
-plt.legend(bbox_to_anchor=(1.05, 1), loc='upper left')
-plt.grid(True)
-plt.tight_layout()
-plt.show()
-
-# Daily portfolio returns distribution
-plt.figure(figsize=(10, 5))
-plt.hist(portfolio_returns['Portfolio_Return'], bins=50, color='green', alpha=0.7)
-plt.title('Daily Portfolio Returns Distribution')
-plt.xlabel('Daily Return')
-plt.ylabel('Frequency')
-plt.grid(True)
-plt.show()
+def main():
+    """Backtest the experiment's predictions and plot the results."""
+    import matplotlib.pyplot as plt
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--experiment", default=config["data"]["experiment"], help="experiment directory, relative to the project root")
+    parser.add_argument("--headless", action="store_true", help="save the plots to the experiment directory instead of showing them")
+    args = parser.parse_args()
+
+    experiment_path = project_root / args.experiment
+    data = load_simulation_data(experiment_path)
+
+    holding_horizon = config['trading']['holding_horizon']
+    threshold_flat = config['trading']['threshold_flat']
+    prediction_horizon = config['trading']['prediction_horizon']
+
+    with stage("simulate_portfolio", rows=len(data)):
+        portfolio = simulate_portfolio(data, holding_horizon, threshold_flat, cost_bps=config['trading']['cost_bps'],
+                                       slippage_bps=config['trading']['slippage_bps'], slippage_vol=config['trading']['slippage_vol'],
+                                       prediction_horizon=prediction_horizon)
+    portfolio_summary = summarize_portfolio(portfolio)
+
+    with stage("run_backtest", rows=len(data)):
+        data, portfolio_returns = run_backtest(data, holding_horizon, threshold_flat, prediction_horizon=prediction_horizon)
+    summary = summarize_backtest(portfolio_returns)
+
+    print(f"Sharpe Ratio: {summary['sharpe']:.2f}")
+    print(f"Total cumulative return: {portfolio_returns['Cumulative_Return'].iloc[-1]:.2%}")
+    print(f"Max drawdown: {summary['max_drawdown']:.2%}")
+
+    print("Overlapping tranches, net of costs:")
+    print(f"  Sharpe Ratio: {portfolio_summary['sharpe']:.2f}")
+    print(f"  Total return: {portfolio_summary['total_return']:.2%} (costs {portfolio_summary['total_costs']:.2%})")
+    print(f"  Max drawdown: {portfolio_summary['max_drawdown']:.2%}, annual turnover {portfolio_summary['annual_turnover']:.1f}x")
+
+
+    # ===== Vizualization =====
+
+    def show(name):
+        if args.headless:
+            plt.savefig(experiment_path / f"{name}.png")
+            plt.close()
+        else:
+            plt.show()
+
+    # Portfolio equity curve
+    plt.figure(figsize=(12, 6))
+    plt.plot(portfolio_returns['Date'], portfolio_returns['Cumulative_Return'], label='Portfolio Cumulative Return', color='blue')
+    plt.plot(portfolio['Date'].astype(str), portfolio['Equity'] - 1, label='Overlapping Tranches (net)', color='orange')
+    plt.title('Portfolio Equity Curve')
+    plt.xlabel('Date')
+    plt.ylabel('Cumulative Return')
+    plt.legend()
+    plt.grid(True)
+    show("equity_curve")
+
+    # Per-stock cumulative PnL
+
+    per_stock_pnl = data.groupby(['Date', 'Ticker'])['PnL'].mean().unstack(fill_value=0)
+    per_stock_cum = (1 + per_stock_pnl).cumprod() - 1
+
+    plt.figure(figsize=(14, 7))
+    for ticker in per_stock_cum.columns:
+        plt.plot(per_stock_cum.index, per_stock_cum[ticker], label=ticker)
+    plt.title('Per-Stock Cumulative Returns (Compounded)')
+    plt.xlabel('Date')
+    plt.ylabel('Cumulative Return')
+    plt.legend(bbox_to_anchor=(1.05, 1), loc='upper left')
+    plt.grid(True)
+    plt.tight_layout()
+    show("per_stock_returns")
+
+    # Daily portfolio returns distribution
+    plt.figure(figsize=(10, 5))
+    plt.hist(portfolio_returns['Portfolio_Return'], bins=50, color='green', alpha=0.7)
+    plt.title('Daily Portfolio Returns Distribution')
+    plt.xlabel('Daily Return')
+    plt.ylabel('Frequency')
+    plt.grid(True)
+    show("returns_distribution")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,55 @@
+import sys
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pytest
+
+# modules import each other from src/, as when the scripts are run from there
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "src"))
+
+
+def synthetic_bars(symbols, dates, seed=0):
+    """Seeded long-format OHLCV bars (random walks), what the market data providers return."""
+    rng = np.random.default_rng(seed)
+    close = (100 * np.exp(np.cumsum(rng.normal(0, 0.02, (len(dates), len(symbols))), axis=0))).ravel()
+    return pd.DataFrame({
+        'Date': np.repeat(dates, len(symbols)),
+        'Ticker': np.tile(symbols, len(dates)),
+        'Close': close,
+        'High': close * (1 + rng.uniform(0, 0.02, close.size)),
+        'Low': close * (1 - rng.uniform(0, 0.02, close.size)),
+        'Open': close * (1 + rng.normal(0, 0.01, close.size)),
+        'Volume': rng.integers(100_000, 10_000_000, close.size).astype(float),
+    })
+
+
+def linear_model(feature_columns, sign=1.0, seed=0):
+    """Small regressor on the feature columns; `sign` flips its predictions, so two models trade differently."""
+    from sklearn.linear_model import LinearRegression
+    X = pd.DataFrame(np.random.default_rng(seed).normal(size=(50, len(feature_columns))), columns=feature_columns)
+    return LinearRegression().fit(X, sign * X.sum(axis=1))
+
+
+@pytest.fixture
+def market(tmp_path, monkeypatch):
+    """
+    Offline market: every configured symbol served by a FixtureProvider from synthetic
+    bars, with the store, feature cache and model registry under tmp_path. Returns the
+    business dates of the bars; PredictionBuilder's "yesterday" is their last one.
+    """
+    from data import data_helpers
+    from data.market_store import FixtureProvider, MarketDataStore
+    from features import feature_cache
+    from models import model_registry, PredictionBuilder
+
+    dates = pd.bdate_range("2024-12-02", "2025-04-30")
+    symbols = data_helpers.tickers + data_helpers.macro_tickers + data_helpers.market_indices
+    synthetic_bars(symbols, dates).to_parquet(tmp_path / "bars.parquet")
+    store = MarketDataStore(tmp_path / "store", FixtureProvider(tmp_path / "bars.parquet"))
+
+    monkeypatch.setattr(data_helpers, "get_store", lambda: store)
+    monkeypatch.setattr(feature_cache, "_cache", feature_cache.FeatureCache(tmp_path / "features", 1 << 30))
+    monkeypatch.setattr(model_registry, "_registry", model_registry.ModelRegistry(tmp_path / "registry"))
+    monkeypatch.setattr(PredictionBuilder, "_yesterday", lambda: dates[-1].strftime("%Y-%m-%d"))
+    return dates
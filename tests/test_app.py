@@ -0,0 +1,74 @@
+import pytest
+from fastapi.testclient import TestClient
+
+from conftest import linear_model
+
+
+@pytest.fixture
+def client(market, monkeypatch):
+    """API on the offline market with model v1 registered, its backtest built before the first request."""
+    import app
+    from models import model_registry, PredictionBuilder
+
+    model_registry.get_registry().register(linear_model(PredictionBuilder.feature_columns), PredictionBuilder.feature_columns, {}, "v1")
+    monkeypatch.setitem(app.config['api'], 'background_startup', False)
+    monkeypatch.setitem(app.config['api'], 'shared_state', False)
+    with TestClient(app.app) as client:
+        yield client
+
+
+def test_refresh_without_new_days_serves_the_new_model(client):
+    import app
+    from models import model_registry, PredictionBuilder
+
+    stats_v1 = client.get("/backtest/global-stats").json()
+    model_registry.get_registry().register(linear_model(PredictionBuilder.feature_columns, sign=-1.0),
+                                           PredictionBuilder.feature_columns, {}, "v2")
+
+    response = client.post("/backtest/refresh").json()
+    assert response == {"newTradingDays": 0, "modelVersion": "v2"}
+
+    stats = client.get("/backtest/global-stats").json()
+    assert stats != stats_v1
+    assert stats == app.prediction_builder.get_stats()
+    assert app.snapshot.model_version == "v2"
+    assert client.post("/model/reload").json() == {"modelVersion": "v2", "swapped": False}
+
+
+def test_reload_swaps_the_served_model(client):
+    import app
+    from models import model_registry, PredictionBuilder
+
+    etag = client.get("/backtest/daily-returns").headers["ETag"]
+    model_registry.get_registry().register(linear_model(PredictionBuilder.feature_columns, sign=-1.0),
+                                           PredictionBuilder.feature_columns, {}, "v2")
+
+    assert client.post("/model/reload").json() == {"modelVersion": "v2", "swapped": True}
+    assert client.get("/backtest/daily-returns").headers["ETag"] != etag
+    assert app.snapshot.model_version == "v2"
+
+
+def test_malformed_cursor_is_a_bad_request(client):
+    from test_shared_state import raw_cursor
+
+    response = client.get("/backtest/daily-returns-per-stock", params={"cursor": raw_cursor([[], 1])})
+    assert response.status_code == 400
+    assert client.get("/backtest/daily-returns-per-stock", params={"tickers": ["NOPE"]}).status_code == 404
+
+
+def test_models_with_other_features_are_refused(client):
+    import app
+    from models import model_registry, PredictionBuilder
+
+    stats = client.get("/backtest/global-stats").json()
+    columns = PredictionBuilder.feature_columns[:-1]
+    model_registry.get_registry().register(linear_model(columns), columns, {}, "v2")
+
+    for path in ["/backtest/refresh", "/model/reload"]:
+        response = client.post(path)
+        assert response.status_code == 409
+        assert "v2" in response.json()["detail"]
+    # as answered to the other workers, which forward the command to the builder
+    assert app.run_command("refresh")[0] == 409
+    assert client.get("/backtest/global-stats").json() == stats
+    assert app.snapshot.model_version == "v1"
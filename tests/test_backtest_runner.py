@@ -0,0 +1,32 @@
+import pytest
+import yaml
+
+from trading_simulation.backtest_runner import _experiment_params, config, run_experiments
+
+
+def test_experiment_params_fall_back_to_the_current_config(tmp_path):
+    trading = config['trading']
+    assert _experiment_params(tmp_path) == {'holding_horizon': trading['holding_horizon'],
+                                            'threshold_flat': trading['threshold_flat'],
+                                            'prediction_horizon': trading.get('prediction_horizon')}
+
+    (tmp_path / "config.yaml").write_text(yaml.safe_dump({'trading': {'holding_horizon': 7, 'threshold_flat': 0.5}}))
+    assert _experiment_params(tmp_path) == {'holding_horizon': 7, 'threshold_flat': 0.5, 'prediction_horizon': None}
+
+
+@pytest.mark.parametrize("engine, grid", [("rows", {'cost_bps': [5.0]}), ("rows", {'holding_horizon': [1], 'nope': [1]}),
+                                          ("portfolio", {'data': [None]}), ("ticks", {})])
+def test_grids_are_checked_against_the_engine_before_running(engine, grid, tmp_path):
+    with pytest.raises(ValueError):
+        run_experiments([tmp_path / "missing"], grid, n_jobs=1, engine=engine)
+
+
+def test_portfolio_grid_with_costs(tmp_path):
+    from test_portfolio import simulation_data
+
+    simulation_data().to_csv(tmp_path / "trading_sim_data.csv")
+    results = run_experiments([tmp_path], {'holding_horizon': [1, 3], 'cost_bps': [0.0, 10.0]}, n_jobs=1, engine="portfolio")
+    assert len(results) == 4
+    assert set(results['cost_bps']) == {0.0, 10.0}
+    by_params = results.set_index(['holding_horizon', 'cost_bps'])['total_costs']
+    assert by_params[(3, 0.0)] == 0 and by_params[(3, 10.0)] > 0
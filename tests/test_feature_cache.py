@@ -0,0 +1,29 @@
+import pandas as pd
+
+from features import feature_cache
+from features.feature_cache import FeatureCache, code_version
+from test_features import gapped_bars
+
+
+def test_hits_return_the_computed_features(tmp_path):
+    cache = FeatureCache(tmp_path, 1 << 30)
+    df = gapped_bars()
+    first = cache.features(df.copy(), ['ma_5', 'return_3d'])
+    assert len(list(tmp_path.glob("*.parquet"))) == 1
+
+    pd.testing.assert_frame_equal(cache.features(df.copy(), ['ma_5', 'return_3d']), first)
+    cache.features(df.copy(), ['ma_20'])
+    assert len(list(tmp_path.glob("*.parquet"))) == 2
+
+
+def test_code_version_covers_the_panel_and_the_feature_config(tmp_path, monkeypatch):
+    version = code_version()
+    monkeypatch.setitem(feature_cache.config, 'features', {**feature_cache.config['features'], 'moving_avg': ['ma_5']})
+    assert code_version() != version
+    monkeypatch.undo()
+
+    panel_source = tmp_path / "panel.py"
+    panel_source.write_text("# another panel\n")
+    monkeypatch.setattr(feature_cache.panel_module, "__file__", str(panel_source))
+    assert code_version() != version
+    assert FeatureCache(tmp_path / "cache", 1 << 30).version == code_version()
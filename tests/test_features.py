@@ -0,0 +1,92 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from conftest import synthetic_bars
+from data.panel import MarketPanel
+from features.feature_helpers import create_features, create_panel_features, feature_registry, resolve_features
+
+bar_fields = ['Close', 'High', 'Low', 'Open', 'Volume']
+series_columns = ['VIX', 'WTI_Oil', 'US10Y', 'GSPC', 'NDX', 'RUT', 'DJI']
+
+
+def gapped_bars(seed=0):
+    """Long (Date, Ticker) bars with missing days, a ticker listed late and one delisted early."""
+    dates = pd.bdate_range("2025-01-02", periods=80)
+    df = synthetic_bars(["A", "B", "C", "D"], dates, seed)
+    rng = np.random.default_rng(seed)
+    for column in series_columns:
+        df[column] = np.repeat(100 * np.exp(np.cumsum(rng.normal(0, 0.01, len(dates)))), 4)
+
+    gaps = (df['Ticker'] == "A") & df['Date'].isin(dates[[15, 16, 40]])
+    gaps |= (df['Ticker'] == "B") & df['Date'].isin(dates[30:33])
+    gaps |= (df['Ticker'] == "C") & (df['Date'] < dates[25])
+    gaps |= (df['Ticker'] == "D") & (df['Date'] > dates[60])
+    return df[~gaps].reset_index(drop=True)
+
+
+def test_panel_features_skip_missing_bars_like_the_long_path():
+    pytest.importorskip("talib")
+    df = gapped_bars()
+    columns = [name for name in feature_registry if not name.startswith('_')]
+    expected = create_features(df.copy(), columns)
+
+    panel = MarketPanel.from_long(df, bar_fields, dtype=np.float64)
+    for column in series_columns:
+        panel.set_series(column, df.groupby('Date')[column].first().reindex(panel.dates).to_numpy())
+    features = create_panel_features(panel, columns).to_long(columns)
+
+    pd.testing.assert_frame_equal(features[columns], expected[columns], check_dtype=False, rtol=1e-9)
+
+
+def test_missing_values_are_filled_within_each_ticker():
+    df = gapped_bars()
+    features = create_features(df.copy(), ['ma_20'])
+
+    # C's first 19 bars have no 20-day mean and take C's first one, not a neighbour's
+    c = features[features['Ticker'] == "C"]['ma_20'].to_numpy()
+    assert (c[:19] == c[19]).all()
+    close = df[df['Ticker'] == "C"]['Close'].to_numpy()
+    assert c[19] == pytest.approx(close[:20].mean())
+
+
+# ===== Single sorted sweep =====
+
+def test_ticker_kernel_matches_groupby_on_unsorted_rows():
+    df = gapped_bars().sample(frac=1, random_state=0).reset_index(drop=True)
+    features = create_features(df.copy(), ['return_5d', 'rolling_std_10', 'ma_20', 'macd', 'range_5d', 'vol_ratio_5'])
+
+    # features are per ticker over its own dates, in the frame's row order
+    ordered = df.sort_values(['Ticker', 'Date'])
+    by_ticker = ordered.groupby('Ticker')
+    close, volume = by_ticker['Close'], by_ticker['Volume']
+    expected = pd.DataFrame({
+        'return_5d': close.pct_change(5),
+        'rolling_std_10': close.transform(lambda x: x.rolling(10).std()),
+        'ma_20': close.transform(lambda x: x.rolling(20).mean()),
+        'macd': close.transform(lambda x: x.ewm(span=12, adjust=False).mean() - x.ewm(span=26, adjust=False).mean()),
+        'range_5d': (by_ticker['High'].transform(lambda x: x.rolling(5).max())
+                     - by_ticker['Low'].transform(lambda x: x.rolling(5).min())) / ordered['Close'],
+        'vol_ratio_5': ordered['Volume'] / volume.transform(lambda x: x.rolling(5).mean()),
+    })
+    expected = expected.groupby(ordered['Ticker']).bfill().groupby(ordered['Ticker']).ffill().reindex(df.index)
+    pd.testing.assert_frame_equal(features[expected.columns], expected, rtol=1e-9)
+
+
+# ===== Feature graph =====
+
+def test_resolve_features_orders_dependencies_first():
+    names = [node.name for node in resolve_features(['MA5_MA20_ratio', 'vol_ratio_5'])]
+
+    assert names == ['_close_mean_5', 'ma_5', 'ma_20', 'MA5_MA20_ratio', 'vol_MA5', 'vol_ratio_5']
+    with pytest.raises(KeyError, match="not_a_feature"):
+        resolve_features(['return_1d', 'not_a_feature'])
+
+
+def test_create_features_adds_only_the_requested_columns():
+    df = gapped_bars()
+    features = create_features(df.copy(), ['price_ma5_ratio'])
+
+    assert list(features.columns) == list(df.columns) + ['price_ma5_ratio']
+    expected = create_features(df.copy())['price_ma5_ratio']
+    pd.testing.assert_series_equal(features['price_ma5_ratio'], expected)
@@ -0,0 +1,115 @@
+import pandas as pd
+import pytest
+
+from conftest import synthetic_bars
+from data.fetcher import ConcurrentFetcher
+from data.market_store import FixtureProvider, MarketDataStore
+
+
+class OneByOneProvider:
+    """Makes one request per symbol, like YahooProvider, and records them."""
+
+    symbols_per_request = 1
+
+    def __init__(self):
+        self.requests = []
+
+    def fetch(self, symbols, start_date, end_date):
+        self.requests.append(list(symbols))
+        return pd.DataFrame({'Ticker': symbols, 'Close': 1.0})
+
+
+class FlakyProvider(OneByOneProvider):
+    """Fails the first `failures` requests of each symbol in `failures`."""
+
+    symbols_per_request = None
+
+    def __init__(self, failures):
+        super().__init__()
+        self.failures = dict(failures)
+
+    def fetch(self, symbols, start_date, end_date):
+        self.requests.append(list(symbols))
+        for symbol in symbols:
+            if self.failures.get(symbol, 0) > 0:
+                self.failures[symbol] -= 1
+                raise ConnectionError(f"{symbol} timed out")
+        return pd.DataFrame({'Ticker': symbols, 'Close': 1.0})
+
+
+def test_rate_limit_counts_each_provider_request():
+    provider = OneByOneProvider()
+    fetcher = ConcurrentFetcher(provider, chunk_size=5, requests_per_second=1000)
+    tokens = 0
+    wait_for_rate_limit = fetcher._wait_for_rate_limit
+
+    async def counting_wait():
+        nonlocal tokens
+        tokens += 1
+        await wait_for_rate_limit()
+
+    fetcher._wait_for_rate_limit = counting_wait
+    results = {}
+    symbols = [f"T{i}" for i in range(12)]
+    fetcher.run([(chunk, "2025-01-02", "2025-01-31") for chunk in fetcher.chunks(symbols)],
+                lambda job, bars: results.update({tuple(job[0]): bars}))
+
+    assert tokens == len(provider.requests) == 12
+    assert all(len(request) == 1 for request in provider.requests)
+    assert sorted(ticker for bars in results.values() for ticker in bars['Ticker']) == sorted(symbols)
+    assert [list(bars['Ticker']) for bars in results.values()] == [list(job) for job in results]
+
+
+def test_failed_requests_are_retried():
+    provider = FlakyProvider({"T1": 2})
+    fetcher = ConcurrentFetcher(provider, chunk_size=2, max_retries=2, backoff_seconds=0)
+    results = {}
+    fetcher.run([(chunk, "2025-01-02", "2025-01-31") for chunk in fetcher.chunks(["T0", "T1", "T2"])],
+                lambda job, bars: results.update({tuple(job[0]): list(bars['Ticker'])}))
+
+    assert results == {("T0", "T1"): ["T0", "T1"], ("T2",): ["T2"]}
+    assert provider.requests.count(["T0", "T1"]) == 3
+
+
+def test_failing_chunk_raises_after_the_others_are_delivered():
+    provider = FlakyProvider({"T1": 10})
+    fetcher = ConcurrentFetcher(provider, chunk_size=1, max_concurrency=1, max_retries=1, backoff_seconds=0)
+    delivered = []
+    with pytest.raises(ConnectionError, match="T1"):
+        fetcher.run([(chunk, "2025-01-02", "2025-01-31") for chunk in fetcher.chunks(["T0", "T1", "T2", "T3"])],
+                    lambda job, bars: delivered.extend(job[0]))
+
+    assert sorted(delivered) == ["T0", "T2", "T3"]
+    assert provider.requests.count(["T1"]) == 2
+
+
+class FailingFixtureProvider(FixtureProvider):
+    """FixtureProvider whose requests for the `failing` symbols raise."""
+
+    def __init__(self, path, failing):
+        super().__init__(path)
+        self.failing = set(failing)
+
+    def fetch(self, symbols, start_date, end_date):
+        if self.failing & set(symbols):
+            raise ConnectionError("rate limited")
+        return super().fetch(symbols, start_date, end_date)
+
+
+def test_interrupted_download_resumes_with_the_missing_tickers(tmp_path):
+    synthetic_bars(["AAA", "BBB", "CCC"], pd.bdate_range("2025-01-02", "2025-02-28")).to_parquet(tmp_path / "bars.parquet")
+    provider = FailingFixtureProvider(tmp_path / "bars.parquet", ["BBB"])
+    fetcher = ConcurrentFetcher(provider, chunk_size=1, max_retries=0)
+    store = MarketDataStore(tmp_path / "store", provider, fetcher)
+
+    with pytest.raises(ConnectionError):
+        store.load(["AAA", "BBB", "CCC"], "2025-01-02", "2025-02-01")
+    assert sorted(provider.calls) == [(["AAA"], "2025-01-02", "2025-02-01"), (["CCC"], "2025-01-02", "2025-02-01")]
+
+    # the chunks that completed were checkpointed, a new run only fetches the rest
+    provider.failing.clear()
+    provider.calls.clear()
+    resumed = MarketDataStore(tmp_path / "store", provider, fetcher)
+    loaded = resumed.load(["AAA", "BBB", "CCC"], "2025-01-02", "2025-02-01")
+    assert provider.calls == [(["BBB"], "2025-01-02", "2025-02-01")]
+    assert sorted(loaded['Ticker'].unique()) == ["AAA", "BBB", "CCC"]
@@ -0,0 +1,42 @@
+import numpy as np
+import pytest
+
+import instrumentation
+from instrumentation import _read_hwm, render_prometheus, stage
+
+
+def allocate_and_free(megabytes):
+    data = np.ones(megabytes * 2**20 // 8)
+    data.sum()
+    del data
+
+
+def test_stage_peaks_count_memory_freed_within_the_stage():
+    if _read_hwm() is None:
+        pytest.skip("no /proc/self/status")
+
+    allocate_and_free(256)
+    with stage("outer"):
+        with stage("allocate"):
+            allocate_and_free(128)
+        with stage("idle"):
+            pass
+
+    peaks = {name: instrumentation.stage_stats[name]['peak_rss_bytes'] for name in ["outer", "allocate", "idle"]}
+    # the earlier 256 MB peak is not charged to the stages, the freed 128 MB is, also to the enclosing stage
+    assert peaks["allocate"] - peaks["idle"] > 96 * 2**20
+    assert peaks["outer"] >= peaks["allocate"]
+    assert instrumentation.peak_rss_bytes() > peaks["allocate"] + 96 * 2**20
+    assert 'pipeline_stage_peak_rss_bytes{stage="allocate"}' in render_prometheus()
+
+
+def test_nested_stages_get_their_own_profiles(tmp_path, monkeypatch):
+    monkeypatch.setattr(instrumentation, "profile_enabled", True)
+    monkeypatch.setattr(instrumentation, "profile_dir", tmp_path)
+
+    with stage("outer"):
+        with stage("inner"):
+            sum(range(1000))
+
+    assert sorted(path.name.split("-")[0] for path in tmp_path.glob("*.prof")) == ["inner", "outer"]
+    assert instrumentation._profile_owner is None
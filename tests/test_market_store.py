@@ -0,0 +1,55 @@
+import pandas as pd
+
+from conftest import synthetic_bars
+from data.market_store import FixtureProvider, MarketDataStore
+
+
+def store_with_bars(tmp_path):
+    """Store over fixture bars crossing a year boundary, with the provider's calls recorded."""
+    dates = pd.bdate_range("2024-12-02", "2025-02-28")
+    bars = synthetic_bars(["AAA", "BBB", "^VIX"], dates)
+    bars.to_parquet(tmp_path / "bars.parquet")
+    return MarketDataStore(tmp_path / "store", FixtureProvider(tmp_path / "bars.parquet")), bars
+
+
+def expected_bars(bars, tickers, start, end, columns=('Close', 'High', 'Low', 'Open', 'Volume')):
+    rows = bars[bars['Ticker'].isin(tickers) & (bars['Date'] >= start) & (bars['Date'] < end)]
+    return rows[['Date', 'Ticker', *columns]].sort_values(['Date', 'Ticker'], ignore_index=True)
+
+
+def test_loads_are_served_from_disk_once_fetched(tmp_path):
+    store, bars = store_with_bars(tmp_path)
+    loaded = store.load(["AAA", "^VIX"], "2024-12-15", "2025-01-20")
+    pd.testing.assert_frame_equal(loaded, expected_bars(bars, ["AAA", "^VIX"], "2024-12-15", "2025-01-20"), check_dtype=False)
+    assert store.provider.calls == [(["AAA", "^VIX"], "2024-12-15", "2025-01-20")]
+
+    # partitioned by ticker and year
+    assert (tmp_path / "store" / "Ticker=AAA" / "year=2024").is_dir()
+    assert (tmp_path / "store" / "Ticker=%5EVIX" / "year=2025").is_dir()
+
+    # a sub-range and another column selection come from disk, also after a restart
+    reopened = MarketDataStore(tmp_path / "store", store.provider)
+    loaded = reopened.load(["^VIX"], "2025-01-02", "2025-01-10", columns=['Close'])
+    pd.testing.assert_frame_equal(loaded, expected_bars(bars, ["^VIX"], "2025-01-02", "2025-01-10", ['Close']), check_dtype=False)
+    assert len(store.provider.calls) == 1
+
+
+def test_only_missing_ranges_are_fetched(tmp_path):
+    store, bars = store_with_bars(tmp_path)
+    store.load(["AAA"], "2025-01-01", "2025-01-15")
+    store.load(["BBB"], "2025-01-10", "2025-02-01")
+    store.provider.calls.clear()
+
+    loaded = store.load(["AAA", "BBB"], "2024-12-20", "2025-02-10")
+    pd.testing.assert_frame_equal(loaded, expected_bars(bars, ["AAA", "BBB"], "2024-12-20", "2025-02-10"), check_dtype=False)
+    assert sorted(store.provider.calls) == [
+        (["AAA"], "2024-12-20", "2025-01-01"),
+        (["AAA"], "2025-01-15", "2025-02-10"),
+        (["BBB"], "2024-12-20", "2025-01-10"),
+        (["BBB"], "2025-02-01", "2025-02-10"),
+    ]
+    # tickers missing the same range share a request
+    store.provider.calls.clear()
+    store.load(["AAA", "BBB", "^VIX"], "2024-12-10", "2025-02-10")
+    assert store.provider.calls == [(["AAA", "BBB"], "2024-12-10", "2024-12-20"), (["^VIX"], "2024-12-10", "2025-02-10")]
+    assert store.missing_ranges("AAA", "2024-12-01", "2025-03-01") == [("2024-12-01", "2024-12-10"), ("2025-02-10", "2025-03-01")]
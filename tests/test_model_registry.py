@@ -0,0 +1,29 @@
+import pytest
+
+from conftest import linear_model
+from models.model_registry import ModelRegistry
+
+
+def test_models_are_served_only_for_their_feature_columns(tmp_path):
+    registry = ModelRegistry(tmp_path)
+    registry.register(linear_model(['a', 'b']), ['a', 'b'], {}, "v1")
+
+    model, metadata = registry.get(['a', 'b'])
+    assert metadata['version'] == "v1" and metadata['feature_columns'] == ['a', 'b']
+    with pytest.raises(ValueError):
+        registry.get(['b', 'a'])
+    with pytest.raises(ValueError):
+        registry.get(['a', 'b', 'c'])
+
+
+def test_get_loads_the_activated_version(tmp_path):
+    registry = ModelRegistry(tmp_path)
+    registry.register(linear_model(['a', 'b']), ['a', 'b'], {}, "v1")
+    registry.get()
+    registry.register(linear_model(['a', 'b', 'c']), ['a', 'b', 'c'], {}, "v2")
+
+    assert registry.get(['a', 'b', 'c'])[1]['version'] == "v2"
+    registry.activate("v1")
+    assert registry.get(['a', 'b'])[1]['version'] == "v1"
+    with pytest.raises(KeyError):
+        registry.activate("v3")
@@ -0,0 +1,37 @@
+import numpy as np
+import pytest
+
+from features.feature_helpers import create_panel_features, feature_registry
+from features.online_features import OnlineFeatureState
+
+
+@pytest.fixture
+def panel(market):
+    from data.data_helpers import load_panel
+    return load_panel("2025-01-02", market[-1].strftime("%Y-%m-%d"))
+
+
+all_features = [name for name in feature_registry if not name.startswith('_')]
+
+
+@pytest.mark.parametrize("name", all_features)
+def test_online_features_match_the_batch_features_at_the_latest_bar(panel, name):
+    if name == 'rsi':
+        pytest.importorskip("talib")
+    state = OnlineFeatureState.from_panel(panel, [name])
+
+    batch = create_panel_features(panel.copy(), [name])
+    # the panel keeps features as float32
+    np.testing.assert_allclose(state.frame()[name], batch[name][-1], rtol=1e-5, atol=1e-6)
+
+
+def test_online_state_is_updated_one_day_at_a_time(panel):
+    columns = ['return_5d', 'range_5d', 'macd_hist', 'VIX_5d_mean', 'GSPC_return_5d']
+    history = panel.slice_dates(panel.dates < panel.dates[-5])
+    state = OnlineFeatureState.from_panel(history, columns)
+    updated = state.copy()
+    updated.update_panel(panel.slice_dates(panel.dates >= panel.dates[-5]))
+
+    np.testing.assert_allclose(updated.frame(), OnlineFeatureState.from_panel(panel, columns).frame())
+    # the copy the refresh works on leaves the served state alone
+    np.testing.assert_allclose(state.frame(), OnlineFeatureState.from_panel(history, columns).frame())
@@ -0,0 +1,93 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from conftest import linear_model
+from data.panel import MarketPanel
+from models.performance_stats import PerformanceStats, _batch_moments, _merge_moments
+
+
+def strategy_panel(n_dates=40, n_tickers=6, seed=0):
+    """Panel with StrategyReturn / CumulativeReturn like PredictionBuilder's, missing cells and NaN targets."""
+    from models.PredictionBuilder import PredictionBuilder
+
+    rng = np.random.default_rng(seed)
+    mask = rng.random((n_dates, n_tickers)) > 0.1
+    panel = MarketPanel(pd.bdate_range("2025-01-02", periods=n_dates), [f"T{i}" for i in range(n_tickers)], mask)
+    panel.set('Prediction', rng.normal(0, 1.5, panel.shape), dtype=float)
+    target = rng.normal(0, 0.02, panel.shape)
+    target[-3:] = np.nan
+    target[rng.random(panel.shape) < 0.05] = np.nan
+    panel.set('Target', target, dtype=float)
+    PredictionBuilder.__new__(PredictionBuilder)._strategy_returns(panel)
+    return panel
+
+
+def reference_summary(panel):
+    """get_stats computed with pandas on the long rows: a trade is a known, non-zero return."""
+    rows = panel.to_long(['StrategyReturn'])
+    returns = rows['StrategyReturn']
+    traded = returns.fillna(0) != 0
+    assert (traded.to_numpy() == panel.row_values('Traded')).all()
+    avg_trade = returns[traded].mean()
+    return {
+        'totalReturn': (1 + returns.groupby(rows['Date']).mean()).prod() - 1,
+        'sharpe': avg_trade / returns.std(),
+        'winRate': (returns > 0).sum() / traded.sum(),
+        'totalTrades': int(traded.sum()),
+        'avgTrade': avg_trade,
+    }
+
+
+def test_merged_moments_match_numpy():
+    rng = np.random.default_rng(0)
+    values = rng.normal(1.0, 2.0, (30, 4))
+    valid = rng.random((30, 4)) > 0.3
+    valid[:, 3] = False
+
+    count, mean, m2 = np.zeros(4, dtype=int), np.zeros(4), np.zeros(4)
+    for block in np.array_split(np.arange(30), [1, 2, 12, 12, 25]):
+        count, mean, m2 = _merge_moments(count, mean, m2, *_batch_moments(values[block], valid[block], axis=0))
+
+    for column in range(3):
+        column_values = values[valid[:, column], column]
+        assert count[column] == column_values.size
+        np.testing.assert_allclose(mean[column], column_values.mean())
+        np.testing.assert_allclose(m2[column] / (count[column] - 1), column_values.var(ddof=1))
+    # a column without values stays empty
+    assert (count[3], mean[3], m2[3]) == (0, 0.0, 0.0)
+
+
+def test_block_updates_match_the_batch_stats_with_nan_targets():
+    panel = strategy_panel()
+    batch = PerformanceStats.from_panel(panel)
+    incremental = PerformanceStats(panel.tickers)
+    for start in range(0, len(panel.dates), 7):
+        incremental.update(panel.slice_dates(slice(start, start + 7)))
+
+    summary = batch.summary()
+    assert incremental.summary() == pytest.approx(summary)
+    assert incremental.stock_performance() == batch.stock_performance()
+    assert {name: summary[name] for name in reference_summary(panel)} == pytest.approx(reference_summary(panel))
+
+
+def test_no_trades_give_json_safe_stats():
+    panel = strategy_panel()
+    panel.set('StrategyReturn', np.zeros(panel.shape), dtype=float)
+    summary = PerformanceStats.from_panel(panel).summary()
+    assert summary['totalTrades'] == 0
+    assert all(np.isfinite(value) for value in summary.values())
+
+
+def test_refreshed_stats_match_a_rebuild(market, monkeypatch):
+    from models import model_registry, PredictionBuilder
+
+    model_registry.get_registry().register(linear_model(PredictionBuilder.feature_columns), PredictionBuilder.feature_columns, {}, "v1")
+    monkeypatch.setattr(PredictionBuilder, "_yesterday", lambda: market[-8].strftime("%Y-%m-%d"))
+    refreshed = PredictionBuilder.PredictionBuilder()
+    monkeypatch.setattr(PredictionBuilder, "_yesterday", lambda: market[-1].strftime("%Y-%m-%d"))
+    assert refreshed.refresh() == 7
+
+    rebuilt = PredictionBuilder.PredictionBuilder()
+    assert refreshed.get_stats() == pytest.approx(rebuilt.get_stats())
+    assert refreshed.get_stock_performance() == rebuilt.get_stock_performance()
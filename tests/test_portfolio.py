@@ -0,0 +1,64 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from trading_simulation.simulation_helpers import simulate_portfolio, summarize_portfolio
+from trading_simulation.streaming_backtest import RunningSummary, read_date_events, stream_backtest
+
+
+def simulation_data(n_tickers=6, n_days=60, seed=0):
+    """trading_sim_data-style rows sorted by Date, with a missing day and a ticker listed late."""
+    rng = np.random.default_rng(seed)
+    dates = pd.bdate_range("2025-01-02", periods=n_days).strftime("%Y-%m-%d")
+    proba = rng.dirichlet([1, 1, 1], size=n_tickers * n_days)
+    data = pd.DataFrame({
+        'Date': np.repeat(dates, n_tickers),
+        'Close': 100 * np.exp(rng.normal(0, 0.02, n_tickers * n_days)),
+        'Ticker': np.tile([f"T{i}" for i in range(n_tickers)], n_days),
+        'Prob_Down': proba[:, 0], 'Prob_Flat': proba[:, 1], 'Prob_Up': proba[:, 2],
+    })
+    missing = ((data['Ticker'] == "T1") & (data['Date'] == dates[20])) | ((data['Ticker'] == "T5") & (data['Date'] < dates[10]))
+    return data[~missing].reset_index(drop=True)
+
+
+params = [
+    {'holding_horizon': 1},
+    {'holding_horizon': 3, 'cost_bps': 5.0, 'slippage_bps': 2.0},
+    {'holding_horizon': 5, 'threshold_flat': 0.4, 'top_pct': 0.5, 'bottom_pct': 0.5, 'cost_bps': 5.0, 'slippage_vol': 0.1},
+]
+
+
+@pytest.mark.parametrize("kwargs", params)
+def test_streaming_backtest_matches_the_batch_simulation(kwargs):
+    data = simulation_data()
+    events = data.groupby('Date', sort=False)
+    streamed = pd.DataFrame(stream_backtest(events, **kwargs))
+    batch = simulate_portfolio(data.sort_values(['Ticker', 'Date']), **kwargs)
+
+    assert list(pd.to_datetime(streamed['Date'])) == list(batch['Date'])
+    columns = ['Gross_Return', 'Costs', 'Net_Return', 'Turnover', 'Gross_Exposure', 'Equity']
+    np.testing.assert_allclose(streamed[columns], batch[columns], rtol=1e-9, atol=1e-12)
+    assert streamed['Drawdown'].min() == pytest.approx(summarize_portfolio(batch)['max_drawdown'], abs=1e-12)
+
+
+def test_running_summary_matches_summarize_portfolio():
+    data = simulation_data(seed=1)
+    # costs make the first day a loss, which both count as a drawdown from the starting capital
+    results = list(stream_backtest(data.groupby('Date', sort=False), holding_horizon=3, cost_bps=50.0))
+    assert results[0]['Net_Return'] < 0
+    running = RunningSummary()
+    for result in results:
+        running.update(result)
+
+    expected = summarize_portfolio(pd.DataFrame(results))
+    assert running.summary().keys() == expected.keys()
+    np.testing.assert_allclose(list(running.summary().values()), list(expected.values()), rtol=1e-9)
+
+
+def test_date_events_join_dates_split_across_chunks(tmp_path):
+    data = simulation_data()
+    data.to_csv(tmp_path / "trading_sim_data.csv")
+
+    events = list(read_date_events(tmp_path / "trading_sim_data.csv", chunksize=7))
+    assert [date for date, _ in events] == list(data['Date'].unique())
+    pd.testing.assert_frame_equal(pd.concat(rows for _, rows in events), data)
@@ -0,0 +1,32 @@
+import numpy as np
+import pandas as pd
+from sklearn.ensemble import RandomForestClassifier
+
+from models.multi_horizon import MultiHorizonModel
+
+
+def classifier(feature_columns, seed):
+    """Confident down/flat/up calls on the sign of return_1d, so some scores pass the 0.8 cutoff."""
+    rng = np.random.default_rng(seed)
+    X = pd.DataFrame(rng.normal(0, 0.02, size=(500, len(feature_columns))), columns=feature_columns)
+    y = np.digitize(X['return_1d'], [-0.01, 0.01])
+    return RandomForestClassifier(10, random_state=seed).fit(X, y)
+
+
+def test_classifiers_trade_on_up_minus_down_probability(market):
+    from models import model_registry, PredictionBuilder
+
+    columns = PredictionBuilder.feature_columns
+    model = MultiHorizonModel([1, 3], 3, [classifier(columns, 0), classifier(columns, 1)])
+    model_registry.get_registry().register(model, columns, {}, "multi")
+
+    builder = PredictionBuilder.PredictionBuilder()
+    rows = builder.panel.to_long(columns + ['Prediction'])
+    proba = model.predict_proba(rows[columns])
+    np.testing.assert_allclose(rows['Prediction'], proba[:, 2] - proba[:, 0])
+
+    # shorts are taken on likely down moves, not on flat calls
+    shorts = builder.panel.row_values('StrategyReturn') == -builder.panel.row_values('Target')
+    shorts &= builder.panel.row_values('Traded')
+    assert shorts.any()
+    assert (builder.panel.row_values('Prediction')[shorts] < -0.8).all()
@@ -0,0 +1,75 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from conftest import synthetic_bars
+from data.panel import MarketPanel
+from data.schema import TickerDateIndex, compact_long, day_numbers, day_strings, from_day_numbers, \
+    from_record_batch, to_record_batch
+
+
+def gapped_panel(seed=0):
+    """Panel of bars with a few missing (Date, Ticker) cells."""
+    dates = pd.bdate_range("2024-12-20", periods=30)
+    df = synthetic_bars(["AAA", "BBB", "CCC"], dates, seed)
+    df = df.drop(np.random.default_rng(seed).choice(len(df), 10, replace=False)).reset_index(drop=True)
+    return MarketPanel.from_long(df, ['Close', 'Volume'], dtype=np.float64)
+
+
+# ===== Layout =====
+
+def test_day_numbers_round_trip():
+    dates = pd.DatetimeIndex(["1970-01-01", "1999-12-31", "2024-02-29", "2025-01-02"])
+    days = day_numbers(dates)
+
+    assert days.dtype == np.int32
+    assert list(days[:2]) == [0, 10956]
+    assert list(from_day_numbers(days)) == list(dates)
+    assert list(day_strings(days)) == ["1970-01-01", "1999-12-31", "2024-02-29", "2025-01-02"]
+
+
+def test_compact_long_matches_to_long():
+    panel = gapped_panel()
+    compact = compact_long(panel, ['Close', 'Volume'], {'Volume': np.float32})
+    expected = panel.to_long(['Close', 'Volume'])
+
+    assert isinstance(compact['Ticker'].dtype, pd.CategoricalDtype)
+    assert list(compact['Ticker'].cat.categories) == list(panel.tickers)
+    assert compact['Volume'].dtype == np.float32
+    assert list(from_day_numbers(compact['Date'])) == list(expected['Date'])
+    assert list(compact['Ticker'].astype(str)) == list(expected['Ticker'])
+    np.testing.assert_array_equal(compact['Close'], expected['Close'])
+    np.testing.assert_array_equal(compact['Volume'], expected['Volume'].astype(np.float32))
+
+
+def test_record_batch_round_trip_keeps_nan():
+    compact = compact_long(gapped_panel(), ['Close'])
+    compact.loc[3, 'Close'] = np.nan
+
+    restored = from_record_batch(to_record_batch(compact))
+    pd.testing.assert_frame_equal(restored, compact)
+    assert np.isnan(restored.loc[3, 'Close'])
+
+
+# ===== Index =====
+
+def test_ticker_date_index_pages_match_a_scan():
+    compact = compact_long(gapped_panel(), ['Close'])
+    compact = compact.sort_values(['Ticker', 'Date'], ignore_index=True)
+    index = TickerDateIndex(compact)
+    start, end = day_numbers(pd.DatetimeIndex(["2024-12-24", "2025-01-20"]))
+
+    selected = compact['Ticker'].isin(["AAA", "CCC"]) & compact['Date'].between(start, end)
+    positions, after = [], None
+    while True:
+        page, after = index.page(["CCC", "AAA"], start, end, after, limit=7)
+        assert len(page) <= 7
+        positions += list(page)
+        if after is None:
+            break
+    assert positions == list(np.flatnonzero(selected))
+
+    lo, hi = index.rows(1, start, end)
+    assert list(range(lo, hi)) == list(np.flatnonzero((compact['Ticker'] == "BBB") & compact['Date'].between(start, end)))
+    with pytest.raises(KeyError, match="ZZZ"):
+        index.codes(["AAA", "ZZZ"])
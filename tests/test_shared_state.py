@@ -0,0 +1,152 @@
+import base64
+import fcntl
+import json
+import threading
+from datetime import date
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from data.schema import day_numbers
+from shared_state import SharedState, Snapshot, _decode_cursor, _encode_cursor
+
+
+def daily_returns(n_tickers=5, n_days=40, seed=0):
+    """Per-stock daily returns like PredictionBuilder's, sorted by (Ticker, Date)."""
+    rng = np.random.default_rng(seed)
+    tickers = [f"T{i}" for i in range(n_tickers)]
+    days = day_numbers(pd.bdate_range("2025-01-02", periods=n_days))
+    return pd.DataFrame({
+        'Date': np.tile(days, n_tickers),
+        'Ticker': pd.Categorical(np.repeat(tickers, n_days), categories=tickers),
+        'Prediction': rng.normal(size=n_tickers * n_days),
+        'Target': rng.normal(size=n_tickers * n_days).astype(np.float32),
+    })
+
+
+def raw_cursor(payload):
+    return base64.urlsafe_b64encode(json.dumps(payload).encode()).decode()
+
+
+# ===== Cursors =====
+
+def test_cursor_round_trip():
+    assert _decode_cursor(_encode_cursor("AAPL", 20000)) == ("AAPL", 20000)
+
+
+@pytest.mark.parametrize("cursor", ["not base64!", raw_cursor({"a": 1}), raw_cursor([[], 1]), raw_cursor(["T1", "x"]),
+                                    raw_cursor(["T1", 1.5]), raw_cursor(["T1", True]), raw_cursor(["T1"])])
+def test_malformed_cursors_are_rejected(cursor):
+    with pytest.raises(ValueError):
+        _decode_cursor(cursor)
+
+
+# ===== Pages =====
+
+def test_pages_add_up_to_the_filtered_rows():
+    df = daily_returns()
+    snapshot = Snapshot({}, {}, df, "v1")
+    start, end = date(2025, 1, 10), date(2025, 2, 10)
+
+    pages, cursor = [], None
+    while True:
+        page, cursor = snapshot.daily_returns_page(["T3", "T1"], start, end, ["Target"], cursor, limit=7)
+        pages.append(page)
+        if cursor is None:
+            break
+
+    days = day_numbers([start, end])
+    expected = df[df['Ticker'].isin(["T1", "T3"]) & (df['Date'] >= days[0]) & (df['Date'] <= days[1])]
+    pd.testing.assert_frame_equal(pd.concat(pages, ignore_index=True), expected[['Date', 'Ticker', 'Target']].reset_index(drop=True))
+    assert len(pages) == -(-len(expected) // 7)
+
+
+def test_page_errors():
+    snapshot = Snapshot({}, {}, daily_returns(), "v1")
+    with pytest.raises(KeyError):
+        snapshot.daily_returns_page(["NOPE"])
+    with pytest.raises(ValueError):
+        snapshot.daily_returns_page(columns=["Nope"])
+    with pytest.raises(ValueError):
+        snapshot.daily_returns_page(cursor=_encode_cursor("NOPE", 0))
+    with pytest.raises(ValueError):
+        snapshot.daily_returns_page(cursor=raw_cursor([[], 1]))
+
+
+# ===== Shared state =====
+
+def publish(builder, version, seed=0):
+    responses = {"global-stats": ('"etag-' + version + '"', json.dumps({"version": version}).encode())}
+    generation = builder.publish(Snapshot(responses, {"T0": {"ticker": "T0"}}, daily_returns(seed=seed), version))
+    builder.set_status("ready")
+    return generation
+
+
+def exit_builder(builder):
+    # what the process exit does to the builder's locks
+    builder._lock_file.close()
+    builder._boot_lock_file.close()
+
+
+def test_workers_attach_to_the_published_generation(tmp_path):
+    builder, worker = SharedState(tmp_path), SharedState(tmp_path)
+    assert builder.acquire_builder()
+    assert not worker.acquire_builder()
+    assert worker.status()["status"] == "starting" and worker.current() is None
+
+    first = publish(builder, "v1")
+    snapshot = worker.current()
+    assert (snapshot.generation, snapshot.model_version) == (first, "v1")
+    assert bytes(snapshot.responses["global-stats"][1]) == b'{"version": "v1"}'
+    pd.testing.assert_frame_equal(snapshot.daily_returns_df, daily_returns())
+    assert worker.current() is snapshot
+
+    second = publish(builder, "v2", seed=1)
+    third = publish(builder, "v3", seed=2)
+    assert worker.current().model_version == "v3"
+    # the current and previous generations are kept for workers still reading them
+    assert not (tmp_path / first).exists()
+    assert (tmp_path / second).exists() and (tmp_path / third).exists()
+
+
+def test_state_of_an_exited_builder_is_not_served(tmp_path):
+    builder, worker = SharedState(tmp_path), SharedState(tmp_path)
+    builder.acquire_builder()
+    publish(builder, "v1")
+    assert worker.status()["status"] == "ready"
+
+    exit_builder(builder)
+    assert worker.status()["status"] == "starting"
+    assert worker.current() is None
+
+    # a worker takes over, CURRENT only reads as ready again once it has published
+    assert worker.acquire_builder()
+    assert SharedState(tmp_path).status()["status"] == "starting"
+    publish(worker, "v2")
+    assert SharedState(tmp_path).current().model_version == "v2"
+
+
+def test_previous_run_state_is_stale_before_the_new_builder_resets_it(tmp_path):
+    previous_run = SharedState(tmp_path)
+    previous_run.acquire_builder()
+    publish(previous_run, "v1")
+    exit_builder(previous_run)
+
+    # the new run's builder holds the builder lock but has not written CURRENT yet
+    new_builder_lock = open(tmp_path / "builder.lock", "w")
+    fcntl.flock(new_builder_lock, fcntl.LOCK_EX)
+    worker = SharedState(tmp_path)
+    assert not worker.acquire_builder()
+    assert worker.status()["status"] == "starting"
+    assert worker.current() is None
+    new_builder_lock.close()
+
+
+def test_commands_are_run_by_the_builder(tmp_path):
+    builder, worker = SharedState(tmp_path), SharedState(tmp_path)
+    builder.acquire_builder()
+    threading.Thread(target=builder.serve_commands, args=(lambda command: (200, {"ran": command}),), daemon=True).start()
+
+    assert worker.submit("refresh", timeout=5) == (200, {"ran": "refresh"})
+    assert list((tmp_path / "commands").iterdir()) == []
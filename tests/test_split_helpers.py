@@ -0,0 +1,73 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from data.data_helpers import add_target
+from data.split_helpers import class_labels, forward_returns, label_rows, purged_split
+
+
+def long_frame(n_tickers=3, n_days=12, seed=0):
+    """Shuffled long rows (Date, Ticker, Close, f) like load_data's."""
+    rng = np.random.default_rng(seed)
+    dates = pd.bdate_range("2025-01-02", periods=n_days)
+    df = pd.DataFrame({
+        'Date': np.tile(dates, n_tickers),
+        'Ticker': np.repeat([f"T{i}" for i in range(n_tickers)], n_days),
+        'Close': 100 * np.exp(np.cumsum(rng.normal(0, 0.02, n_tickers * n_days))),
+        'f': rng.normal(size=n_tickers * n_days),
+    })
+    return df.sample(frac=1, random_state=seed).reset_index(drop=True)
+
+
+# ===== Labelling =====
+
+@pytest.mark.parametrize("horizon", [1, 3, 11, 12])
+def test_forward_returns_match_add_target(horizon):
+    df = long_frame().sort_values(['Ticker', 'Date']).reset_index(drop=True)
+    codes = pd.Categorical(df['Ticker']).codes
+    returns = forward_returns(df['Close'].to_numpy(), codes, [horizon])[:, 0]
+
+    expected = add_target(df.copy(), horizon)['Target']
+    np.testing.assert_allclose(returns, expected, rtol=1e-6)
+    # the last `horizon` dates of every ticker have no label
+    assert np.isnan(returns).sum() == 3 * min(horizon, 12)
+
+
+def test_label_rows_lag_features_within_each_ticker():
+    df = long_frame()
+    labelled = label_rows(df, ['f'], [1, 3], threshold=0.005, lag=1)
+
+    rows = pd.DataFrame({'day': labelled['dates'], 'code': labelled['tickers'], 'X': labelled['X'][:, 0],
+                         'return_3d': labelled['returns'][:, 1], 'label_3d': labelled['labels'][:, 1]})
+    assert (np.lexsort((rows['code'], rows['day'])) == np.arange(len(rows))).all()
+
+    expected = df.sort_values(['Ticker', 'Date']).groupby('Ticker')['f'].shift(1)
+    expected = df.assign(lagged=expected).sort_values(['Date', 'Ticker'])['lagged'].to_numpy(dtype=np.float32)
+    np.testing.assert_array_equal(rows['X'], expected)
+    np.testing.assert_array_equal(rows['label_3d'], class_labels(rows['return_3d'].to_numpy(), 0.005))
+    assert (rows['label_3d'][rows['return_3d'].isna()] == -1).all()
+
+
+# ===== Time split =====
+
+def test_purged_split_boundaries():
+    day_index = np.repeat(np.arange(30), 2)
+    train, test = purged_split(day_index, 10, 20, horizon=3, embargo=2)
+
+    assert set(day_index[test]) == set(range(10, 20))
+    # labels of train rows end before the block starts, and the embargo dates after it are dropped
+    assert set(day_index[train]) == set(range(0, 7)) | set(range(22, 30))
+    assert not (train & test).any()
+
+
+@pytest.mark.parametrize("horizon, embargo", [(0, 0), (1, 0), (3, 5), (5, 3)])
+def test_no_train_label_window_reaches_the_test_block(horizon, embargo):
+    day_index = np.arange(100)
+    test_start, test_end = 40, 60
+    train, test = purged_split(day_index, test_start, test_end, horizon, embargo)
+
+    label_end = day_index + horizon
+    assert not (train & (label_end >= test_start) & (day_index < test_end)).any()
+    assert not (train & (day_index >= test_end) & (day_index < test_end + embargo)).any()
+    # nothing else is dropped
+    assert (train | test).sum() == 100 - horizon - embargo